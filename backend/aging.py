@@ -0,0 +1,88 @@
+import threading
+from datetime import date
+from sqlalchemy import text
+
+# Delinquency aging of every active (released, unsettled) loan.
+# Days past due are counted from loan_details.next_due, which apply_payment
+# always points at the oldest open installment:
+#   current -> not yet due (next_due today or later)
+#   1-30 / 31-60 / 61-90 / 90+ -> days since that installment fell due
+# One pass over the current loan_details rows (the partial covering index from
+# migration 0008) totals them per due date; that walks the index in order, so
+# there is no sort, and the few hundred per-date rows are bucketed here for any
+# as_of. The per-date totals are cached until the next payment or release: both
+# insert a loan_details row, so MAX(loan_detail_id) changes exactly then.
+
+BUCKETS = (("current", 0), ("1-30", 30), ("31-60", 60), ("61-90", 90), ("90+", None))
+
+DUE_DATE_TOTALS_SQL = """
+    SELECT next_due, COUNT(*) AS loans, SUM(balance) AS balance, SUM(due_amount) AS due_amount
+    FROM loan_details
+    WHERE is_current = 1 AND next_due IS NOT NULL
+    GROUP BY next_due
+"""
+
+def load_due_date_totals(connection):
+    '''[(due date, loans, balance, due_amount)] over every active loan'''
+    totals = {}
+    for next_due, loans, balance, due_amount in connection.execute(text(DUE_DATE_TOTALS_SQL)):
+        # Older rows store a full timestamp; only the day matters here
+        day = date.fromisoformat(str(next_due)[:10])
+        previous = totals.get(day, (0, 0.0, 0.0))
+        totals[day] = (previous[0] + loans, previous[1] + (balance or 0), previous[2] + (due_amount or 0))
+    return [(day, *values) for day, values in sorted(totals.items())]
+
+def bucket_for(days_past_due):
+    for name, upper in BUCKETS:
+        if upper is None or days_past_due <= upper:
+            return name
+
+def build_report(due_date_totals, as_of):
+    '''Bucket totals for as_of (a date): {"buckets": [...], "totals": {...}}'''
+    buckets = {name: [0, 0.0, 0.0] for name, _ in BUCKETS}
+    for day, loans, balance, due_amount in due_date_totals:
+        bucket = buckets[bucket_for((as_of - day).days)]
+        bucket[0] += loans
+        bucket[1] += balance
+        bucket[2] += due_amount
+
+    rows = [
+        {"bucket": name, "loans": loans, "balance": round(balance, 2), "due_amount": round(due_amount, 2)}
+        for name, (loans, balance, due_amount) in buckets.items()
+    ]
+    overdue = rows[1:]
+    return {
+        "buckets": rows,
+        "totals": {
+            "loans": sum(r["loans"] for r in rows),
+            "balance": round(sum(r["balance"] for r in rows), 2),
+            "overdue_loans": sum(r["loans"] for r in overdue),
+            "overdue_balance": round(sum(r["balance"] for r in overdue), 2),
+        },
+    }
+
+def loan_details_version(connection):
+    '''Highest loan_detail_id; every payment and release moves it'''
+    return connection.execute(text("SELECT MAX(loan_detail_id) FROM loan_details")).scalar() or 0
+
+class AgingCache:
+    def __init__(self):
+        self._version = None
+        self._totals = None
+        self._lock = threading.Lock()
+
+    def get(self, conn, as_of):
+        '''Returns (report, cached) for as_of'''
+        with conn.connect() as connection:
+            # Read the version first: a payment landing mid-scan only causes one extra reload
+            version = loan_details_version(connection)
+            cached = self._version == version
+            if not cached:
+                # One reload at a time; concurrent misses wait and reuse its result
+                with self._lock:
+                    cached = self._version == version
+                    if not cached:
+                        self._totals = load_due_date_totals(connection)
+                        self._version = version
+            totals = self._totals
+        return build_report(totals, as_of), cached
@@ -1,63 +1,209 @@
-from datetime import datetime, timedelta
-from flask import Flask, jsonify, render_template_string, request, session
-from flask_session import Session
+from datetime import datetime, timedelta, timezone
+from flask import Blueprint, Flask, Response, jsonify, render_template_string, request, send_file, session
 from flask_cors import CORS
 from functools import wraps
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
+import aging
+import audit_log
+import cashflow
+import database
+import exports
+import metrics
 import microbank as mb
+import migrate
+import notifications
+import passwords
+import session_store
+import user_cache
+import id_images
+import portfolio_stats
+import csv
+import io
+import hmac
 import json
+import loan_queries
+import login_throttle
 import os
 import resend
 from dotenv import load_dotenv
-from werkzeug.security import check_password_hash, generate_password_hash
 
 # --- CONFIGURATION ---
 load_dotenv()
-
-app = Flask(__name__)
 is_production = os.getenv("FLASK_ENV") == "production"
 
-app.config["SESSION_PERMANENT"] = False
-app.config["SESSION_TYPE"] = "filesystem"
-app.config["SESSION_COOKIE_SAMESITE"] = "Lax"
-app.config["SESSION_COOKIE_SECURE"] = is_production 
-app.config["SESSION_COOKIE_HTTPONLY"] = True
-app.config["SECRET_KEY"] = os.getenv("FLASK_SECRET_KEY", "dev_secret_fallback") 
-
-Session(app)
-CORS(app, supports_credentials=True, origins=["http://localhost:5173"])
+CORS_ORIGINS = ["http://localhost:5173"]
 resend.api_key = os.getenv("RESEND_API_KEY")
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, 'database.db')
-conn = create_engine(f'sqlite:///{DB_PATH}', echo=True)
+# Every route lives on this blueprint; create_app() registers it on a new app.
+# Importing this module opens nothing (no engine, threads or process pool), so a
+# pre-forking server can import it once in its master and build the app per worker.
+api = Blueprint("api", __name__)
+
+# --- SERVICES (built by create_app, one set per process) ---
+conn = None             # SQLAlchemy engine; settings from DB_PROFILE, see database.py
+audit_writer = None     # audit rows are written in batches off the request path (audit_log.py)
+outbox = None           # applicant emails, sent from the outbox by background workers (notifications.py)
+request_metrics = None  # per-route latency and per-statement SQL metrics for /api/admin/metrics
+role_cache = None       # role_required reads role/status through this cache; user writes invalidate it
+password_hasher = None  # PBKDF2 hashing/verification on a bounded process pool, not the request thread
+login_attempts = None   # failed logins counted in memory; only a lockout is written to users.lockout_until
+aging_cache = None      # delinquency aging report; recomputed only after a payment or release
+cashflow_cache = None   # Monte Carlo cash-flow simulations, on a process pool; kept until a payment or release
+
+def default_config():
+    return {
+        "DATABASE_PATH": database.DB_PATH,
+        # Off when the server applies them once before forking workers (serve.py)
+        "RUN_MIGRATIONS": True,
+        "SESSION_PERMANENT": False,
+        # "sqlite" (default), "memory" or the old "filesystem" store; see session_store.py
+        "SESSION_BACKEND": os.getenv("SESSION_BACKEND", "sqlite"),
+        "PERMANENT_SESSION_LIFETIME": timedelta(hours=float(os.getenv("SESSION_LIFETIME_HOURS", "12"))),
+        "SESSION_CLEANUP_INTERVAL": float(os.getenv("SESSION_CLEANUP_INTERVAL", "60")),
+        "SESSION_COOKIE_SAMESITE": "Lax",
+        "SESSION_COOKIE_SECURE": is_production,
+        "SESSION_COOKIE_HTTPONLY": True,
+        "SECRET_KEY": os.getenv("FLASK_SECRET_KEY", "dev_secret_fallback"),
+    }
+
+def create_app(config=None):
+    """
+    Builds the Flask app and this process's services (engine, session store, audit
+    writer, email outbox, metrics, caches, hashing pool). `config` overrides
+    default_config(). One app per process: the routes use the module-level services,
+    so call it once, after any fork.
+    """
+    global conn, audit_writer, outbox, request_metrics, role_cache, password_hasher, login_attempts, aging_cache, cashflow_cache
+
+    app = Flask(__name__)
+    app.config.update(default_config())
+    app.config.update(config or {})
+    CORS(app, supports_credentials=True, origins=CORS_ORIGINS)
+
+    conn = database.create_db_engine(app.config["DATABASE_PATH"])
+    if app.config["RUN_MIGRATIONS"]:
+        migrate.apply_migrations(conn)
+    session_store.init_app(app, conn, app.config["SESSION_BACKEND"])
+
+    audit_writer = audit_log.AuditLogWriter(
+        conn,
+        flush_interval=float(os.getenv("AUDIT_FLUSH_INTERVAL", "0.5")),
+        max_queue=int(os.getenv("AUDIT_QUEUE_SIZE", "10000")),
+        batch_size=int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+    )
+
+    # EMAIL_WORKERS=0 leaves sending to `python notifications.py`
+    outbox = notifications.dispatcher_from_env(conn)
+    if outbox.workers > 0:
+        outbox.start()
+
+    request_metrics = metrics.Metrics(n_plus_one_threshold=int(os.getenv("METRICS_N_PLUS_ONE_THRESHOLD", "5")))
+    if os.getenv("METRICS_ENABLED", "1").lower() not in ("0", "false", "no"):
+        request_metrics.init_app(app, conn)
+
+    role_cache = user_cache.UserRoleCache(ttl=float(os.getenv("USER_CACHE_TTL", "5")))
+    password_hasher = passwords.hasher_from_env()
+    login_attempts = login_throttle.throttle_from_env()
+    aging_cache = aging.AgingCache()
+    cashflow_cache = cashflow.cache_from_env()
+
+    app.register_blueprint(api)
+    return app
 
 # --- HELPER: PHILIPPINE TIME ---
 def get_ph_time():
     """Returns the current datetime in UTC+8 (Philippines Standard Time)"""
     return datetime.utcnow() + timedelta(hours=8)
 
+# --- HELPER: CLIENT ADDRESS ---
+# Reverse proxies in front of the app that append the peer to X-Forwarded-For. The
+# header is only read this many hops deep (as werkzeug's ProxyFix x_for does): the
+# entries a client sends itself are never trusted, since they key the login throttle.
+TRUSTED_PROXIES = int(os.getenv("TRUSTED_PROXIES", "0"))
+
+def client_ip(headers, remote_addr):
+    '''The address the outermost trusted proxy saw, else the peer; shared with async_app'''
+    if TRUSTED_PROXIES:
+        forwarded = [ip.strip() for value in headers.getlist("X-Forwarded-For") for ip in value.split(",")]
+        if len(forwarded) >= TRUSTED_PROXIES:
+            return forwarded[-TRUSTED_PROXIES]
+    return remote_addr
+
+def get_client_ip():
+    return client_ip(request.headers, request.remote_addr)
+
 # --- HELPER: AUDIT LOGGING ---
 def log_audit(username, action, target_id=None, details=None):
-    if request.headers.getlist("X-Forwarded-For"):
-        ip_address = request.headers.getlist("X-Forwarded-For")[0]
-    else:
-        ip_address = request.remote_addr
+    ip_address = get_client_ip()
 
-    current_time = get_ph_time()
+    # Queued, not committed here: the background writer batches the INSERTs
+    audit_writer.write({
+        "u": username, "a": action, "t": str(target_id) if target_id else None, 
+        "d": details, "ip": ip_address, "ts": get_ph_time()
+    })
 
-    try:
-        with conn.connect() as connection:
-            connection.execute(
-                text("INSERT INTO audit_logs (username, action, target_id, details, ip_address, timestamp) VALUES (:u, :a, :t, :d, :ip, :ts)"),
-                {
-                    "u": username, "a": action, "t": str(target_id) if target_id else None, 
-                    "d": details, "ip": ip_address, "ts": current_time
-                }
-            )
-            connection.commit()
-    except Exception as e:
-        print(f"FAILED TO LOG AUDIT: {e}")
+# --- HELPER: KEYSET PAGINATION ---
+MAX_PAGE_SIZE = 500
+DEFAULT_LOG_PAGE_SIZE = 200
+
+def get_page_args(args=None):
+    """
+    Reads the ?after=<id>&limit=<n> cursor from the query string (or `args`).
+    Returns (after, limit); limit is None when the caller did not ask for a page.
+    """
+    args = request.args if args is None else args
+    after = args.get("after", type=int)
+    limit = args.get("limit", type=int)
+    if limit is not None:
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+    return after, limit
+
+def split_page(rows, limit, key="loan_id"):
+    """Trims the look-ahead row. Returns (rows, next cursor or None)"""
+    rows = [dict(row) for row in rows]
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1][key]
+    return rows, next_cursor
+
+def paginated_response(rows, limit, key="loan_id"):
+    """Trims the look-ahead row and exposes the next cursor (the last row's `key`) as a header"""
+    rows, next_cursor = split_page(rows, limit, key)
+    response = jsonify(rows)
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return response
+
+# --- HELPER: CONDITIONAL GET (per-loan versions, see migration 0010) ---
+def loan_validators(current):
+    '''(etag, last_modified) for a loan_queries.loan_version row'''
+    etag = f"{current['loan_id']}-{current['version']}"
+    last_modified = datetime.fromtimestamp(current["updated_at"], timezone.utc) if current["updated_at"] else None
+    return etag, last_modified
+
+def is_not_modified(req, etag, last_modified):
+    '''If-None-Match decides when the client sent one, else If-Modified-Since'''
+    if req.if_none_match:
+        return req.if_none_match.contains_weak(etag)
+    if last_modified is not None and req.if_modified_since is not None:
+        return last_modified.replace(microsecond=0) <= req.if_modified_since
+    return False
+
+def set_validators(response, etag, last_modified):
+    response.set_etag(etag)
+    if last_modified is not None:
+        # (assigning None would stamp the current time)
+        response.last_modified = last_modified
+    # PII: browsers may keep it but must revalidate, shared caches may not
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+# --- HELPER: PASSWORD POOL BACKPRESSURE ---
+def hasher_busy_response():
+    """Every hashing slot is taken; the client should retry shortly"""
+    return jsonify({"success": False, "message": "Server busy. Please try again in a moment."}), 503, {"Retry-After": "1"}
 
 # --- DECORATOR: LOGIN REQUIRED ---
 def login_required(f):
@@ -69,6 +215,31 @@ def login_required(f):
     return decorated_function
 
 # --- DECORATOR: ROLE REQUIRED ---
+def load_user_role(username):
+    with conn.connect() as connection:
+        user = connection.execute(
+            text("SELECT role, status FROM users WHERE username = :u"),
+            {"u": username}
+        ).mappings().fetchone()
+    return dict(user) if user else None
+
+# Reasons check_access refuses a user, with the response each one gets
+ACCESS_DENIED = {
+    "missing": ("User no longer exists", 401),   # deleted since login: the session is cleared
+    "suspended": ("Account suspended", 403),     # instant ban enforcement: the session is cleared
+    "role": ("Permission denied", 403),          # audited as UNAUTHORIZED_ACCESS
+}
+
+def check_access(user, allowed_roles):
+    '''None if user ({role, status} or None) may use the route, else an ACCESS_DENIED key; shared with async_app'''
+    if not user:
+        return "missing"
+    if user['status'] != 'active':
+        return "suspended"
+    if user['role'] not in allowed_roles:
+        return "role"
+    return None
+
 def role_required(allowed_roles):
     def decorator(f):
         @wraps(f)
@@ -76,33 +247,23 @@ def role_required(allowed_roles):
             if session.get("username") is None:
                 return jsonify({"success": False, "message": "User not logged in"}), 401
             
-            # UPGRADE: Check the DB for the absolute latest role
-            with conn.connect() as connection:
-                user = connection.execute(
-                    text("SELECT role, status FROM users WHERE username = :u"),
-                    {"u": session["username"]}
-                ).mappings().fetchone()
-
-            # Security Check 1: Does user still exist?
-            if not user:
-                session.clear()
-                return jsonify({"success": False, "message": "User no longer exists"}), 401
-
-            # Security Check 2: Is account active? (Instant ban enforcement)
-            if user['status'] != 'active':
-                session.clear()
-                return jsonify({"success": False, "message": "Account suspended"}), 403
+            # UPGRADE: Check the latest role (cached briefly; user writes invalidate it)
+            user = role_cache.get(session["username"], load_user_role)
 
-            # Security Check 3: Check Role
-            if user['role'] not in allowed_roles:
+            reason = check_access(user, allowed_roles)
+            if reason == "role":
                 log_audit(session["username"], "UNAUTHORIZED_ACCESS", request.path, f"Required: {allowed_roles}, Got: {user['role']}")
-                return jsonify({"success": False, "message": "Permission denied"}), 403
+            elif reason:
+                session.clear()
+            if reason:
+                message, status = ACCESS_DENIED[reason]
+                return jsonify({"success": False, "message": message}), status
             
             return f(*args, **kwargs)
         return decorated_function
     return decorator
 
-@app.route('/api/auth/check', methods=['GET'])
+@api.route('/api/auth/check', methods=['GET'])
 def check_session():
     if session.get("username"):
         return jsonify({
@@ -123,14 +284,14 @@ def check_session():
 # AUTHENTICATION ROUTES
 # ==========================================
 
-@app.errorhandler(500)
+@api.app_errorhandler(500)
 def internal_error(error):
     return jsonify({"success": False, "message": "Internal Server Error"}), 500
 
-@app.route('/api/login', methods=['POST'])
+@api.route('/api/login', methods=['POST'])
 def login():
     try:
-        # Flask ensures request.method is POST due to @app.route methods
+        # Flask ensures request.method is POST due to @api.route methods
         session.clear()
         data = request.get_json()
         username = data.get("username")
@@ -139,6 +300,19 @@ def login():
         if not username or not password:
             return jsonify({"success": False, "message": "Username and password required"}), 200
 
+        # 0. THROTTLE (in memory, before any query)
+        client_ip = get_client_ip()
+        retry_after = login_attempts.ip_retry_after(client_ip)
+        if retry_after:
+            return jsonify({
+                "success": False,
+                "message": "Too many failed logins from this address. Please try again later."
+            }), 429, {"Retry-After": str(retry_after)}
+
+        locked_until = login_attempts.locked_until(username)
+        if locked_until:
+            return jsonify({"success": False, "message": "Account locked.", "lockoutUntil": locked_until.isoformat()}), 200
+
         # 1. Fetch User
         with conn.connect() as connection:
             user = connection.execute(
@@ -148,10 +322,11 @@ def login():
 
         # Handle User Not Found
         if not user:
+            login_attempts.record_failure(None, client_ip)
             return jsonify({"success": False, "message": "Invalid credentials"}), 200
         
         # 2. CHECK LOCKOUT
-        # If a lockout time exists, check if it's still valid
+        # A lockout set by another worker (or before a restart); ours are caught above
         if user["lockout_until"]:
             lockout_time = user["lockout_until"]
             
@@ -166,38 +341,44 @@ def login():
                         lockout_time = get_ph_time() # Fallback
 
             # Check if current time is BEFORE the lockout time
-            if lockout_time > get_ph_time():
-                # ✅ RETURN IMMEDIATELY - Do not check password
+            now = get_ph_time()
+            if lockout_time > now:
+                # ✅ RETURN IMMEDIATELY - Do not check password; remember it so retries skip the query
+                login_attempts.lock(user["username"], lockout_time, (lockout_time - now).total_seconds())
                 return jsonify({
                     "success": False, 
                     "message": "Account locked.",
                     "lockoutUntil": lockout_time.isoformat(),
                 }), 200
-            else:
-                # ✅ Lockout Expired: Reset DB immediately
-                with conn.connect() as connection:
-                    connection.execute(
-                        text("UPDATE users SET failed_login_attempts = 0, lockout_until = NULL WHERE user_id = :uid"),
-                        {"uid": user["user_id"]}
-                    )
-                    connection.commit()
+            # An expired lockout needs no write: the next successful login clears it
 
-        # 3. CHECK STATUS (Manual Locks/Suspensions)
-        if user["status"] == 'locked' and not user["lockout_until"]:
+        # 3. CHECK STATUS (Manual Locks/Suspensions; timed lockouts never change status)
+        if user["status"] == 'locked':
              return jsonify({"success": False, "message": "Account is locked. Contact Admin."}), 200
         
         if user["status"] == 'suspended':
             return jsonify({"success": False, "message": "Account is suspended. Contact Admin."}), 200
 
-        # 4. VERIFY PASSWORD
-        if check_password_hash(user["password"], password):
+        # 4. VERIFY PASSWORD (on the hashing pool; an outdated hash comes back re-hashed)
+        try:
+            matches, upgraded_hash = password_hasher.check_and_upgrade(user["password"], password)
+        except passwords.HasherBusy:
+            return hasher_busy_response()
+
+        if matches:
             # SUCCESS
             with conn.connect() as connection:
                 connection.execute(
-                    text("UPDATE users SET failed_login_attempts = 0, lockout_until = NULL, last_login = :ts, status = 'active' WHERE user_id = :uid"),
-                    {"uid": user["user_id"], "ts": get_ph_time()}
+                    text("""
+                        UPDATE users SET failed_login_attempts = 0, lockout_until = NULL, last_login = :ts, status = 'active',
+                               password = COALESCE(:new_hash, password)
+                        WHERE user_id = :uid
+                    """),
+                    {"uid": user["user_id"], "ts": get_ph_time(), "new_hash": upgraded_hash}
                 )
                 connection.commit()
+            role_cache.invalidate(user["username"])
+            login_attempts.reset(user["username"])
 
             session["username"] = user["username"]
             session["role"] = user["role"]
@@ -213,36 +394,29 @@ def login():
             }), 200
         
         else:
-            # FAILURE (Wrong Password)
-            current_attempts = user["failed_login_attempts"] or 0
-            new_attempts = current_attempts + 1
-            max_attempts = 5
-            
-            msg = ""
-            
-            with conn.connect() as connection:
-                if new_attempts >= max_attempts:
-                    # ✅ LOCK THE ACCOUNT
-                    # Ensure timedelta is imported from datetime
-                    lockout_end = (get_ph_time() + timedelta(minutes=1)).strftime('%Y-%m-%d %H:%M:%S')
-                    
+            # FAILURE (Wrong Password): counted in memory, written only when it locks the account
+            new_attempts = login_attempts.record_failure(user["username"], client_ip)
+            max_attempts = login_attempts.max_failures
+
+            if new_attempts >= max_attempts:
+                # ✅ LOCK THE ACCOUNT
+                lockout_seconds = login_attempts.lockout_seconds
+                lockout_end = (get_ph_time() + timedelta(seconds=lockout_seconds)).replace(microsecond=0)
+                with conn.connect() as connection:
                     connection.execute(
                         text("UPDATE users SET failed_login_attempts = :fa, lockout_until = :lu WHERE user_id = :uid"),
-                        {"fa": new_attempts, "lu": lockout_end, "uid": user["user_id"]}
+                        {"fa": new_attempts, "lu": lockout_end.strftime('%Y-%m-%d %H:%M:%S'), "uid": user["user_id"]}
                     )
-                    # Trigger the specific lockout message logic on frontend
-                    # Note: We don't send 'lockoutUntil' here yet, the user must try again to see the timer, 
-                    # OR you can send it immediately if you prefer.
-                    msg = "Too many failed attempts. Account locked for 1 minute."
-                else:
-                    # Just increment attempts
-                    connection.execute(
-                        text("UPDATE users SET failed_login_attempts = :fa WHERE user_id = :uid"),
-                        {"fa": new_attempts, "uid": user["user_id"]}
-                    )
-                    msg = f"Invalid credentials. {max_attempts - new_attempts} attempts remaining."
-                
-                connection.commit()
+                    connection.commit()
+                login_attempts.lock(user["username"], lockout_end, lockout_seconds)
+                role_cache.invalidate(user["username"])
+
+                # Trigger the specific lockout message logic on frontend
+                # Note: We don't send 'lockoutUntil' here yet, the user must try again to see the timer
+                minutes = max(1, round(lockout_seconds / 60))
+                msg = f"Too many failed attempts. Account locked for {minutes} minute{'s' if minutes != 1 else ''}."
+            else:
+                msg = f"Invalid credentials. {max_attempts - new_attempts} attempts remaining."
 
             return jsonify({"success": False, "message": msg}), 200
 
@@ -250,7 +424,7 @@ def login():
         print(f"LOGIN ERROR: {e}") # Check your server terminal for the exact error string
         return jsonify({"success": False, "message": "System Error. Please try again."}), 200
 
-@app.route('/api/logout', methods=['POST'])
+@api.route('/api/logout', methods=['POST'])
 def logout():
     if session.get("username"):
         log_audit(session["username"], "LOGOUT", "N/A", "User logged out")
@@ -261,7 +435,7 @@ def logout():
 # USER SELF-SERVICE ROUTES
 # ==========================================
 
-@app.route("/api/me", methods=["GET"])
+@api.route("/api/me", methods=["GET"])
 @login_required
 def get_current_user():
     with conn.connect() as connection:
@@ -271,7 +445,7 @@ def get_current_user():
         ).mappings().fetchone()
     return jsonify(dict(user)), 200
 
-@app.route("/api/me/update-profile", methods=["PUT"])
+@api.route("/api/me/update-profile", methods=["PUT"])
 @login_required
 def update_own_profile():
     data = request.json
@@ -290,7 +464,7 @@ def update_own_profile():
     log_audit(session["username"], "UPDATE_SELF_PROFILE", "N/A", f"Changed name to {full_name}")
     return jsonify({"success": True, "full_name": full_name}), 200
 
-@app.route("/api/me/change-password", methods=["PUT"])
+@api.route("/api/me/change-password", methods=["PUT"])
 @login_required
 def change_password():
     data = request.json
@@ -312,14 +486,19 @@ def change_password():
             {"u": session["username"]}
         ).mappings().fetchone()
 
+    # Hash outside the connection: the pool job can take a while
+    try:
         if not is_force_change:
             if not current_pw:
                 return jsonify({"message": "Current password required"}), 400
-            if not check_password_hash(user["password"], current_pw):
+            if not password_hasher.check(user["password"], current_pw):
                 return jsonify({"message": "Current password incorrect"}), 401
 
-        hashed_pw = generate_password_hash(new_pw, method='pbkdf2:sha256')
-        
+        hashed_pw = password_hasher.hash(new_pw)
+    except passwords.HasherBusy:
+        return hasher_busy_response()
+
+    with conn.connect() as connection:
         # UPDATE: Set is_first_login to 0 (False)
         connection.execute(
             text("UPDATE users SET password = :p, is_first_login = 0 WHERE username = :u"),
@@ -337,18 +516,62 @@ def change_password():
 # ADMIN ROUTES (User Management & Logs)
 # ==========================================
 
-@app.route("/api/logs", methods=["GET"])
+@api.route("/api/logs", methods=["GET"])
 @role_required(['admin'])
 def get_logs():
+    """
+    Audit log search, newest first. Filters: ?username=&action=&target_id= (exact),
+    ?from=YYYY-MM-DD&to=YYYY-MM-DD (inclusive), ?q=<words in details> (word* for a prefix).
+    Keyset paging: ?limit=<n> (default 200)&after=<log_id>, next cursor in the X-Next-Cursor header.
+    """
+    after, limit = get_page_args()
+    limit = limit or DEFAULT_LOG_PAGE_SIZE
+    try:
+        start, end = (
+            datetime.strptime(request.args[key], "%Y-%m-%d").date() if request.args.get(key) else None
+            for key in ("from", "to")
+        )
+    except ValueError:
+        return jsonify({"error": "Dates must be YYYY-MM-DD"}), 400
+
     with conn.connect() as connection:
-        logs = connection.execute(text("""
-            SELECT log_id, username, action, target_id, details, ip_address, timestamp 
-            FROM audit_logs 
-            ORDER BY timestamp DESC LIMIT 200
-        """)).mappings().fetchall()
-        return jsonify([dict(row) for row in logs]), 200
+        logs = audit_log.search_logs(
+            connection,
+            {column: request.args.get(column) for column in audit_log.EXACT_FILTERS},
+            start=datetime.combine(start, datetime.min.time()) if start else None,
+            end=datetime.combine(end + timedelta(days=1), datetime.min.time()) if end else None,
+            free_text=request.args.get("q"),
+            after=after,
+            limit=limit + 1
+        )
+    return paginated_response(logs, limit, key="log_id"), 200
 
-@app.route("/api/users", methods=["GET"])
+@api.route("/api/admin/user-cache", methods=["GET"])
+@role_required(['admin'])
+def get_user_cache_stats():
+    """Hit/miss counters for the role_required cache"""
+    return jsonify(role_cache.stats()), 200
+
+@api.route("/api/admin/metrics", methods=["GET"])
+def get_metrics():
+    """
+    Prometheus text format. Needs an admin session, or `Authorization: Bearer <METRICS_TOKEN>`
+    so a scraper can read it without logging in.
+    """
+    token = os.getenv("METRICS_TOKEN")
+    if token and hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return render_metrics()
+    return role_required(['admin'])(render_metrics)()
+
+def render_metrics():
+    return Response(request_metrics.render(), mimetype="text/plain; version=0.0.4")
+
+@api.route("/api/admin/email-outbox", methods=["GET"])
+@role_required(['admin'])
+def get_email_outbox_stats():
+    return jsonify({"provider": outbox.provider.name, "workers": outbox.workers, "messages": notifications.outbox_stats(conn)}), 200
+
+@api.route("/api/users", methods=["GET"])
 @role_required(['admin'])
 def get_users():
     with conn.connect() as connection:
@@ -359,7 +582,7 @@ def get_users():
         """)).mappings().fetchall()
         return jsonify([dict(row) for row in users]), 200
 
-@app.route("/api/users", methods=["POST"])
+@api.route("/api/users", methods=["POST"])
 @role_required(['admin'])
 def create_user():
     data = request.json
@@ -369,9 +592,10 @@ def create_user():
     try:
         with conn.connect() as connection:
             existing = connection.execute(text("SELECT 1 FROM users WHERE username = :u"), {"u": data["username"]}).fetchone()
-            if existing: return jsonify({"message": "Username already taken"}), 409
+        if existing: return jsonify({"message": "Username already taken"}), 409
 
-            hashed_pw = generate_password_hash(data["password"], method='pbkdf2:sha256')
+        hashed_pw = password_hasher.hash(data["password"])
+        with conn.connect() as connection:
             connection.execute(
                 text("""
                     INSERT INTO users (username, password, full_name, role, status, failed_login_attempts) 
@@ -383,10 +607,12 @@ def create_user():
             
         log_audit(session["username"], "USER_CREATED", data["username"], f"Role: {data['role']}")
         return jsonify({"message": "User created successfully"}), 201
+    except passwords.HasherBusy:
+        return hasher_busy_response()
     except Exception as e:
         return jsonify({"message": str(e)}), 500
 
-@app.route("/api/users/<int:user_id>", methods=["PUT"])
+@api.route("/api/users/<int:user_id>", methods=["PUT"])
 @role_required(['admin'])
 def update_user(user_id):
     data = request.json
@@ -414,21 +640,24 @@ def update_user(user_id):
             query = f"UPDATE users SET {', '.join(updates)} WHERE user_id = :id"
             connection.execute(text(query), params)
             connection.commit()
+        role_cache.invalidate(target_user["username"])
+        if data.get("status") == "active":
+            login_attempts.reset(target_user["username"])
 
         log_audit(session["username"], "USER_UPDATED", target_user["username"], f"Updated: {', '.join(data.keys())}")
         return jsonify({"message": "User updated successfully"}), 200
     except Exception as e:
         return jsonify({"message": str(e)}), 500
 
-@app.route("/api/users/<int:user_id>/reset-password", methods=["POST"])
+@api.route("/api/users/<int:user_id>/reset-password", methods=["POST"])
 @role_required(['admin'])
 def reset_password(user_id):
     data = request.json
     if not data.get("password"): return jsonify({"message": "New password required"}), 400
 
     try:
+        hashed_pw = password_hasher.hash(data.get("password"))
         with conn.connect() as connection:
-            hashed_pw = generate_password_hash(data.get("password"), method='pbkdf2:sha256')
             target_user = connection.execute(text("SELECT username FROM users WHERE user_id = :id"), {"id": user_id}).mappings().fetchone()
             if not target_user: return jsonify({"message": "User not found"}), 404
 
@@ -438,13 +667,17 @@ def reset_password(user_id):
                 {"p": hashed_pw, "id": user_id}
             )
             connection.commit()
+        role_cache.invalidate(target_user["username"])
+        login_attempts.reset(target_user["username"])
 
         log_audit(session["username"], "PASSWORD_RESET", target_user["username"], "Admin reset password")
         return jsonify({"message": "Password reset successfully"}), 200
+    except passwords.HasherBusy:
+        return hasher_busy_response()
     except Exception as e:
         return jsonify({"message": str(e)}), 500
 
-@app.route("/api/users/<int:user_id>", methods=["DELETE"])
+@api.route("/api/users/<int:user_id>", methods=["DELETE"])
 @role_required(['admin'])
 def delete_user(user_id):
     try:
@@ -455,6 +688,7 @@ def delete_user(user_id):
 
             connection.execute(text("DELETE FROM users WHERE user_id = :id"), {"id": user_id})
             connection.commit()
+        role_cache.invalidate(target_user["username"])
 
         log_audit(session["username"], "USER_DELETED", target_user["username"], "Permanent deletion")
         return jsonify({"message": "User deleted successfully"}), 200
@@ -466,7 +700,7 @@ def delete_user(user_id):
 # LOAN FLOW ROUTES
 # ==========================================
 
-@app.route('/api/check-eligibility', methods=['POST'])
+@api.route('/api/check-eligibility', methods=['POST'])
 @role_required(['teller', 'manager'])
 def check_eligibility():
     try:
@@ -480,6 +714,7 @@ def check_eligibility():
         # Return both the decision and the score so frontend can display it
         response_data = {
             "status": result['status'],
+            "rule": result.get('rule'),
             "reason": result.get('reason'),
             "credit_score": applicant.credit_score,
             "offer": result.get('offer')
@@ -490,7 +725,55 @@ def check_eligibility():
         print(f"Error in eligibility check: {e}")
         return jsonify({"message": "Error processing request"}), 500
 
-@app.route('/api/loan-status-notification', methods=['POST'])
+@api.route('/api/offers/batch', methods=['POST'])
+@role_required(['manager'])
+def batch_offers():
+    """
+    Prices many hypothetical loans in one call (repricing / rate-sheet what-ifs).
+    Body is columnar: {"principal": [...], "credit_score": [...], "repayment_period": [...], "payment_schedule": [...]}
+    Response uses the same columns as Applicant.calculate_offer(), one list per field.
+    """
+    try:
+        data = request.json or {}
+        fields = ["principal", "credit_score", "repayment_period", "payment_schedule"]
+        missing = [f for f in fields if not isinstance(data.get(f), list)]
+        if missing:
+            return jsonify({"message": f"Missing or invalid fields: {', '.join(missing)}"}), 400
+
+        offers = mb.calculate_offers(*(data[f] for f in fields))
+        return jsonify({key: values.tolist() for key, values in offers.items()}), 200
+    except (ValueError, TypeError) as e:
+        return jsonify({"message": str(e)}), 400
+    except Exception as e:
+        print(f"Error in batch offers: {e}")
+        return jsonify({"message": "Error processing request"}), 500
+
+@api.route('/api/check-eligibility/batch', methods=['POST'])
+@role_required(['manager'])
+def batch_eligibility():
+    """
+    Screens many applicants in one call with the same rules as /api/check-eligibility.
+    Body is columnar: {"credit_score": [...], "monthly_income": [...], "principal": [...],
+    "repayment_period": [...], "payment_schedule": [...]}
+    Response has the /api/offers/batch columns plus status, rule and reason per applicant
+    (rule is the deciding entry of mb.ELIGIBILITY_RULES, null when approved).
+    """
+    try:
+        data = request.json or {}
+        fields = ["credit_score", "monthly_income", "principal", "repayment_period", "payment_schedule"]
+        missing = [f for f in fields if not isinstance(data.get(f), list)]
+        if missing:
+            return jsonify({"message": f"Missing or invalid fields: {', '.join(missing)}"}), 400
+
+        results = mb.assess_eligibilities(*(data[f] for f in fields))
+        return jsonify({key: values.tolist() for key, values in results.items()}), 200
+    except (ValueError, TypeError) as e:
+        return jsonify({"message": str(e)}), 400
+    except Exception as e:
+        print(f"Error in batch eligibility: {e}")
+        return jsonify({"message": "Error processing request"}), 500
+
+@api.route('/api/loan-status-notification', methods=['POST'])
 @role_required(['teller', 'manager'])
 def loan_status_notification():
     try:
@@ -503,6 +786,7 @@ def loan_status_notification():
         
         if result['status'] == "Approved":
             applicant.load_to_db(conn)
+            outbox.wake()
             loan_status = "Approved"
             
             applicant_name = f"{data.get('first_name')} {data.get('last_name')}"
@@ -515,7 +799,7 @@ def loan_status_notification():
         print(f"Error: {e}")
         return jsonify({"message": "Error processing request"}), 500
     
-@app.route('/api/loans/approve-stage', methods=['POST'])
+@api.route('/api/loans/approve-stage', methods=['POST'])
 @role_required(['manager']) 
 def approve_loan_stage():
     """
@@ -528,29 +812,26 @@ def approve_loan_stage():
         loan_id = data.get('loan_id')
         
         with conn.connect() as connection:
-            # 1. Check if loan exists and is Pending
-            existing = connection.execute(
-                text("SELECT 1 FROM loans WHERE loan_id = :id AND status = 'Pending'"),
+            # 1. Check if loan exists and is Pending (and get the name for the audit)
+            applicant = connection.execute(
+                text("SELECT a.first_name, a.last_name FROM loans l LEFT JOIN applicants a ON a.applicant_id = l.applicant_id WHERE l.loan_id = :id AND l.status = 'Pending'"),
                 {"id": loan_id}
             ).fetchone()
 
-            if not existing:
+            if not applicant:
                 return jsonify({"success": False, "message": "Loan not found or not in Pending state"}), 404
+            applicant_name = f"{applicant[0]} {applicant[1]}" if applicant[0] is not None else "Unknown"
 
             # 2. Update Status to 'For Release'
             connection.execute(
                 text("UPDATE loans SET status = 'For Release' WHERE loan_id = :id"),
                 {"id": loan_id}
             )
-            
-            # 3. Get Details for Audit
-            applicant = connection.execute(
-                text("SELECT first_name, last_name FROM applicants a JOIN loans l ON a.applicant_id = l.applicant_id WHERE l.loan_id = :id"),
-                {"id": loan_id}
-            ).fetchone()
-            applicant_name = f"{applicant[0]} {applicant[1]}" if applicant else "Unknown"
-
+            mb.bump_loan_version(connection, loan_id)
+            portfolio_stats.record_status_change(connection, 'Pending', 'For Release')
+            notifications.enqueue_loan_notice(connection, loan_id, "application_approved")
             connection.commit()
+        outbox.wake()
 
         log_audit(session["username"], "APPROVE_APPLICATION", str(loan_id), f"Application approved for {applicant_name}. Status: For Release")
         return jsonify({"success": True, "message": "Application approved. Waiting for closing."}), 200
@@ -558,27 +839,21 @@ def approve_loan_stage():
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 500
 
-@app.route('/api/loans/disburse', methods=['POST'])
+@api.route('/api/loans/disburse', methods=['POST'])
 @role_required(['manager']) 
 def approve_loan():
     try:
         data = request.json
         loan_id = data.get('loan_id')
         
-        with conn.connect() as connection:
-            applicant = connection.execute(
-                text("SELECT first_name, last_name FROM applicants a JOIN loans l ON a.applicant_id = l.applicant_id WHERE l.loan_id = :id"),
-                {"id": loan_id}
-            ).fetchone()
-            applicant_name = f"{applicant[0]} {applicant[1]}" if applicant else "Unknown Applicant"
-
-        mb.release_loan(conn, data)
+        applicant_name = mb.release_loan(conn, data) or "Unknown Applicant"
+        outbox.wake()
         log_audit(session["username"], "DISBURSE_LOAN", str(loan_id), f"Funds released to {applicant_name}")
         return jsonify({"success": True, "message": "Loan has been approved."}), 200
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 500
 
-@app.route('/api/loans/reject', methods=['POST'])
+@api.route('/api/loans/reject', methods=['POST'])
 @role_required(['manager'])
 def reject_loan():
     try:
@@ -590,29 +865,26 @@ def reject_loan():
             return jsonify({"success": False, "message": "Loan ID is required"}), 400
 
         with conn.connect() as connection:
-            # 1. Check if loan exists
-            existing = connection.execute(
-                text("SELECT 1 FROM loans WHERE loan_id = :id AND status = 'Pending'"),
+            # 1. Check if loan exists (and get the name for the audit)
+            applicant = connection.execute(
+                text("SELECT a.first_name, a.last_name FROM loans l LEFT JOIN applicants a ON a.applicant_id = l.applicant_id WHERE l.loan_id = :id AND l.status = 'Pending'"),
                 {"id": loan_id}
             ).fetchone()
 
-            if not existing:
+            if not applicant:
                 return jsonify({"success": False, "message": "Loan not found or already processed"}), 404
+            applicant_name = f"{applicant[0]} {applicant[1]}" if applicant[0] is not None else "Unknown Applicant"
 
             # 2. Update Status AND Remarks
             connection.execute(
                 text("UPDATE loans SET status = 'Rejected', remarks = :r WHERE loan_id = :id"),
                 {"id": loan_id, "r": remarks} # <--- Save remarks here
             )
-            
-            # 3. Get Applicant Name for Audit Log (Optional but good practice)
-            applicant = connection.execute(
-                text("SELECT first_name, last_name FROM applicants a JOIN loans l ON a.applicant_id = l.applicant_id WHERE l.loan_id = :id"),
-                {"id": loan_id}
-            ).fetchone()
-            applicant_name = f"{applicant[0]} {applicant[1]}" if applicant else "Unknown Applicant"
-
+            mb.bump_loan_version(connection, loan_id)
+            portfolio_stats.record_status_change(connection, 'Pending', 'Rejected')
+            notifications.enqueue_loan_notice(connection, loan_id, "application_rejected", remarks=remarks or "Not specified")
             connection.commit()
+        outbox.wake()
 
         # 4. Audit Log (Still keep this for security trail)
         log_audit(session["username"], "REJECT_LOAN", str(loan_id), f"Rejected: {applicant_name}")
@@ -623,7 +895,7 @@ def reject_loan():
         print(f"Error rejecting loan: {e}")
         return jsonify({"success": False, "message": str(e)}), 500
 
-@app.route('/api/loans/log-print', methods=['POST'])
+@api.route('/api/loans/log-print', methods=['POST'])
 @role_required(['teller', 'manager'])
 def log_print_action():
     try:
@@ -649,7 +921,7 @@ def log_print_action():
         print(f"Print Audit Error: {e}")
         return jsonify({"success": False, "message": str(e)}), 500
     
-@app.route('/api/loans/payment', methods=['POST'])
+@api.route('/api/loans/payment', methods=['POST'])
 @role_required(['teller', 'manager']) 
 def payment():
     try:
@@ -658,238 +930,317 @@ def payment():
         amount = data.get('amount')
         
         with conn.connect() as connection:
-            applicant = connection.execute(
-                text("SELECT first_name, last_name FROM applicants a JOIN loans l ON a.applicant_id = l.applicant_id WHERE l.loan_id = :id"),
-                {"id": loan_id}
-            ).fetchone()
-            applicant_name = f"{applicant[0]} {applicant[1]}" if applicant else "Unknown Applicant"
+            applicant_name = loan_queries.applicant_name(connection, loan_id)
 
-        mb.update_balance(conn, data)
+        mb.update_balance(conn, data, processed_by=session["username"])
         log_audit(session["username"], "COLLECT_PAYMENT", str(loan_id), f"Collected {amount} from {applicant_name}")
         return jsonify({"success": True, "message": "Payment recorded."}), 200
         
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 500
 
+# --- HELPER: REMITTANCE FILE PARSING ---
+MAX_BULK_PAYMENT_ROWS = int(os.getenv("MAX_BULK_PAYMENT_ROWS", "20000"))
+BULK_PAYMENT_GROUP_SIZE = int(os.getenv("BULK_PAYMENT_GROUP_SIZE", "500"))
+
+def parse_remittance(req):
+    """
+    Reads remittance rows from an uploaded file ('file') or the raw body.
+    CSV needs a header with loan_id and amount; anything else is read as JSON lines.
+    Returns a list of {"row", "loan_id", "amount"} with 1-based data row numbers.
+    """
+    upload = req.files.get("file")
+    if upload:
+        body = upload.read().decode("utf-8-sig")
+        is_csv = (upload.filename or "").lower().endswith(".csv") or upload.mimetype == "text/csv"
+    else:
+        body = req.get_data(as_text=True)
+        is_csv = req.mimetype == "text/csv"
+
+    rows = []
+    if is_csv:
+        reader = csv.DictReader(io.StringIO(body))
+        if not reader.fieldnames or not {"loan_id", "amount"} <= {f.strip().lower() for f in reader.fieldnames}:
+            raise ValueError("CSV header must include loan_id and amount")
+        for number, record in enumerate(reader, start=1):
+            record = {(k or "").strip().lower(): (v or "").strip() for k, v in record.items()}
+            rows.append({"row": number, "loan_id": record.get("loan_id"), "amount": record.get("amount")})
+    else:
+        for number, line in enumerate((l for l in body.splitlines() if l.strip()), start=1):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            if not isinstance(record, dict):
+                # Keep the row so it shows up as rejected in the report
+                record = {"loan_id": None, "amount": None}
+            rows.append({"row": number, "loan_id": record.get("loan_id"), "amount": record.get("amount")})
+
+    if len(rows) > MAX_BULK_PAYMENT_ROWS:
+        raise ValueError(f"Too many rows ({len(rows)}). Limit is {MAX_BULK_PAYMENT_ROWS}.")
+    return rows
+
+@api.route('/api/loans/payments/bulk', methods=['POST'])
+@role_required(['teller', 'manager'])
+def bulk_payment():
+    """
+    Posts a remittance file (CSV or JSON lines) in grouped transactions.
+    Rejected rows (unknown loan, overpayment, bad amount) are reported, not fatal.
+    """
+    try:
+        rows = parse_remittance(request)
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    if not rows:
+        return jsonify({"success": False, "message": "No payment rows found"}), 400
+
+    try:
+        results = mb.post_payments(conn, rows, processed_by=session["username"], group_size=BULK_PAYMENT_GROUP_SIZE)
+    except Exception as e:
+        return jsonify({"success": False, "message": str(e)}), 500
+
+    posted = [r for r in results if r["status"] == "posted"]
+    for r in posted:
+        log_audit(session["username"], "COLLECT_PAYMENT", str(r["loan_id"]), f"Collected {r['amount']} (remittance row {r['row']})")
+
+    summary = {
+        "rows": len(results),
+        "posted": len(posted),
+        "rejected": len(results) - len(posted),
+        "total_posted": round(sum(r["amount"] for r in posted), 2)
+    }
+    log_audit(session["username"], "BULK_PAYMENT", "N/A", f"Remittance batch: {summary['posted']} posted, {summary['rejected']} rejected, total {summary['total_posted']:,.2f}")
+    return jsonify({"success": True, "summary": summary, "results": results}), 200
+
 # ==========================================
 # DATA FETCHING ROUTES
 # ==========================================
 
-@app.route("/api/dashboard-stats", methods=["GET"])
+@api.route("/api/dashboard-stats", methods=["GET"])
 @role_required(['manager']) 
 def dashboard_stats():
+    """Reads the incrementally maintained counters in portfolio_stats (one small table scan)"""
     with conn.connect() as connection:
-        # 1. Basic Counts
-        approved_loans = connection.execute(text("SELECT COUNT(*) FROM loans WHERE status = 'Approved'")).scalar() or 0
-        pending_loans = connection.execute(text("SELECT COUNT(*) FROM loans WHERE status = 'Pending'")).scalar() or 0
-        settled_loans = connection.execute(text("SELECT COUNT(*) FROM loans WHERE status = 'Settled'")).scalar() or 0
-        rejected_loans = connection.execute(text("SELECT COUNT(*) FROM loans WHERE status = 'Rejected'")).scalar() or 0 # NEW
-
-        # 2. Financials
-        # Total Principal Released
-        total_disbursed = connection.execute(text("SELECT SUM(principal) FROM loans WHERE status IN ('Approved', 'Settled')")).scalar() or 0
-        
-        # Total Actual Payments Collected
-        total_payments = connection.execute(text("SELECT SUM(amount_paid) FROM payments")).scalar() or 0
-        
-        # Total Loan Value (Principal + Interest) of Active/Settled loans
-        total_receivable = connection.execute(text("SELECT SUM(total_loan) FROM loans WHERE status IN ('Approved', 'Settled')")).scalar() or 0
-        
-        # Projected Revenue (Interest Income)
-        net_revenue = total_receivable - total_disbursed
-
-        # 3. Analytics: Daily Trend
-        daily_applicant_count = connection.execute(text("""
-                SELECT DATE(application_date) AS date, COUNT(*) AS applicant_count
-                FROM loans GROUP BY DATE(application_date) ORDER BY DATE(application_date) ASC LIMIT 30
-            """)).fetchall()
-        daily_applicant_data = [{"date": row[0], "applicant_count": row[1]} for row in daily_applicant_count]
-
-        # 4. Analytics: Loan Purpose Distribution (NEW)
-        purpose_counts = connection.execute(text("""
-            SELECT loan_purpose, COUNT(*) as count 
-            FROM loans GROUP BY loan_purpose
-        """)).fetchall()
-        loan_purpose_data = [{"name": row[0] or "Unspecified", "value": row[1]} for row in purpose_counts]
-
-        # 5. Analytics: Gender Distribution (NEW)
-        gender_counts = connection.execute(text("""
-            SELECT gender, COUNT(*) as count 
-            FROM applicants GROUP BY gender
-        """)).fetchall()
-        demographic_data = [{"name": row[0] or "Unspecified", "value": row[1]} for row in gender_counts]
+        return jsonify(loan_queries.dashboard(connection)), 200
 
-        return jsonify({
-            "approved_loans": approved_loans,
-            "pending_loans": pending_loans,
-            "settled_loans": settled_loans,
-            "rejected_loans": rejected_loans,
-            "total_disbursed": total_disbursed,
-            "total_payments": total_payments,
-            "net_revenue": net_revenue,
-            "daily_applicant_data": daily_applicant_data,
-            "loan_purpose_data": loan_purpose_data,
-            "demographic_data": demographic_data
-        }), 200
-    
-@app.route("/api/applications", methods=["GET"])
+@api.route("/api/applications", methods=["GET"])
 @role_required(['teller', 'manager'])
 def get_applications():
+    """
+    Lists applications in review. Rows are slim (no ID image; fetch /api/loans/<id> for that).
+    Optional keyset paging: ?limit=<n>&after=<loan_id>, next cursor in the X-Next-Cursor header.
+    """
+    after, limit = get_page_args()
     with conn.connect() as connection:
-        loans = connection.execute(text('''
-        SELECT 
-            l.loan_id AS loan_id,
-            first_name || ' ' || last_name AS applicant_name,
-            application_date AS start_date,
-            payment_time_period AS duration,
-            principal AS amount,
-            status,
-            l.remarks, -- ADDED: Reason for rejection
-            email,
-            application_date AS date_applied,
-            COALESCE(due_amount, 0) AS due_amount,
-            l.applicant_id as applicant_id,
-            a.credit_score, 
-            a.monthly_income,
-            a.employment_status,
-            l.loan_purpose,
-            l.payment_schedule,
-            l.disbursement_method,
-            l.disbursement_account_number,
-            a.gender,
-            a.civil_status,
-            a.id_image_data,
-            a.id_type,
-            a.phone_num,
-            a.address
-        FROM loans l
-        LEFT JOIN applicants a ON l.applicant_id = a.applicant_id
-        LEFT JOIN loan_details ld ON ld.loan_id = l.loan_id AND is_current = 1
-        WHERE status IN ('Pending', 'Rejected', 'For Release')
-        ORDER BY 
-            CASE 
-                WHEN status = 'Pending' THEN 1 
-                WHEN status = 'For Release' THEN 2 
-                ELSE 3 
-            END,
-            application_date DESC;
-        ''')).mappings().fetchall()
-        
-        loans = [dict(loan) for loan in loans] 
-    return jsonify(loans), 200
+        loans = loan_queries.list_applications(connection, after, limit)
 
-@app.route("/api/loans", methods=["GET"])
+    return paginated_response(loans, limit), 200
+
+@api.route("/api/loans", methods=["GET"])
 @role_required(['teller', 'manager'])
 def get_loans():
+    """
+    Lists released loans. Rows are slim (no ID image; fetch /api/loans/<id> for that).
+    Optional keyset paging: ?limit=<n>&after=<loan_id>, next cursor in the X-Next-Cursor header.
+    """
+    after, limit = get_page_args()
     with conn.connect() as connection:
-        loans = connection.execute(text('''
-        SELECT 
-            l.loan_id AS loan_id,
-            CONCAT(a.first_name, ' ', a.last_name) AS applicant_name,
-            l.application_date AS start_date,
-            l.payment_time_period AS duration,
-            l.total_loan AS amount,
-            l.status,
-            a.email,
-            l.application_date AS date_applied,
-            l.applicant_id AS applicant_id,
-            
-            -- Active Loan Specifics
-            COALESCE(MAX(ld.due_amount), 0) AS due_amount,
-            MAX(ld.balance) as balance,
-            MAX(ld.next_due) as next_due,
-
-            -- NEW FIELDS (KYC & Financials)
-            a.credit_score, 
-            a.monthly_income,
-            a.employment_status,
-            l.loan_purpose,
-            l.payment_schedule,
-            l.disbursement_method,
-            l.disbursement_account_number,
-            a.gender,
-            a.civil_status,
-            a.id_image_data,
-            a.id_type,
-            a.phone_num,
-            a.address
-
-        FROM loans l
-        LEFT JOIN applicants a ON l.applicant_id = a.applicant_id
-        LEFT JOIN loan_details ld ON ld.loan_id = l.loan_id AND ld.is_current = 1
-        WHERE l.status IN ('Approved', 'Settled')
-        GROUP BY l.loan_id;
-        ''')).mappings().fetchall()
-        return jsonify([dict(loan) for loan in loans]), 200
-
-@app.route("/api/loans/<id>", methods=["GET"])
+        loans = loan_queries.list_loans(connection, after, limit)
+
+    return paginated_response(loans, limit), 200
+
+@api.route("/api/loans/<id>", methods=["GET"])
 @role_required(['teller', 'manager'])
 def get_loan(id):
     with conn.connect() as connection:
-        loan = connection.execute(text('''
-        SELECT 
-            l.loan_id AS loan_id,
-            -- Changed CONCAT to || for SQLite compatibility (if using SQLite)
-            first_name || ' ' || last_name AS applicant_name,
-            a.applicant_id,
-            a.phone_num AS phone_number,
-            a.employment_status,
-            a.credit_score,
-            a.date_of_birth,
-            a.civil_status,
-            a.address,
-            a.id_type,
-            
-            a.gender,
-            a.monthly_income,
-            a.id_image_data, 
-            
-            l.loan_purpose,
-            l.disbursement_method,
-            l.disbursement_account_number,
-            l.application_date AS start_date,
-            l.payment_time_period AS duration,
-            l.total_loan AS amount,
-            l.principal AS principal,
-            l.payment_schedule AS payment_schedule,
-            l.status,
-            
-            ld.next_due,
-            a.email,
-            l.application_date AS date_applied,
-            COALESCE(due_amount, 0) as due_amount,
-            lp.interest_rate
-        FROM loans l
-        LEFT JOIN applicants a ON l.applicant_id = a.applicant_id
-        -- Fixed Join: loan_details links to loan_id, not applicant_id
-        LEFT JOIN loan_details ld ON ld.loan_id = l.loan_id AND is_current = 1
-        LEFT JOIN loan_plans lp ON l.loan_plan_lvl = lp.plan_level
-        WHERE l.loan_id = :loan_id;
-        '''), { "loan_id": id}).mappings().fetchone()
-    
+        # Version before the join: a write landing in between only costs the client one more fetch
+        current = loan_queries.loan_version(connection, id)
+        if current:
+            validators = loan_validators(current)
+            if is_not_modified(request, *validators):
+                # Still a view of the applicant's profile, even without the body
+                log_audit(session["username"], "VIEW_PII", str(id), f"Viewed profile of {current['applicant_name']}")
+                return set_validators(Response(status=304), *validators)
+        loan = loan_queries.get_loan(connection, id) if current else None
+
     if loan:
         log_audit(session["username"], "VIEW_PII", str(id), f"Viewed profile of {loan['applicant_name']}")
-        return jsonify(dict(loan)), 200
+        return set_validators(jsonify(loan), *validators), 200
     else:
         return jsonify({"error": "Loan not found"}), 404
 
-@app.route('/api/payments/<loan_id>', methods=['GET'])
+@api.route("/api/applicants/<int:applicant_id>/id-image", methods=["GET"])
+@role_required(['teller', 'manager'])
+def get_applicant_id_image(applicant_id):
+    """
+    Streams the applicant's ID image from the file store.
+    ETag is the content hash, so If-None-Match and Range requests are answered by send_file.
+    """
+    with conn.connect() as connection:
+        image = connection.execute(
+            text("SELECT id_image_hash, id_image_mime FROM applicants WHERE applicant_id = :aid"),
+            {"aid": applicant_id}
+        ).mappings().fetchone()
+
+        if not image:
+            return jsonify({"error": "Applicant not found"}), 404
+
+        image_hash, mime_type = image["id_image_hash"], image["id_image_mime"]
+
+        # Legacy row with an inline Base64 image: move it to the store on first access
+        if not image_hash:
+            legacy = connection.execute(
+                text("SELECT id_image_data FROM applicants WHERE applicant_id = :aid"),
+                {"aid": applicant_id}
+            ).scalar()
+            try:
+                image_hash, mime_type = id_images.store_data_url(legacy)
+            except ValueError:
+                # Corrupt inline copy: left in place, as backfill_legacy_images does
+                return jsonify({"error": "ID image on file is not valid image data"}), 422
+            if not image_hash:
+                return jsonify({"error": "No ID image on file"}), 404
+
+            connection.execute(
+                text("UPDATE applicants SET id_image_hash = :h, id_image_mime = :m, id_image_data = NULL WHERE applicant_id = :aid"),
+                {"h": image_hash, "m": mime_type, "aid": applicant_id}
+            )
+            connection.commit()
+
+    path = id_images.image_path(image_hash)
+    if not os.path.exists(path):
+        return jsonify({"error": "ID image file is missing"}), 404
+
+    response = send_file(path, mimetype=mime_type or id_images.DEFAULT_MIME, conditional=True, etag=image_hash)
+    # PII: browsers may keep it, shared caches may not
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+
+    # Every way of reading the image is a view: whole (200), in Range chunks (206)
+    # or from the browser's cached copy after revalidation (304)
+    if response.status_code == 206:
+        log_audit(session["username"], "VIEW_ID_IMAGE", str(applicant_id), f"Viewed applicant ID image ({response.headers.get('Content-Range')})")
+    elif response.status_code == 304:
+        log_audit(session["username"], "VIEW_ID_IMAGE", str(applicant_id), "Viewed applicant ID image (cached copy)")
+    elif response.status_code == 200:
+        log_audit(session["username"], "VIEW_ID_IMAGE", str(applicant_id), "Viewed applicant ID image")
+    return response
+
+@api.route('/api/payments/<loan_id>', methods=['GET'])
 @role_required(['teller', 'manager'])
 def get_payments_by_loan_id(loan_id):
     with conn.connect() as connection:
-        result = connection.execute(text("""
-            SELECT payment_id, amount_paid, remarks, transaction_date
-            FROM payments WHERE loan_id = :loan_id ORDER BY transaction_date DESC
-        """), {"loan_id": loan_id}).mappings().fetchall()
+        current = loan_queries.loan_version(connection, loan_id)
+        if current:
+            validators = loan_validators(current)
+            if is_not_modified(request, *validators):
+                return set_validators(Response(status=304), *validators)
+        response = jsonify(loan_queries.loan_payments(connection, loan_id))
+
+    if current:
+        set_validators(response, *validators)
+    return response, 200
+
+@api.route('/api/loans/<int:loan_id>/schedule', methods=['GET'])
+@role_required(['teller', 'manager'])
+def get_loan_schedule(loan_id):
+    with conn.connect() as connection:
+        rows = loan_queries.loan_schedule(connection, loan_id)
 
-        total_result = connection.execute(text("""
-            SELECT SUM(amount_paid) AS total_paid FROM payments WHERE loan_id = :loan_id
-        """), {"loan_id": loan_id}).scalar()
+    return jsonify(rows), 200
 
-        return jsonify({
-            "payments": [dict(row) for row in result],
-            "total_paid": total_result or 0
-        }), 200
+def get_forecast_window(args):
+    """?from / ?to as dates (default: today and 30 days on); ValueError when malformed"""
+    today = get_ph_time().date()
+    start = datetime.strptime(args.get("from", today.isoformat()), "%Y-%m-%d").date()
+    end = datetime.strptime(args.get("to", (today + timedelta(days=30)).isoformat()), "%Y-%m-%d").date()
+    return start, end
+
+@api.route('/api/schedules/due', methods=['GET'])
+@role_required(['manager'])
+def get_collection_forecast():
+    """
+    Amount still to collect per due date, from the installment schedules.
+    ?from=YYYY-MM-DD&to=YYYY-MM-DD, defaults to the next 30 days.
+    """
+    try:
+        start, end = get_forecast_window(request.args)
+    except ValueError:
+        return jsonify({"error": "Dates must be YYYY-MM-DD"}), 400
+
+    with conn.connect() as connection:
+        return jsonify(loan_queries.collection_forecast(connection, start, end)), 200
+
+@api.route('/api/loans/aging', methods=['GET'])
+@role_required(['teller', 'manager'])
+def get_loan_aging():
+    """
+    Active loans by days past due (current, 1-30, 31-60, 61-90, 90+) with counts and balances.
+    ?as_of=YYYY-MM-DD, defaults to today.
+    """
+    try:
+        as_of = datetime.strptime(request.args.get("as_of", get_ph_time().date().isoformat()), "%Y-%m-%d").date()
+    except ValueError:
+        return jsonify({"error": "as_of must be YYYY-MM-DD"}), 400
+
+    report, cached = aging_cache.get(conn, as_of)
+    return jsonify({"as_of": as_of.isoformat(), "cached": cached, **report}), 200
+
+CASHFLOW_SIM_MAX_SCENARIOS = int(os.getenv("CASHFLOW_SIM_MAX_SCENARIOS", "10000"))
+
+@api.route('/api/portfolio/cashflow-simulation', methods=['GET'])
+@role_required(['manager'])
+def get_cashflow_simulation():
+    """
+    Percentile curves of monthly collections over the active book (see cashflow.py).
+    ?scenarios=<n> (default 1000)&seed=<n> (default 42)&percentiles=5,50,95
+    """
+    try:
+        scenarios = int(request.args.get("scenarios", 1000))
+        seed = int(request.args.get("seed", 42))
+        percentiles = [float(p) for p in request.args.get("percentiles", "5,50,95").split(",")]
+    except ValueError:
+        return jsonify({"error": "scenarios and seed must be integers, percentiles comma-separated numbers"}), 400
+    if not 1 <= scenarios <= CASHFLOW_SIM_MAX_SCENARIOS:
+        return jsonify({"error": f"scenarios must be between 1 and {CASHFLOW_SIM_MAX_SCENARIOS}"}), 400
+    if not all(0 <= p <= 100 for p in percentiles):
+        return jsonify({"error": "percentiles must be between 0 and 100"}), 400
+
+    result, cached = cashflow_cache.get(conn, get_ph_time().date(), scenarios, seed, percentiles)
+    return jsonify({"cached": cached, **result}), 200
+
+@api.route('/api/exports/<dataset>', methods=['GET'])
+def export_dataset(dataset):
+    """
+    Streams a full extract: loans or payments (manager), audit-logs (admin).
+    ?format=csv|ndjson (default csv), optional ?from=YYYY-MM-DD&to=YYYY-MM-DD (inclusive)
+    on the application date / transaction date / log timestamp.
+    """
+    if dataset not in exports.EXPORTS:
+        return jsonify({"error": f"Unknown export '{dataset}'"}), 404
+    _, roles = exports.EXPORTS[dataset]
+    return role_required(roles)(stream_export)(dataset)
+
+def stream_export(dataset):
+    fmt = request.args.get("format", "csv")
+    if fmt not in exports.FORMATS:
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+    try:
+        start, end = (
+            datetime.strptime(request.args[key], "%Y-%m-%d").date() if request.args.get(key) else None
+            for key in ("from", "to")
+        )
+    except ValueError:
+        return jsonify({"error": "Dates must be YYYY-MM-DD"}), 400
+
+    log_audit(session["username"], "EXPORT_DATA", dataset, f"format={fmt} from={start or '-'} to={end or '-'}")
+    filename = f"{dataset}_{get_ph_time():%Y%m%d}.{fmt}"
+    return Response(
+        exports.export(conn, dataset, fmt, start, end),
+        content_type=exports.FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 if __name__ == "__main__":
-    app.run(debug=not is_production)
\ No newline at end of file
+    create_app().run(debug=not is_production)
\ No newline at end of file
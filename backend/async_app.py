@@ -0,0 +1,277 @@
+import os
+import time
+from functools import wraps
+from a2wsgi import WSGIMiddleware
+from quart import Quart, g, jsonify, request
+from sqlalchemy import text
+from werkzeug.exceptions import HTTPException
+import app as sync_app
+import database
+import loan_queries
+import microbank as mb
+import session_store
+
+# Optional async serving mode (ASGI):
+#     uvicorn async_app:application --port 5000     (or: python async_app.py)
+# The loan, payment and data-fetching routes listed in ASYNC_VIEWS run as coroutines
+# on an aiosqlite engine, so a request waiting on SQLite does not hold a worker
+# thread and one process can keep many of them in flight. They run the same
+# loan_queries functions as the Flask views (through AsyncConnection.run_sync), so
+# URLs and JSON are identical. Every other URL (login, users, uploads, exports...)
+# is handed to the Flask app on a thread pool (ASYNC_WSGI_THREADS), so the whole
+# API is served from one port and sessions, audit log and caches are shared.
+# Needs SESSION_BACKEND=sqlite or memory. The async routes are not part of the
+# per-route series at /api/admin/metrics.
+
+flask_app = sync_app.create_app()
+engine = database.create_async_db_engine()
+
+if not isinstance(flask_app.session_interface, session_store.ServerSideSessionInterface):
+    raise RuntimeError("Async mode needs SESSION_BACKEND=sqlite or memory")
+
+api = Quart(__name__)
+
+# --- SESSIONS (the Flask app's server-side store, read from async code) ---
+session_interface = flask_app.session_interface
+SESSION_COOKIE_NAME = flask_app.config["SESSION_COOKIE_NAME"]
+
+async def session_store_call(method, *args):
+    '''Runs a store method: sqlite through the async engine, the in-process memory store directly'''
+    store = session_interface.store
+    if not isinstance(store, session_store.SqliteSessionStore):
+        return getattr(store, method)(*args)
+
+    async with engine.connect() as connection:
+        if method == "load":
+            sid, now = args
+            row = (await connection.execute(text(session_store.SESSION_LOAD_SQL), {"sid": sid, "now": now})).fetchone()
+            return (row[0], row[1]) if row else (None, None)
+        if method == "save":
+            sid, data, expires_at = args
+            await connection.execute(text(session_store.SESSION_SAVE_SQL), {"sid": sid, "data": data, "exp": expires_at})
+        else:
+            await connection.execute(text(session_store.SESSION_DELETE_SQL), {"sid": args[0]})
+        await connection.commit()
+
+async def load_session():
+    '''Sets g.sid / g.session from the cookie; refreshes the row on the same schedule as the Flask app'''
+    g.sid, g.session, g.clear_session = request.cookies.get(SESSION_COOKIE_NAME), {}, False
+    if not g.sid:
+        return
+
+    now = time.time()
+    data, expires_at = await session_store_call("load", g.sid, now)
+    if data is None:
+        return
+    try:
+        g.session = session_interface.serializer.loads(data)
+    except ValueError:
+        return
+
+    lifetime = flask_app.permanent_session_lifetime.total_seconds()
+    if g.session and expires_at - now < lifetime / 2:
+        await session_store_call("save", g.sid, data, now + lifetime)
+
+@api.after_request
+async def finish_response(response):
+    if g.get("clear_session"):
+        # Same as session.clear() in the Flask app: drop the row and the cookie
+        await session_store_call("delete", g.sid)
+        response.delete_cookie(
+            SESSION_COOKIE_NAME,
+            domain=session_interface.get_cookie_domain(flask_app),
+            path=session_interface.get_cookie_path(flask_app),
+            secure=session_interface.get_cookie_secure(flask_app),
+            samesite=session_interface.get_cookie_samesite(flask_app),
+            httponly=session_interface.get_cookie_httponly(flask_app),
+        )
+
+    # What flask_cors adds on the Flask side (preflights are answered there)
+    origin = request.headers.get("Origin")
+    if origin in sync_app.CORS_ORIGINS:
+        response.headers["Access-Control-Allow-Origin"] = origin
+        response.headers["Access-Control-Allow-Credentials"] = "true"
+        response.vary.add("Origin")
+    return response
+
+@api.errorhandler(500)
+async def internal_error(error):
+    return jsonify({"success": False, "message": "Internal Server Error"}), 500
+
+# --- HELPER: AUDIT LOGGING ---
+def log_audit(username, action, target_id=None, details=None):
+    ip_address = sync_app.client_ip(request.headers, request.remote_addr)
+
+    # Same background writer as the Flask app; write() only queues the row
+    sync_app.audit_writer.write({
+        "u": username, "a": action, "t": str(target_id) if target_id else None,
+        "d": details, "ip": ip_address, "ts": sync_app.get_ph_time()
+    })
+
+# --- DECORATOR: ROLE REQUIRED ---
+async def load_user_role(username):
+    async with engine.connect() as connection:
+        user = (await connection.execute(
+            text("SELECT role, status FROM users WHERE username = :u"),
+            {"u": username}
+        )).mappings().fetchone()
+    return dict(user) if user else None
+
+def role_required(allowed_roles):
+    '''The Flask app's role_required, with the same cache and the same responses'''
+    def decorator(f):
+        @wraps(f)
+        async def decorated_function(*args, **kwargs):
+            await load_session()
+            username = g.session.get("username")
+            if username is None:
+                return jsonify({"success": False, "message": "User not logged in"}), 401
+
+            user = await sync_app.role_cache.get_async(username, load_user_role)
+            reason = sync_app.check_access(user, allowed_roles)
+            if reason == "role":
+                log_audit(username, "UNAUTHORIZED_ACCESS", request.path, f"Required: {allowed_roles}, Got: {user['role']}")
+            elif reason:
+                g.clear_session = True
+            if reason:
+                message, status = sync_app.ACCESS_DENIED[reason]
+                return jsonify({"success": False, "message": message}), status
+
+            return await f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+async def run_query(fn, *args):
+    '''Runs a loan_queries function on a pooled async connection'''
+    async with engine.connect() as connection:
+        return await connection.run_sync(fn, *args)
+
+def paginated_response(rows, limit, key="loan_id"):
+    rows, next_cursor = sync_app.split_page(rows, limit, key)
+    response = jsonify(rows)
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return response
+
+# --- ROUTES (same rules and roles as the Flask views of the same name) ---
+
+@role_required(['teller', 'manager'])
+async def payment():
+    try:
+        data = await request.get_json()
+        loan_id = data.get('loan_id')
+        amount = data.get('amount')
+
+        applicant_name = await run_query(loan_queries.applicant_name, loan_id)
+
+        # mb.update_balance, on the async engine: parse, then apply in one transaction
+        parsed_loan_id, payment_amount = mb.parse_payment(data)
+        async with engine.begin() as connection:
+            await connection.run_sync(mb.apply_payment, parsed_loan_id, payment_amount, g.session["username"])
+
+        log_audit(g.session["username"], "COLLECT_PAYMENT", str(loan_id), f"Collected {amount} from {applicant_name}")
+        return jsonify({"success": True, "message": "Payment recorded."}), 200
+
+    except Exception as e:
+        return jsonify({"success": False, "message": str(e)}), 500
+
+@role_required(['manager'])
+async def dashboard_stats():
+    return jsonify(await run_query(loan_queries.dashboard)), 200
+
+@role_required(['teller', 'manager'])
+async def get_applications():
+    after, limit = sync_app.get_page_args(request.args)
+    loans = await run_query(loan_queries.list_applications, after, limit)
+    return paginated_response(loans, limit), 200
+
+@role_required(['teller', 'manager'])
+async def get_loans():
+    after, limit = sync_app.get_page_args(request.args)
+    loans = await run_query(loan_queries.list_loans, after, limit)
+    return paginated_response(loans, limit), 200
+
+@role_required(['teller', 'manager'])
+async def get_loan(id):
+    async with engine.connect() as connection:
+        current = await connection.run_sync(loan_queries.loan_version, id)
+        if current:
+            validators = sync_app.loan_validators(current)
+            if sync_app.is_not_modified(request, *validators):
+                log_audit(g.session["username"], "VIEW_PII", str(id), f"Viewed profile of {current['applicant_name']}")
+                return sync_app.set_validators(api.response_class("", status=304), *validators)
+        loan = await connection.run_sync(loan_queries.get_loan, id) if current else None
+
+    if loan:
+        log_audit(g.session["username"], "VIEW_PII", str(id), f"Viewed profile of {loan['applicant_name']}")
+        return sync_app.set_validators(jsonify(loan), *validators), 200
+    else:
+        return jsonify({"error": "Loan not found"}), 404
+
+@role_required(['teller', 'manager'])
+async def get_payments_by_loan_id(loan_id):
+    async with engine.connect() as connection:
+        current = await connection.run_sync(loan_queries.loan_version, loan_id)
+        if current:
+            validators = sync_app.loan_validators(current)
+            if sync_app.is_not_modified(request, *validators):
+                return sync_app.set_validators(api.response_class("", status=304), *validators)
+        response = jsonify(await connection.run_sync(loan_queries.loan_payments, loan_id))
+
+    if current:
+        sync_app.set_validators(response, *validators)
+    return response, 200
+
+@role_required(['teller', 'manager'])
+async def get_loan_schedule(loan_id):
+    return jsonify(await run_query(loan_queries.loan_schedule, loan_id)), 200
+
+@role_required(['manager'])
+async def get_collection_forecast():
+    try:
+        start, end = sync_app.get_forecast_window(request.args)
+    except ValueError:
+        return jsonify({"error": "Dates must be YYYY-MM-DD"}), 400
+    return jsonify(await run_query(loan_queries.collection_forecast, start, end)), 200
+
+# Flask endpoint ("api.<view>") -> coroutine. Rules and methods are copied from the Flask
+# URL map, and the dispatcher matches against that map, so routing cannot drift between modes.
+ASYNC_VIEWS = {
+    f"{sync_app.api.name}.{view.__name__}": view for view in (
+        payment, dashboard_stats, get_applications, get_loans, get_loan,
+        get_payments_by_loan_id, get_loan_schedule, get_collection_forecast,
+    )
+}
+
+for rule in flask_app.url_map.iter_rules():
+    if rule.endpoint in ASYNC_VIEWS:
+        view = ASYNC_VIEWS[rule.endpoint]
+        api.add_url_rule(rule.rule, view.__name__, view, methods=rule.methods - {"OPTIONS"})
+
+@api.after_serving
+async def close_engine():
+    await engine.dispose()
+
+# --- ASGI ENTRY POINT ---
+wsgi_fallback = WSGIMiddleware(flask_app, workers=int(os.getenv("ASYNC_WSGI_THREADS", "10")))
+url_adapter = flask_app.url_map.bind("localhost")
+
+def async_endpoint(scope):
+    '''The ASYNC_VIEWS endpoint for an HTTP request, or None when Flask should serve it'''
+    if scope["method"] == "OPTIONS":
+        return None
+    try:
+        endpoint, _ = url_adapter.match(scope["path"], method=scope["method"])
+    except HTTPException:
+        return None
+    return endpoint if endpoint in ASYNC_VIEWS else None
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan" or (scope["type"] == "http" and async_endpoint(scope)):
+        await api(scope, receive, send)
+    else:
+        await wsgi_fallback(scope, receive, send)
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(application, host=os.getenv("HOST", "127.0.0.1"), port=int(os.getenv("PORT", "5000")))
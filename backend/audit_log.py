@@ -0,0 +1,205 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from datetime import timedelta
+from sqlalchemy import text
+
+# Audit events are queued in-process and written by a background thread in batches,
+# so a request never waits on the audit INSERT/commit (an fsync on SQLite).
+
+INSERT_AUDIT_SQL = text(
+    "INSERT INTO audit_logs (username, action, target_id, details, ip_address, timestamp) VALUES (:u, :a, :t, :d, :ip, :ts)"
+)
+
+class AuditLogWriter:
+    def __init__(self, conn, flush_interval=0.5, max_queue=10000, batch_size=500, put_timeout=2.0, retries=3):
+        self.conn = conn
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.put_timeout = put_timeout
+        self.retries = retries
+        self._lock = threading.Lock()
+        self._reset()
+        atexit.register(self.close)
+
+    def _reset(self):
+        # Also called after a fork: the parent's queue and thread do not carry over
+        self._pid = os.getpid()
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _ensure_started(self):
+        if self._pid != os.getpid():
+            self._reset()
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._stop.clear()
+                    self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+                    self._thread.start()
+
+    def write(self, record):
+        '''Queues one audit row ({u, a, t, d, ip, ts}). Blocks briefly when the queue is full.'''
+        self._ensure_started()
+        try:
+            self._queue.put(record, timeout=self.put_timeout)
+        except queue.Full:
+            # Backpressure gave up: write inline rather than lose the event
+            self._write_batch([record])
+
+    def flush(self):
+        '''Blocks until everything queued so far is committed'''
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            self._queue.join()
+
+    def close(self):
+        '''Stops the writer and commits whatever is still queued (runs at interpreter exit)'''
+        if self._pid != os.getpid():
+            return
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+        self._drain()
+
+    # --- WORKER ---
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._take_batch()
+            if batch:
+                self._write_batch(batch)
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _take_batch(self):
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        # Give a burst a moment to accumulate, then take what is there
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _drain(self):
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return
+            self._write_batch(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write_batch(self, batch):
+        for attempt in range(1, self.retries + 1):
+            try:
+                with self.conn.connect() as connection:
+                    connection.execute(INSERT_AUDIT_SQL, batch)
+                    connection.commit()
+                return
+            except Exception as e:
+                if attempt == self.retries:
+                    print(f"FAILED TO LOG AUDIT ({len(batch)} events): {e}")
+                else:
+                    time.sleep(0.05 * attempt)
+
+# --- SEARCH ---
+# Only the filters that were given go into the WHERE clause, so SQLite can seek the
+# matching (column, timestamp) index from migration 0009 instead of evaluating
+# "x IS NULL OR ..." against every row.
+#   no free text -> newest first by (timestamp, log_id), straight off those indexes
+#   free text    -> newest first by log_id (write order), driven from the FTS index so
+#                   a common word stops after one page instead of sorting every match
+
+EXACT_FILTERS = ("username", "action", "target_id")
+LOG_COLUMNS = "l.log_id, l.username, l.action, l.target_id, l.details, l.ip_address, l.timestamp"
+
+# Entries are written in log_id order shortly after their timestamp is taken (the
+# writer flushes every flush_interval), so a time range maps to a log_id window
+# found with two index seeks. The margin keeps that window wider than any write
+# delay; the exact timestamp filter still applies inside it.
+WRITE_DELAY_MARGIN = timedelta(minutes=5)
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+def fts_query(free_text):
+    '''Free text -> FTS5 query: every word must appear, a trailing * matches a prefix'''
+    terms = []
+    for word in free_text.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*")
+        if word:
+            # Quoted so FTS5 operators and punctuation in the input are taken literally
+            terms.append('"' + word.replace('"', '""') + '"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+def search_logs(connection, filters, start=None, end=None, free_text=None, after=None, limit=200):
+    '''
+    filters: {column: value} for username/action/target_id. start/end are datetimes bounding
+    the timestamp (end exclusive). after is the log_id of the last row of the previous page.
+    '''
+    conditions, params = [], {"limit": limit}
+    for column in EXACT_FILTERS:
+        if filters.get(column):
+            conditions.append(f"l.{column} = :{column}")
+            params[column] = filters[column]
+    if start:
+        conditions.append("l.timestamp >= :start")
+        params["start"] = start.strftime(TIMESTAMP_FORMAT)
+    if end:
+        conditions.append("l.timestamp < :end")
+        params["end"] = end.strftime(TIMESTAMP_FORMAT)
+
+    match = fts_query(free_text) if free_text else ""
+    if match:
+        conditions.append("audit_logs_fts MATCH :match")
+        params["match"] = match
+        if start:
+            conditions.append("""f.rowid > COALESCE((
+                SELECT log_id FROM audit_logs WHERE timestamp < :start_window ORDER BY timestamp DESC LIMIT 1
+            ), 0)""")
+            params["start_window"] = (start - WRITE_DELAY_MARGIN).strftime(TIMESTAMP_FORMAT)
+        if end:
+            conditions.append("""f.rowid < COALESCE((
+                SELECT log_id FROM audit_logs WHERE timestamp >= :end_window ORDER BY timestamp LIMIT 1
+            ), 9223372036854775807)""")
+            params["end_window"] = (end + WRITE_DELAY_MARGIN).strftime(TIMESTAMP_FORMAT)
+        if after is not None:
+            conditions.append("f.rowid < :after")
+            params["after"] = after
+        sql = f"""
+            SELECT {LOG_COLUMNS}
+            FROM audit_logs_fts f
+            JOIN audit_logs l ON l.log_id = f.rowid
+            WHERE {' AND '.join(conditions)}
+            ORDER BY f.rowid DESC
+            LIMIT :limit
+        """
+    else:
+        if after is not None:
+            conditions.append("(l.timestamp, l.log_id) < (SELECT timestamp, log_id FROM audit_logs WHERE log_id = :after)")
+            params["after"] = after
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        sql = f"""
+            SELECT {LOG_COLUMNS}
+            FROM audit_logs l
+            {where}
+            ORDER BY l.timestamp DESC, l.log_id DESC
+            LIMIT :limit
+        """
+    return connection.execute(text(sql), params).mappings().fetchall()
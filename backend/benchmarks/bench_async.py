@@ -0,0 +1,138 @@
+"""
+Concurrent read throughput: the Flask app vs the async mode (async_app.py) on one database.
+
+    python benchmarks/bench_async.py --db PATH [--concurrency 32] [--duration 20] [--user manager.1] [--json]
+
+Seed the database first (python seed_portfolio.py --loans 100000 --db PATH; staff passwords
+equal their usernames). Each mode is started in turn on that database and a free port:
+  sync  -> the Flask app on its threaded server, as `python app.py` runs it
+  async -> uvicorn async_app:application (one process, one event loop)
+--concurrency clients (loadtest.Client, keep-alive, own session) log in as --user and
+then loop over the routes the async mode serves: a /api/loans page, a loan, its
+payments and schedule, and the dashboard, on random released loans.
+Reports throughput and latency per mode. Runs add audit and session rows to the database.
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+from loadtest import Client, Recorder
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    "sync": lambda port: [sys.executable, "-c", f"import app; app.create_app().run(port={port}, threaded=True)"],
+    "async": lambda port: [sys.executable, "-m", "uvicorn", "async_app:application", "--port", str(port), "--log-level", "warning"],
+}
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def sample_loans(db_path, n=5000):
+    db = sqlite3.connect(db_path)
+    try:
+        ids = [row[0] for row in db.execute("SELECT loan_id FROM loans WHERE status IN ('Approved', 'Settled') LIMIT :n", {"n": n})]
+    finally:
+        db.close()
+    if not ids:
+        raise SystemExit("No released loans in the database; seed it with seed_portfolio.py first")
+    return ids
+
+def wait_until_up(base_url, process, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"Server exited with {process.returncode}")
+        try:
+            urllib.request.urlopen(f"{base_url}/api/auth/check", timeout=2).read()
+            return
+        except OSError:
+            time.sleep(0.25)
+    raise SystemExit("Server did not come up")
+
+def drive(base_url, args, loan_ids):
+    '''--concurrency logged-in clients on the async mode's routes for --duration seconds'''
+    clients = [Client(base_url, Recorder()) for _ in range(args.concurrency)]
+    for client in clients:
+        _, login = client.request("POST", "/api/login", "setup", {"username": args.user, "password": args.password or args.user})
+        if not login or not login.get("success"):
+            raise SystemExit(f"Login as {args.user} failed: {login}")
+
+    recorder = Recorder()
+    deadline = time.monotonic() + args.duration
+
+    def worker(client, seed):
+        client.recorder = recorder
+        rng = random.Random(seed)
+        while time.monotonic() < deadline:
+            loan_id = rng.choice(loan_ids)
+            client.request("GET", f"/api/loans?limit=50&after={loan_id}", "GET /api/loans")
+            client.request("GET", f"/api/loans/{loan_id}", "GET /api/loans/<id>")
+            client.request("GET", f"/api/payments/{loan_id}", "GET /api/payments/<loan_id>")
+            client.request("GET", f"/api/loans/{loan_id}/schedule", "GET /api/loans/<loan_id>/schedule")
+            client.request("GET", "/api/dashboard-stats", "GET /api/dashboard-stats")
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker, args=(client, n)) for n, client in enumerate(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.monotonic() - started
+
+    routes = recorder.report(wall)
+    samples = sorted(s for route_samples in recorder.samples.values() for s in route_samples)
+    count = len(samples)
+    return {
+        "requests": count,
+        "errors": sum(r["errors"] for r in routes.values()),
+        "rps": round(count / wall, 1),
+        "p50_ms": round(samples[count // 2], 1) if count else None,
+        "p95_ms": round(samples[int(count * 0.95)], 1) if count else None,
+        "p99_ms": round(samples[int(count * 0.99)], 1) if count else None,
+        "routes": routes,
+    }
+
+def run_mode(mode, args, loan_ids):
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, DATABASE_PATH=os.path.abspath(args.db), EMAIL_WORKERS="0")
+    process = subprocess.Popen(SERVERS[mode](port), cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_up(base_url, process)
+        return drive(base_url, args, loan_ids)
+    finally:
+        process.terminate()
+        process.wait()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", required=True, help="seeded database file")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=20, help="seconds per mode")
+    parser.add_argument("--user", default="manager.1", help="manager account to log in as")
+    parser.add_argument("--password", help="defaults to the username (seed_portfolio accounts)")
+    parser.add_argument("--modes", default="sync,async")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    loan_ids = sample_loans(args.db)
+    results = {mode: run_mode(mode, args, loan_ids) for mode in args.modes.split(",")}
+    if args.json:
+        print(json.dumps(results, indent=2))
+        sys.exit(0)
+
+    print(f"{args.concurrency} concurrent clients, {args.duration:g}s per mode, {os.cpu_count()} CPU(s)\n")
+    print(f"{'mode':<8}{'requests':>10}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for mode, r in results.items():
+        print(f"{mode:<8}{r['requests']:>10}{r['errors']:>8}{r['rps']:>9}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}")
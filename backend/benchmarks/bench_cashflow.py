@@ -0,0 +1,73 @@
+"""
+Monte Carlo cash-flow simulation (cashflow.py): book load time and scenario throughput by worker count.
+
+    python benchmarks/bench_cashflow.py --db PATH [--scenarios 2000] [--workers 1,2,4] [--json]
+
+Seed the database first (python seed_portfolio.py --loans 100000 --db PATH). Loads the
+Approved book once, then runs the same --scenarios (same seed) on each worker count and
+checks that every run returns the same percentiles: the chunks and their seeds do not
+depend on the pool size. --workers defaults to 1, 2, 4... up to the CPU count.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+import cashflow
+import database
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", required=True, help="seeded database file")
+    parser.add_argument("--scenarios", type=int, default=2000)
+    parser.add_argument("--workers", help="comma-separated worker counts (default 1, 2, 4... up to the CPU count)")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    if args.workers:
+        counts = [int(n) for n in args.workers.split(",")]
+    else:
+        counts = sorted({min(2 ** n, cpus) for n in range(cpus.bit_length() + 1)})
+
+    started = time.perf_counter()
+    with database.create_db_engine(args.db).connect() as connection:
+        book = cashflow.load_book(connection, date.today())
+    load_seconds = time.perf_counter() - started
+
+    runs, reference = [], None
+    for workers in counts:
+        result = cashflow.simulate(book, args.scenarios, seed=42, workers=workers)
+        if reference is None:
+            reference = result["totals"]
+        elif result["totals"] != reference:
+            raise SystemExit(f"{workers} workers gave different results than {counts[0]}")
+        runs.append({
+            "workers": workers,
+            "seconds": result["seconds"],
+            "scenarios_per_second": round(args.scenarios / result["seconds"], 1),
+        })
+
+    results = {
+        "loans": result["book"]["loans"],
+        "installments": result["book"]["installments"],
+        "cells": len(book["cell_amount"]),
+        "load_seconds": round(load_seconds, 2),
+        "scenarios": args.scenarios,
+        "runs": runs,
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+        sys.exit(0)
+
+    print(f"{results['loans']:,} loans, {results['installments']:,} open installments "
+          f"({results['cells']:,} loan-months), loaded in {results['load_seconds']}s")
+    print(f"{args.scenarios:,} scenarios, {cpus} CPU(s)\n")
+    print(f"{'workers':<9}{'seconds':>9}{'scenarios/s':>13}{'speedup':>9}")
+    base = runs[0]["seconds"]
+    for r in runs:
+        print(f"{r['workers']:<9}{r['seconds']:>9}{r['scenarios_per_second']:>13}{base / r['seconds']:>8.2f}x")
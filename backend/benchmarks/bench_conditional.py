@@ -0,0 +1,87 @@
+"""
+Full GET vs revalidation (If-None-Match -> 304) for loan detail and payment history.
+
+    python benchmarks/bench_conditional.py --db PATH [--requests 2000] [--user manager.1] [--json]
+
+Seed the database first (python seed_portfolio.py --loans 100000 --db PATH; staff passwords
+equal their usernames). Runs the app in-process (test client, memory sessions) and, for
+--requests random released loans per route, times a plain GET and then the same GET with
+the ETag it returned, as a browser revalidating its cached copy would.
+Applies pending migrations to the database and adds audit rows to it.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+from bench_async import BACKEND_DIR, sample_loans
+
+ROUTES = {
+    "GET /api/loans/<id>": "/api/loans/{}",
+    "GET /api/payments/<loan_id>": "/api/payments/{}",
+}
+
+def summarize(samples, sizes):
+    samples = sorted(samples)
+    return {
+        "count": len(samples),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "p50_ms": round(samples[len(samples) // 2], 3),
+        "p95_ms": round(samples[int(len(samples) * 0.95)], 3),
+        "bytes": round(statistics.fmean(sizes)),
+    }
+
+def run(args):
+    os.environ.update(DATABASE_PATH=os.path.abspath(args.db), EMAIL_WORKERS="0")
+    sys.path.insert(0, BACKEND_DIR)
+    os.chdir(BACKEND_DIR)
+    import app as appmod
+
+    client = appmod.create_app({"SESSION_BACKEND": "memory"}).test_client()
+    login = client.post("/api/login", json={"username": args.user, "password": args.password or args.user}).get_json()
+    if not login.get("success"):
+        raise SystemExit(f"Login as {args.user} failed: {login}")
+
+    loan_ids = sample_loans(args.db)
+    results = {}
+    for route, path in ROUTES.items():
+        full, revalidated, full_sizes, revalidated_sizes = [], [], [], []
+        for n in range(args.requests):
+            url = path.format(loan_ids[n % len(loan_ids)])
+
+            start = time.perf_counter()
+            response = client.get(url)
+            full.append((time.perf_counter() - start) * 1000)
+            full_sizes.append(len(response.data))
+
+            start = time.perf_counter()
+            response = client.get(url, headers={"If-None-Match": response.headers["ETag"]})
+            revalidated.append((time.perf_counter() - start) * 1000)
+            revalidated_sizes.append(len(response.data))
+            if response.status_code != 304:
+                raise SystemExit(f"{url}: expected 304, got {response.status_code}")
+
+        results[route] = {"200": summarize(full, full_sizes), "304": summarize(revalidated, revalidated_sizes)}
+    appmod.audit_writer.flush()
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", required=True, help="seeded database file")
+    parser.add_argument("--requests", type=int, default=2000, help="loans fetched per route")
+    parser.add_argument("--user", default="manager.1", help="manager account to log in as")
+    parser.add_argument("--password", help="defaults to the username (seed_portfolio accounts)")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        sys.exit(0)
+
+    print(f"{'route':<30}{'status':>7}{'mean ms':>9}{'p50 ms':>9}{'p95 ms':>9}{'bytes':>8}")
+    for route, by_status in results.items():
+        for status, r in by_status.items():
+            print(f"{route:<30}{status:>7}{r['mean_ms']:>9}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['bytes']:>8}")
@@ -0,0 +1,141 @@
+"""
+Throughput of concurrent payment posting and dashboard reads per database profile.
+
+    python benchmarks/bench_db_profiles.py [--loans 2000] [--seconds 5] [--writers 4] [--readers 4] [--dir PATH] [--json]
+
+A seeded database is copied once per profile; writer threads post small payments
+through microbank.update_balance() while reader threads run the dashboard read and
+the first page of /api/loans. "legacy" is the engine the app used before profiles.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+import database
+import microbank as mb
+import migrate
+import portfolio_stats
+
+LOANS_PAGE_SQL = text("""
+    SELECT l.loan_id, a.first_name || ' ' || a.last_name AS applicant_name, l.total_loan, l.status,
+           ld.due_amount, ld.balance, ld.next_due
+    FROM loans l
+    LEFT JOIN applicants a ON l.applicant_id = a.applicant_id
+    LEFT JOIN loan_details ld ON ld.loan_id = l.loan_id AND ld.is_current = 1
+    WHERE l.status IN ('Approved', 'Settled')
+    ORDER BY l.loan_id LIMIT 100
+""")
+
+def seed(db_path, loans):
+    engine = database.create_db_engine(db_path, profile="bulk")
+    migrate.apply_migrations(engine, verbose=False)
+    with engine.connect() as connection:
+        connection.execute(
+            text("INSERT INTO applicants (applicant_id, first_name, last_name, gender) VALUES (:id, 'Bench', :ln, 'Female')"),
+            [{"id": i, "ln": f"Borrower {i}"} for i in range(1, loans + 1)]
+        )
+        connection.execute(
+            text("""
+                INSERT INTO loans (loan_id, applicant_id, loan_plan_lvl, principal, total_loan, payment_amount,
+                                   payment_time_period, payment_schedule, status, loan_purpose)
+                VALUES (:id, :id, 2, 15000, 1000000, 5400, 12, 'Monthly', 'Approved', 'Business')
+            """),
+            [{"id": i} for i in range(1, loans + 1)]
+        )
+        connection.execute(
+            text("""
+                INSERT INTO loan_details (loan_id, balance, due_amount, next_due, payments_remaining, is_current)
+                VALUES (:id, 1000000, 5400, '2030-01-01', 12, 1)
+            """),
+            [{"id": i} for i in range(1, loans + 1)]
+        )
+        connection.commit()
+    portfolio_stats.rebuild(engine)
+    engine.dispose()
+
+def run_profile(db_path, profile, loans, seconds, writers, readers):
+    engine = database.create_db_engine(db_path, profile=profile)
+    counts = {"payments": 0, "reads": 0, "errors": 0}
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def writer(seed_value):
+        rng = random.Random(seed_value)
+        while not stop.is_set():
+            try:
+                mb.update_balance(engine, {"loan_id": rng.randint(1, loans), "amount": 1})
+                key = "payments"
+            except Exception:
+                key = "errors"
+            with lock:
+                counts[key] += 1
+
+    def reader():
+        while not stop.is_set():
+            try:
+                with engine.connect() as connection:
+                    portfolio_stats.read_dashboard_stats(connection)
+                    connection.execute(LOANS_PAGE_SQL).fetchall()
+                key = "reads"
+            except Exception:
+                key = "errors"
+            with lock:
+                counts[key] += 1
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    engine.dispose()
+
+    return {
+        "payments_per_s": round(counts["payments"] / seconds, 1),
+        "reads_per_s": round(counts["reads"] / seconds, 1),
+        "errors": counts["errors"],
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--loans", type=int, default=2000)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--profiles", default="legacy,development,production")
+    parser.add_argument("--dir", default=None, help="where to put the databases (use a real disk, not tmpfs)")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        seeded = os.path.join(tmp, "seed.db")
+        seed(seeded, args.loans)
+        for profile in args.profiles.split(","):
+            db_path = os.path.join(tmp, f"{profile}.db")
+            shutil.copy(seeded, db_path)
+            if profile == "legacy":
+                # The seed left the file in WAL mode; put it back to SQLite's default
+                engine = database.create_db_engine(db_path, profile="legacy")
+                with engine.connect() as connection:
+                    connection.exec_driver_sql("PRAGMA journal_mode = DELETE")
+                engine.dispose()
+            results[profile] = run_profile(db_path, profile, args.loans, args.seconds, args.writers, args.readers)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'profile':<14}{'payments/s':>12}{'reads/s':>12}{'errors':>8}")
+        for profile, r in results.items():
+            print(f"{profile:<14}{r['payments_per_s']:>12}{r['reads_per_s']:>12}{r['errors']:>8}")
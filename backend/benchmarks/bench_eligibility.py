@@ -0,0 +1,136 @@
+"""
+Eligibility screening throughput: one applicant per call vs the batch evaluator.
+
+    python benchmarks/bench_eligibility.py [--applicants 20000] [--http-requests 1000] [--json]
+
+Random applicants (scores 300-850, incomes around the 60% burden limit, all schedules)
+are screened by the compiled ELIGIBILITY_RULES four ways:
+  per-applicant  -> Applicant(data).assess_eligibility(), as /api/check-eligibility runs it
+  batch          -> mb.assess_eligibilities() on the whole set at once
+  http single    -> POST /api/check-eligibility, one applicant per request (--http-requests)
+  http batch     -> POST /api/check-eligibility/batch with all of them
+The HTTP paths use the in-process test client on a throwaway database.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+import microbank as mb
+
+SCHEDULES = ["Weekly", "Bi-Weekly", "Monthly"]
+
+def random_applicants(n, seed=42):
+    rng = np.random.default_rng(seed)
+    columns = {
+        "credit_score": rng.integers(300, 851, n),
+        "principal": np.round(rng.uniform(1000, 50000, n), 2),
+        "repayment_period": rng.choice([3, 6, 12, 24], n),
+        "payment_schedule": rng.choice(SCHEDULES, n).astype(object),
+    }
+    offers = mb.calculate_offers(columns["principal"], columns["credit_score"], columns["repayment_period"], columns["payment_schedule"])
+    # Burden between 30% and 90% of income, so both outcomes of the burden rule show up
+    monthly_burden = offers["payment_amount"] * mb.get_schedule_multipliers(columns["payment_schedule"])
+    columns["monthly_income"] = np.round(monthly_burden / rng.uniform(0.3, 0.9, n), 2)
+    return {key: values.tolist() for key, values in columns.items()}
+
+def as_request(columns, i):
+    return {
+        "credit_score": columns["credit_score"][i],
+        "monthly_revenue": columns["monthly_income"][i],
+        "loan_amount": columns["principal"][i],
+        "repayment_period": columns["repayment_period"][i],
+        "payment_schedule": columns["payment_schedule"][i],
+    }
+
+def timed(n, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    return {"applicants": n, "seconds": round(elapsed, 4), "per_second": round(n / elapsed)}
+
+def run_functions(columns):
+    n = len(columns["credit_score"])
+    requests = [as_request(columns, i) for i in range(n)]
+    single = [None] * n
+
+    def per_applicant():
+        for i, data in enumerate(requests):
+            single[i] = mb.Applicant(data).assess_eligibility()
+
+    batch = {}
+    def batched():
+        batch.update(mb.assess_eligibilities(
+            columns["credit_score"], columns["monthly_income"], columns["principal"],
+            columns["repayment_period"], columns["payment_schedule"]
+        ))
+
+    results = {"per-applicant": timed(n, per_applicant), "batch": timed(n, batched)}
+    # Both paths run the same rules: decisions must agree applicant for applicant
+    if any(s["status"] != b or s.get("rule") != r for s, b, r in zip(single, batch["status"], batch["rule"])):
+        raise SystemExit("per-applicant and batch decisions differ")
+    results["rejected_by_rule"] = {
+        name: int((batch["rule"] == name).sum()) for name, _, _ in mb.COMPILED_ELIGIBILITY_RULES
+    }
+    return results
+
+def run_http(columns, http_requests):
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(EMAIL_WORKERS="0", PASSWORD_HASH_WORKERS="0")
+        os.chdir(BACKEND_DIR)
+        from sqlalchemy import text
+        import app as appmod
+        import passwords
+
+        flask_app = appmod.create_app({"DATABASE_PATH": os.path.join(tmp, "bench.db"), "SESSION_BACKEND": "memory"})
+        with appmod.conn.connect() as connection:
+            connection.execute(
+                text("INSERT INTO users (username, password, role, full_name, is_first_login) VALUES ('bench.mgr', :pw, 'manager', 'Bench', 0)"),
+                {"pw": passwords.PasswordHasher(workers=0).hash("bench")}
+            )
+            connection.commit()
+        client = flask_app.test_client()
+        client.post("/api/login", json={"username": "bench.mgr", "password": "bench"})
+
+        n = min(http_requests, len(columns["credit_score"]))
+        requests = [as_request(columns, i) for i in range(n)]
+
+        def single():
+            for data in requests:
+                client.post("/api/check-eligibility", json=data)
+
+        def batched():
+            response = client.post("/api/check-eligibility/batch", json=columns)
+            if response.status_code != 200:
+                raise SystemExit(f"batch request failed: {response.status_code}")
+
+        results = {"http single": timed(n, single), "http batch": timed(len(columns["credit_score"]), batched)}
+        appmod.audit_writer.close()
+        appmod.conn.dispose()
+        return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--applicants", type=int, default=20000)
+    parser.add_argument("--http-requests", type=int, default=1000, help="single-applicant HTTP calls")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    columns = random_applicants(args.applicants)
+    results = run_functions(columns)
+    results.update(run_http(columns, args.http_requests))
+    if args.json:
+        print(json.dumps(results, indent=2))
+        sys.exit(0)
+
+    rejected = results.pop("rejected_by_rule")
+    print(f"{args.applicants} applicants; rejected by rule: {rejected}\n")
+    print(f"{'path':<16}{'applicants':>12}{'seconds':>10}{'per second':>13}")
+    for path, r in results.items():
+        print(f"{path:<16}{r['applicants']:>12}{r['seconds']:>10}{r['per_second']:>13,}")
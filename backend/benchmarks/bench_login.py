@@ -0,0 +1,146 @@
+"""
+Login latency during a burst of concurrent logins (shift start).
+
+    python benchmarks/bench_login.py [--users 8] [--rounds 3] [--workers 2] [--json]
+
+Each mode runs the real app in a fresh process and database. --users threads log in
+--rounds times each, all at once, while a probe thread keeps calling GET /api/auth/check
+(no hashing) to show what the burst does to unrelated requests on the same worker:
+  inline -> PASSWORD_HASH_WORKERS=0, PBKDF2 on the request thread (the old behaviour)
+  pool   -> PASSWORD_HASH_WORKERS=--workers, hashing on the process pool
+  queue  -> the pool with PASSWORD_HASH_MAX_PENDING=--workers: logins past the
+            queue-depth limit get 503 + Retry-After instead of waiting
+The users' hashes use PASSWORD_HASH_METHOD (werkzeug's pbkdf2:sha256 default unless set).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def summarize(samples):
+    if not samples:
+        return {"count": 0}
+    samples = sorted(samples)
+    return {
+        "count": len(samples),
+        "mean_ms": round(statistics.fmean(samples), 1),
+        "p50_ms": round(samples[len(samples) // 2], 1),
+        "p95_ms": round(samples[int(len(samples) * 0.95)], 1),
+        "max_ms": round(samples[-1], 1),
+    }
+
+def run_child(users, rounds):
+    sys.path.insert(0, BACKEND_DIR)
+    os.chdir(BACKEND_DIR)
+    from sqlalchemy import text
+    import app as appmod
+    import passwords
+
+    flask_app = appmod.create_app()
+
+    # One hash for every account: the benchmark is about verifying, not seeding
+    shared_hash = passwords.PasswordHasher(workers=0).hash("bench.pass")
+    with appmod.conn.connect() as connection:
+        connection.execute(
+            text("INSERT INTO users (username, password, role, full_name, is_first_login) VALUES (:u, :pw, 'teller', 'Bench', 0)"),
+            [{"u": f"bench.{n}", "pw": shared_hash} for n in range(users)]
+        )
+        connection.commit()
+
+    logins, busy, probes = [], [], []
+    lock = threading.Lock()
+    done = threading.Event()
+    start_gate = threading.Barrier(users + 1)
+
+    def teller(n):
+        client = flask_app.test_client()
+        start_gate.wait()
+        for _ in range(rounds):
+            start = time.perf_counter()
+            response = client.post("/api/login", json={"username": f"bench.{n}", "password": "bench.pass"})
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                if response.status_code == 503:
+                    busy.append(elapsed)
+                elif response.get_json().get("success"):
+                    logins.append(elapsed)
+                else:
+                    raise RuntimeError(f"login failed: {response.get_json()}")
+            client.post("/api/logout")
+
+    def probe():
+        client = flask_app.test_client()
+        while not done.is_set():
+            start = time.perf_counter()
+            client.get("/api/auth/check")
+            probes.append((time.perf_counter() - start) * 1000)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=teller, args=(n,)) for n in range(users)]
+    prober = threading.Thread(target=probe)
+    for t in threads:
+        t.start()
+    prober.start()
+    wall_start = time.perf_counter()
+    start_gate.wait()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - wall_start
+    done.set()
+    prober.join()
+
+    print(json.dumps({
+        "login": summarize(logins),
+        "busy_503": len(busy),
+        "probe": summarize(probes),
+        "wall_s": round(wall, 2),
+    }))
+
+def run_mode(mode, users, rounds, workers):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            DATABASE_PATH=os.path.join(tmp, "bench.db"),
+            ID_IMAGE_DIR=os.path.join(tmp, "id_images"),
+            SESSION_BACKEND="memory",
+            EMAIL_WORKERS="0",
+            PASSWORD_HASH_WORKERS="0" if mode == "inline" else str(workers),
+            PASSWORD_HASH_MAX_PENDING=str(workers) if mode == "queue" else str(users * rounds),
+        )
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", "--users", str(users), "--rounds", str(rounds)],
+            env=env, check=True, capture_output=True, text=True
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=8, help="concurrent logins")
+    parser.add_argument("--rounds", type=int, default=3, help="logins per user")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1), help="hashing pool size")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.users, args.rounds)
+        sys.exit(0)
+
+    results = {mode: run_mode(mode, args.users, args.rounds, args.workers) for mode in ("inline", "pool", "queue")}
+    if args.json:
+        print(json.dumps(results, indent=2))
+        sys.exit(0)
+
+    print(f"{args.users} concurrent users x {args.rounds} logins, pool of {args.workers}, {os.cpu_count()} CPU(s)\n")
+    print(f"{'mode':<8}{'login p50':>11}{'p95':>9}{'max':>9}{'503s':>6}{'probe p50':>11}{'p95':>9}{'max':>9}{'wall s':>8}")
+    for mode, r in results.items():
+        login, probe = r["login"], r["probe"]
+        print(f"{mode:<8}{login.get('p50_ms', '-'):>11}{login.get('p95_ms', '-'):>9}{login.get('max_ms', '-'):>9}{r['busy_503']:>6}"
+              f"{probe.get('p50_ms', '-'):>11}{probe.get('p95_ms', '-'):>9}{probe.get('max_ms', '-'):>9}{r['wall_s']:>8}")
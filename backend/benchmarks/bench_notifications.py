@@ -0,0 +1,131 @@
+"""
+Request latency of the teller/manager actions that send applicant email.
+
+    python benchmarks/bench_notifications.py [--requests 200] [--provider-latency 0.25] [--json]
+
+Each mode runs the real app in a fresh process and database, submits --requests
+applications and approves them, and records per-request latency:
+  off     -> EMAIL_NOTIFICATIONS=0, no email at all
+  outbox  -> the shipped path: outbox row in the request, stub provider called by workers
+  inline  -> what a provider call inside the request would cost (stub called synchronously)
+For "outbox", drain_s is how long the workers took to send everything after the last request.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+APPLICATION = {
+    "first_name": "Bench", "last_name": "Applicant", "date_of_birth": "1990-01-01", "gender": "Female",
+    "civil_status": "Single", "email": "bench@example.com", "phone_number": "0917", "address": "Cebu",
+    "id_type": "Passport", "id_image_data": "", "employment_status": "Employed", "monthly_revenue": 50000,
+    "credit_score": 700, "loan_amount": 15000, "loan_purpose": "Business", "repayment_period": 3,
+    "payment_schedule": "Monthly", "disbursement_method": "Cash", "account_number": "",
+}
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "mean_ms": round(statistics.fmean(samples), 2),
+        "p50_ms": round(samples[len(samples) // 2], 2),
+        "p95_ms": round(samples[int(len(samples) * 0.95)], 2),
+    }
+
+def run_child(mode, n):
+    sys.path.insert(0, BACKEND_DIR)
+    os.chdir(BACKEND_DIR)
+    from sqlalchemy import text
+    from werkzeug.security import generate_password_hash
+    import app as appmod
+    import notifications
+
+    flask_app = appmod.create_app()
+
+    if mode == "inline":
+        # Model a synchronous provider call made from inside the request
+        queue_notice = notifications.enqueue_loan_notice
+        def enqueue_and_send(connection, loan_id, event, **context):
+            outbox_id = queue_notice(connection, loan_id, event, **context)
+            appmod.outbox.provider.send_batch([{"recipient": "bench@example.com", "subject": event, "html": ""}])
+            return outbox_id
+        notifications.enqueue_loan_notice = enqueue_and_send
+
+    with appmod.conn.connect() as connection:
+        connection.execute(
+            text("INSERT INTO users (username, password, role, full_name, is_first_login) VALUES ('bench.mgr', :pw, 'manager', 'Bench', 0)"),
+            {"pw": generate_password_hash("bench")}
+        )
+        connection.commit()
+
+    client = flask_app.test_client()
+    client.post("/api/login", json={"username": "bench.mgr", "password": "bench"})
+
+    def timed(path, payload):
+        start = time.perf_counter()
+        response = client.post(path, json=payload)
+        elapsed = (time.perf_counter() - start) * 1000
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} returned {response.status_code}: {response.get_data(as_text=True)}")
+        return elapsed
+
+    submit = [timed("/api/loan-status-notification", APPLICATION) for _ in range(n)]
+    approve = [timed("/api/loans/approve-stage", {"loan_id": loan_id}) for loan_id in range(1, n + 1)]
+    result = {"submit": summarize(submit), "approve": summarize(approve)}
+
+    if mode == "outbox":
+        start = time.perf_counter()
+        while notifications.outbox_stats(appmod.conn).get("sent", 0) < 2 * n:
+            time.sleep(0.05)
+        result["drain_s"] = round(time.perf_counter() - start, 2)
+        result["provider_calls"] = appmod.outbox.provider.calls
+    print(json.dumps(result))
+
+def run_mode(mode, n, provider_latency):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            DATABASE_PATH=os.path.join(tmp, "bench.db"),
+            ID_IMAGE_DIR=os.path.join(tmp, "id_images"),
+            SESSION_BACKEND="memory",
+            EMAIL_NOTIFICATIONS="0" if mode == "off" else "1",
+            EMAIL_PROVIDER="stub",
+            EMAIL_STUB_LATENCY=str(provider_latency),
+            EMAIL_WORKERS="0" if mode == "off" else "2",
+            EMAIL_RATE_PER_SECOND="2",
+        )
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", mode, "--requests", str(n)],
+            env=env, check=True, capture_output=True, text=True
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--provider-latency", type=float, default=0.25, help="seconds per stub provider call")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.requests)
+        sys.exit(0)
+
+    results = {mode: run_mode(mode, args.requests, args.provider_latency) for mode in ("off", "outbox", "inline")}
+    if args.json:
+        print(json.dumps(results, indent=2))
+        sys.exit(0)
+
+    print(f"{'mode':<8}{'route':<9}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for mode, r in results.items():
+        for route in ("submit", "approve"):
+            s = r[route]
+            print(f"{mode:<8}{route:<9}{s['mean_ms']:>10}{s['p50_ms']:>10}{s['p95_ms']:>10}")
+    print(f"\noutbox drained {2 * args.requests} emails in {results['outbox']['drain_s']}s "
+          f"using {results['outbox']['provider_calls']} provider calls")
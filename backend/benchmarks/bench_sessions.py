@@ -0,0 +1,97 @@
+"""
+Per-request session overhead: filesystem (Flask-Session) vs sqlite vs memory.
+
+    python benchmarks/bench_sessions.py [--requests 2000] [--json]
+
+Each backend serves two routes through the Flask test client: one that only reads
+the session (the common authenticated request) and one that writes to it.
+Overhead is measured against the same route on an app with no server-side store.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, session
+import database
+import migrate
+import session_store
+
+def build_app(backend, tmp):
+    app = Flask(__name__)
+    app.config["SECRET_KEY"] = "bench"
+    app.config["SESSION_PERMANENT"] = False
+    app.config["SESSION_FILE_DIR"] = os.path.join(tmp, "flask_session")
+
+    engine = database.create_db_engine(os.path.join(tmp, "bench.db"))
+    migrate.apply_migrations(engine, verbose=False)
+    if backend != "baseline":
+        session_store.init_app(app, engine, backend)
+
+    @app.route("/login")
+    def login():
+        session["username"] = "teller.1"
+        session["role"] = "teller"
+        session["full_name"] = "Bench Teller"
+        return "ok"
+
+    @app.route("/read")
+    def read():
+        return session.get("role", "")
+
+    @app.route("/write")
+    def write():
+        session["last_seen"] = time.time()
+        return "ok"
+
+    return app
+
+def time_requests(client, path, n):
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        client.get(path)
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return {
+        "mean_us": round(statistics.fmean(samples), 1),
+        "p50_us": round(samples[len(samples) // 2], 1),
+        "p95_us": round(samples[int(len(samples) * 0.95)], 1),
+    }
+
+def run(n):
+    results = {}
+    # "baseline" keeps Flask's signed-cookie session: no server-side I/O at all
+    for backend in ("baseline", "filesystem", "sqlite", "memory"):
+        with tempfile.TemporaryDirectory() as tmp:
+            app = build_app(backend, tmp)
+            client = app.test_client()
+            client.get("/login")
+            results[backend] = {
+                "read": time_requests(client, "/read", n),
+                "write": time_requests(client, "/write", n),
+            }
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    results = run(args.requests)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        sys.exit(0)
+
+    print(f"{'backend':<12}{'route':<8}{'mean us':>10}{'p50 us':>10}{'p95 us':>10}{'overhead us':>14}")
+    for backend, routes in results.items():
+        for route in ("read", "write"):
+            r = routes[route]
+            overhead = round(r["mean_us"] - results["baseline"][route]["mean_us"], 1)
+            print(f"{backend:<12}{route:<8}{r['mean_us']:>10}{r['p50_us']:>10}{r['p95_us']:>10}{overhead:>14}")
@@ -0,0 +1,99 @@
+"""
+Startup time and throughput scaling of the pre-forking server (serve.py) from 1 to N workers.
+
+    python benchmarks/bench_workers.py --db PATH [--workers 1,2,4] [--concurrency 32] [--duration 20] [--json]
+
+Seed the database first (python seed_portfolio.py --loans 100000 --db PATH; staff passwords
+equal their usernames).
+  startup -> `import app` and create_app() timed in fresh interpreters (median of --repeat),
+             i.e. what the master pays once and what each forked worker pays
+  scaling -> for each worker count, serve.py is started on a free port: time until the
+             first worker answers and until every worker logged "ready", then the
+             bench_async.py load (--concurrency clients on the loan routes) for --duration
+--workers defaults to 1, 2, 4... up to the CPU count. The load generator runs on the same
+machine, so it takes CPU from the server: compare the curve, not the absolute numbers.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_async import BACKEND_DIR, drive, free_port, sample_loans, wait_until_up
+
+STARTUP_SCRIPT = """
+import json, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app({"RUN_MIGRATIONS": False})
+print(json.dumps({"import_ms": (imported - started) * 1000, "create_app_ms": (time.perf_counter() - imported) * 1000}))
+"""
+
+def measure_startup(db_path, repeat):
+    env = dict(os.environ, DATABASE_PATH=db_path, EMAIL_WORKERS="0")
+    runs = [
+        json.loads(subprocess.run(
+            [sys.executable, "-c", STARTUP_SCRIPT], cwd=BACKEND_DIR, env=env, check=True, capture_output=True, text=True
+        ).stdout.strip().splitlines()[-1])
+        for _ in range(repeat)
+    ]
+    return {key: round(statistics.median(run[key] for run in runs), 1) for key in ("import_ms", "create_app_ms")}
+
+def run_workers(workers, args, loan_ids):
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, DATABASE_PATH=os.path.abspath(args.db), EMAIL_WORKERS="0", PORT=str(port), WEB_CONCURRENCY=str(workers))
+    with tempfile.TemporaryFile(mode="w+") as log:
+        started = time.monotonic()
+        process = subprocess.Popen([sys.executable, "serve.py"], cwd=BACKEND_DIR, env=env, stdout=log, stderr=log)
+        try:
+            wait_until_up(base_url, process)
+            first_ready = time.monotonic() - started
+            while True:
+                log.seek(0)
+                if log.read().count(" ready: app built") >= workers:
+                    break
+                time.sleep(0.05)
+            all_ready = time.monotonic() - started
+            result = drive(base_url, args, loan_ids)
+        finally:
+            process.terminate()
+            process.wait()
+    return {"workers": workers, "first_ready_s": round(first_ready, 2), "all_ready_s": round(all_ready, 2), **result}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", required=True, help="seeded database file")
+    parser.add_argument("--workers", help="comma-separated worker counts (default 1, 2, 4... up to the CPU count)")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=20, help="seconds per worker count")
+    parser.add_argument("--repeat", type=int, default=5, help="interpreters started for the startup timings")
+    parser.add_argument("--user", default="manager.1", help="manager account to log in as")
+    parser.add_argument("--password", help="defaults to the username (seed_portfolio accounts)")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    if args.workers:
+        counts = [int(n) for n in args.workers.split(",")]
+    else:
+        counts = sorted({min(2 ** n, cpus) for n in range(cpus.bit_length() + 1)})
+
+    loan_ids = sample_loans(args.db)
+    startup = measure_startup(os.path.abspath(args.db), args.repeat)
+    scaling = [run_workers(n, args, loan_ids) for n in counts]
+    if args.json:
+        print(json.dumps({"startup": startup, "scaling": scaling}, indent=2))
+        sys.exit(0)
+
+    print(f"import app: {startup['import_ms']} ms (once, in the master)   create_app(): {startup['create_app_ms']} ms (per worker)\n")
+    print(f"{args.concurrency} concurrent clients, {args.duration:g}s per run, {cpus} CPU(s)\n")
+    print(f"{'workers':<9}{'first up s':>11}{'all up s':>10}{'requests':>10}{'errors':>8}{'req/s':>9}{'speedup':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    base_rps = scaling[0]["rps"] or 1
+    for r in scaling:
+        print(f"{r['workers']:<9}{r['first_ready_s']:>11}{r['all_ready_s']:>10}{r['requests']:>10}{r['errors']:>8}{r['rps']:>9}"
+              f"{r['rps'] / base_rps:>8.2f}x{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}")
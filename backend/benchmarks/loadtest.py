@@ -0,0 +1,271 @@
+"""
+HTTP load test of the loan lifecycle against a running instance.
+
+    python benchmarks/loadtest.py [--base-url http://127.0.0.1:5000] [--users 8] [--duration 60]
+                                  [--out run.json] [--compare baseline.json] [--max-regression 0.2]
+
+Start the server on a seeded database first (python seed_user.py, then python app.py or the
+production server). Using the admin account, the harness creates one manager account per
+virtual user (loadtest.<n>). Each virtual user logs in and then loops through this lifecycle:
+check eligibility -> submit -> list applications -> approve -> disburse -> view loan ->
+post payments -> view payments -> list loans -> dashboard.
+
+Reports count, errors, throughput and p50/p95/p99 latency per route (the Flask URL rule).
+--out writes the report as JSON. --compare exits 1 when a route's p95 is more than
+--max-regression slower than the baseline report.
+"""
+import argparse
+import http.client
+import json
+import math
+import sys
+import threading
+import time
+import uuid
+from datetime import date
+from urllib.parse import urlsplit
+
+APPLICATION = {
+    "first_name": "Load", "middle_name": "", "date_of_birth": "1990-01-01", "gender": "Female",
+    "civil_status": "Single", "email": "loadtest@example.com", "phone_number": "09170000000",
+    "address": "Cebu City", "id_type": "Passport", "id_image_data": "", "employment_status": "Employed",
+    "monthly_revenue": 80000, "loan_amount": 15000, "loan_purpose": "Business", "repayment_period": 3,
+    "payment_schedule": "Monthly", "disbursement_method": "Cash", "account_number": "",
+}
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def add(self, route, elapsed_ms, ok):
+        with self._lock:
+            self.samples.setdefault(route, []).append(elapsed_ms)
+            if not ok:
+                self.errors[route] = self.errors.get(route, 0) + 1
+
+    def report(self, wall_seconds):
+        routes = {}
+        for route, samples in sorted(self.samples.items()):
+            samples = sorted(samples)
+            routes[route] = {
+                "count": len(samples),
+                "errors": self.errors.get(route, 0),
+                "rps": round(len(samples) / wall_seconds, 2),
+                "mean_ms": round(sum(samples) / len(samples), 2),
+                "p50_ms": round(percentile(samples, 0.50), 2),
+                "p95_ms": round(percentile(samples, 0.95), 2),
+                "p99_ms": round(percentile(samples, 0.99), 2),
+                "max_ms": round(samples[-1], 2),
+            }
+        return routes
+
+def percentile(sorted_samples, p):
+    '''Nearest-rank percentile'''
+    return sorted_samples[max(0, math.ceil(p * len(sorted_samples)) - 1)]
+
+class Client:
+    '''One virtual user: a keep-alive connection and its own session cookie'''
+    def __init__(self, base_url, recorder):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or (443 if parts.scheme == "https" else 80)
+        self.https = parts.scheme == "https"
+        self.recorder = recorder
+        self.cookies = {}
+        self.connection = None
+
+    def _connect(self):
+        cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        self.connection = cls(self.host, self.port, timeout=60)
+
+    def request(self, method, path, route, payload=None):
+        '''Sends one request and records it under `route`. Returns (status, parsed JSON or None).'''
+        headers = {"Accept": "application/json"}
+        body = None
+        if payload is not None:
+            body = json.dumps(payload)
+            headers["Content-Type"] = "application/json"
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+
+        start = time.perf_counter()
+        for attempt in (1, 2):
+            try:
+                if self.connection is None:
+                    self._connect()
+                self.connection.request(method, path, body=body, headers=headers)
+                response = self.connection.getresponse()
+                data = response.read()
+                break
+            except (http.client.HTTPException, ConnectionError, OSError):
+                # The server closed an idle keep-alive connection; reconnect once
+                self.connection = None
+                if attempt == 2:
+                    self.recorder.add(route, (time.perf_counter() - start) * 1000, False)
+                    return 0, None
+        elapsed = (time.perf_counter() - start) * 1000
+
+        if response.getheader("Connection", "").lower() == "close" or response.version == 10:
+            self.connection.close()
+            self.connection = None
+        for header, value in response.getheaders():
+            if header.lower() == "set-cookie":
+                name, _, rest = value.partition("=")
+                cookie_value = rest.split(";", 1)[0]
+                if cookie_value and "max-age=0" not in value.lower():
+                    self.cookies[name] = cookie_value
+                else:
+                    self.cookies.pop(name, None)
+
+        try:
+            parsed = json.loads(data) if data else None
+        except ValueError:
+            parsed = None
+        # Several routes report failure as 200 + {"success": false}
+        ok = response.status < 400 and not (isinstance(parsed, dict) and parsed.get("success") is False)
+        self.recorder.add(route, elapsed, ok)
+        return response.status, parsed
+
+# --- SCENARIO ---
+
+def lifecycle(client, run_id, vu, iteration, payments):
+    applicant = dict(APPLICATION, last_name=f"LT-{run_id}-{vu}-{iteration}")
+
+    _, check = client.request("POST", "/api/check-eligibility", "POST /api/check-eligibility", applicant)
+    if not check or check.get("status") != "Approved":
+        return
+    applicant["credit_score"] = check["credit_score"]
+    client.request("POST", "/api/loan-status-notification", "POST /api/loan-status-notification", applicant)
+
+    # Submission does not return the id; find it in the review queue (newest Pending first)
+    _, queue = client.request("GET", "/api/applications?limit=100", "GET /api/applications")
+    name = f"{applicant['first_name']} {applicant['last_name']}"
+    loan_id = next((row["loan_id"] for row in queue or [] if row["applicant_name"] == name), None)
+    if loan_id is None:
+        return
+
+    client.request("POST", "/api/loans/approve-stage", "POST /api/loans/approve-stage", {"loan_id": loan_id})
+    client.request("POST", "/api/loans/disburse", "POST /api/loans/disburse",
+                   {"loan_id": loan_id, "release_date": date.today().isoformat()})
+
+    _, loan = client.request("GET", f"/api/loans/{loan_id}", "GET /api/loans/<id>")
+    due_amount = (loan or {}).get("due_amount") or 0
+    for _ in range(payments):
+        if due_amount <= 0:
+            break
+        client.request("POST", "/api/loans/payment", "POST /api/loans/payment", {"loan_id": loan_id, "amount": due_amount})
+
+    client.request("GET", f"/api/payments/{loan_id}", "GET /api/payments/<loan_id>")
+    client.request("GET", "/api/loans?limit=50", "GET /api/loans")
+    client.request("GET", "/api/dashboard-stats", "GET /api/dashboard-stats")
+
+def create_accounts(base_url, admin_user, admin_password, users, password):
+    admin = Client(base_url, Recorder())
+    _, login = admin.request("POST", "/api/login", "setup", {"username": admin_user, "password": admin_password})
+    if not login or not login.get("success"):
+        raise SystemExit(f"Admin login failed: {login}")
+    for vu in range(users):
+        status, body = admin.request("POST", "/api/users", "setup", {
+            "username": f"loadtest.{vu}", "password": password, "role": "manager", "full_name": f"Load Test {vu}"
+        })
+        if status not in (201, 409):
+            raise SystemExit(f"Could not create loadtest.{vu}: {status} {body}")
+
+def run(args):
+    create_accounts(args.base_url, args.admin_user, args.admin_password, args.users, args.password)
+
+    recorder = Recorder()
+    run_id = uuid.uuid4().hex[:6]
+    deadline = time.monotonic() + args.duration
+    iterations = [0] * args.users
+
+    def virtual_user(vu):
+        client = Client(args.base_url, recorder)
+        client.request("POST", "/api/login", "POST /api/login", {"username": f"loadtest.{vu}", "password": args.password})
+        while time.monotonic() < deadline and (not args.iterations or iterations[vu] < args.iterations):
+            lifecycle(client, run_id, vu, iterations[vu], args.payments)
+            iterations[vu] += 1
+            if args.think_time:
+                time.sleep(args.think_time)
+        client.request("POST", "/api/logout", "POST /api/logout")
+
+    started = time.time()
+    threads = [threading.Thread(target=virtual_user, args=(vu,)) for vu in range(args.users)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.time() - started
+
+    routes = recorder.report(wall)
+    total = sum(r["count"] for r in routes.values())
+    return {
+        "meta": {
+            "base_url": args.base_url,
+            "users": args.users,
+            "duration_s": round(wall, 2),
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started)),
+            "lifecycles": sum(iterations),
+        },
+        "total": {
+            "count": total,
+            "errors": sum(r["errors"] for r in routes.values()),
+            "rps": round(total / wall, 2),
+        },
+        "routes": routes,
+    }
+
+def compare(report, baseline, max_regression):
+    '''Returns the routes whose p95 regressed beyond max_regression (as a fraction)'''
+    regressions = []
+    for route, current in report["routes"].items():
+        before = baseline.get("routes", {}).get(route)
+        if not before or not before["p95_ms"]:
+            continue
+        change = (current["p95_ms"] - before["p95_ms"]) / before["p95_ms"]
+        if change > max_regression:
+            regressions.append((route, before["p95_ms"], current["p95_ms"], change))
+    return regressions
+
+def print_report(report):
+    print(f"{'route':<40}{'count':>7}{'err':>5}{'rps':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for route, r in report["routes"].items():
+        print(f"{route:<40}{r['count']:>7}{r['errors']:>5}{r['rps']:>8}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}")
+    t = report["total"]
+    print(f"\n{report['meta']['lifecycles']} lifecycles, {t['count']} requests, {t['errors']} errors, "
+          f"{t['rps']} req/s over {report['meta']['duration_s']}s with {report['meta']['users']} users")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:5000")
+    parser.add_argument("--users", type=int, default=8, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60, help="seconds to run")
+    parser.add_argument("--iterations", type=int, default=0, help="stop each user after N lifecycles (0 = until --duration)")
+    parser.add_argument("--payments", type=int, default=2, help="installments paid per loan")
+    parser.add_argument("--think-time", type=float, default=0, help="pause between lifecycles (seconds)")
+    parser.add_argument("--admin-user", default="admin.jay")
+    parser.add_argument("--admin-password", default="admin.jay")
+    parser.add_argument("--password", default="loadtest.pass", help="password for the loadtest.<n> accounts")
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--compare", help="baseline JSON report to check against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed p95 slowdown per route (0.2 = 20%%)")
+    parser.add_argument("--json", action="store_true", help="print the JSON report instead of the table")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.max_regression)
+        for route, before, after, change in regressions:
+            print(f"REGRESSION {route}: p95 {before} ms -> {after} ms (+{change:.0%})")
+        print("--- No p95 regressions ---" if not regressions else f"--- {len(regressions)} route(s) regressed ---")
+        sys.exit(1 if regressions else 0)
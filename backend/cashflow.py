@@ -0,0 +1,298 @@
+"""
+Monte Carlo cash-flow simulation of the active book (every Approved loan).
+
+    python cashflow.py [--scenarios 1000] [--seed 42] [--workers N] [--as-of YYYY-MM-DD] [--db PATH] [--json]
+
+Loads each loan's open installments, current balance, credit score and days past due
+into arrays, runs --scenarios repayment/default scenarios and prints the percentile
+curve of monthly collections, plus total collections, losses and defaults. The same
+--seed gives the same result for any --workers. Also served at
+GET /api/portfolio/cashflow-simulation (manager).
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from statistics import NormalDist
+import numpy as np
+from sqlalchemy import text
+import aging
+import procpool
+
+# Model, per scenario:
+#   - one systemic factor Z ~ N(0, 1) moves every loan's default rate together
+#     (one-factor Gaussian copula): p(Z) = N((N^-1(p) + sqrt(rho) * Z) / sqrt(1 - rho)),
+#     so bad scenarios default together while the average stays at p
+#   - p is a monthly default rate per credit score band, times a multiplier for how far
+#     behind the loan already is (the aging.py buckets, from loan_details.next_due)
+#   - each loan draws the month it defaults in (geometric in p(Z)); it pays every open
+#     installment due before that month and nothing from then on, with no recoveries
+#   - installments already overdue are counted in the as_of month
+# The rates are placeholders until they are calibrated on the book's own default history.
+
+DEFAULT_RATE_BANDS = ((740, 0.002), (670, 0.005), (580, 0.012), (0, 0.030))  # (min credit score, monthly rate)
+DELINQUENCY_MULTIPLIERS = {"current": 1.0, "1-30": 2.0, "31-60": 4.0, "61-90": 8.0, "90+": 12.0}
+SYSTEMIC_CORRELATION = 0.15
+DEFAULT_PERCENTILES = (5, 50, 95)
+
+# Scenario x (loan, month) cells simulated at once: bounds the memory of one chunk (~100 MB)
+CHUNK_CELLS = 4_000_000
+
+BOOK_LOANS_SQL = """
+    SELECT l.loan_id, a.credit_score, ld.balance, ld.next_due
+    FROM loans l
+    JOIN loan_details ld ON ld.loan_id = l.loan_id AND ld.is_current = 1
+    LEFT JOIN applicants a ON a.applicant_id = l.applicant_id
+    WHERE l.status = 'Approved'
+"""
+
+BOOK_INSTALLMENTS_SQL = """
+    SELECT s.loan_id, s.due_date, s.amount_due - s.amount_paid
+    FROM loans l
+    JOIN loan_schedules s ON s.loan_id = l.loan_id
+    WHERE l.status = 'Approved' AND s.status != 'Paid'
+"""
+
+_normal = NormalDist()
+_normal_cdf = np.vectorize(_normal.cdf, otypes=[float])
+
+# --- LOADING ---
+def as_days(values):
+    '''Date / timestamp strings (or None) -> datetime64[D], NaT for None'''
+    return np.array([str(v)[:10] if v else "NaT" for v in values], dtype="datetime64[D]")
+
+def hazard_classes(credit_scores, days_past_due):
+    '''(class per loan, monthly default rate per class): score band x aging bucket'''
+    band = np.full(len(credit_scores), len(DEFAULT_RATE_BANDS) - 1)
+    for i in range(len(DEFAULT_RATE_BANDS) - 1, -1, -1):
+        band[credit_scores >= DEFAULT_RATE_BANDS[i][0]] = i  # NaN (no score) stays in the last band
+    uppers = [upper for _, upper in aging.BUCKETS if upper is not None]
+    bucket = np.searchsorted(uppers, days_past_due, side="left")
+    rates = np.array([rate * DELINQUENCY_MULTIPLIERS[name] for _, rate in DEFAULT_RATE_BANDS for name, _ in aging.BUCKETS])
+    return band * len(aging.BUCKETS) + bucket, np.minimum(rates, 0.99)
+
+def load_book(connection, as_of):
+    '''Approved loans and their open installments as arrays, installments summed per loan and month'''
+    loans = connection.execute(text(BOOK_LOANS_SQL)).fetchall()
+    loan_ids = np.array([row[0] for row in loans], dtype=np.int64)
+    credit_scores = np.array([np.nan if row[1] is None else row[1] for row in loans], dtype=float)
+    balances = np.array([row[2] or 0 for row in loans], dtype=float)
+    next_due = as_days(row[3] for row in loans)
+    days_past_due = (np.datetime64(as_of, "D") - next_due).astype(np.int64)
+    days_past_due[np.isnat(next_due)] = 0
+    loan_class, class_rates = hazard_classes(credit_scores, days_past_due)
+
+    installments = connection.execute(text(BOOK_INSTALLMENTS_SQL)).fetchall()
+    order = np.argsort(loan_ids)
+    inst_loan_ids = np.array([row[0] for row in installments], dtype=np.int64)
+    position = np.minimum(np.searchsorted(loan_ids[order], inst_loan_ids), max(len(loan_ids) - 1, 0))
+    known = loan_ids[order][position] == inst_loan_ids if len(loan_ids) else np.zeros(len(inst_loan_ids), dtype=bool)
+    inst_loan = order[position][known]
+    due = as_days(row[1] for row in installments)[known]
+    month = np.maximum((due.astype("datetime64[M]") - np.datetime64(as_of, "M")).astype(np.int64), 0)
+    amount = np.array([row[2] or 0 for row in installments], dtype=float)[known]
+
+    # One cell per (loan, month): weekly loans have several installments a month
+    months = int(month.max()) + 1 if len(month) else 0
+    keys, cell_index = np.unique(inst_loan * max(months, 1) + month, return_inverse=True)
+    cell_amount = np.bincount(cell_index, weights=amount, minlength=len(keys))
+    cell_loan, cell_month = keys // max(months, 1), keys % max(months, 1)
+    by_month = np.argsort(cell_month, kind="stable")
+    cell_loan, cell_month, cell_amount = cell_loan[by_month], cell_month[by_month], cell_amount[by_month]
+
+    last_month = np.full(len(loan_ids), -1)
+    np.maximum.at(last_month, cell_loan, cell_month)
+    return {
+        "as_of": as_of,
+        "loan_ids": loan_ids,
+        "balance": balances,
+        "loan_class": loan_class,
+        "class_rates": class_rates,
+        "last_month": last_month,
+        "cell_loan": cell_loan,
+        "cell_month": cell_month,
+        "cell_amount": cell_amount,
+        "month_bounds": np.searchsorted(cell_month, np.arange(months + 1)),
+        "installments": len(inst_loan),
+    }
+
+# --- SIMULATION ---
+def conditional_rates(class_rates, factors, correlation=SYSTEMIC_CORRELATION):
+    '''Monthly default rate per scenario (rows) and class (columns) given the systemic factor'''
+    thresholds = np.array([_normal.inv_cdf(p) for p in class_rates])
+    return _normal_cdf((thresholds[None, :] + math.sqrt(correlation) * factors[:, None]) / math.sqrt(1 - correlation))
+
+def simulate_chunk(seed_sequence, scenarios, book=None, correlation=SYSTEMIC_CORRELATION):
+    '''(collections per scenario and month, defaulted loans per scenario) for one chunk'''
+    book = _worker_book if book is None else book
+    rng = np.random.default_rng(seed_sequence)
+    rates = conditional_rates(book["class_rates"], rng.standard_normal(scenarios), correlation)[:, book["loan_class"]]
+    with np.errstate(divide="ignore"):
+        # Month of default, geometric in the monthly rate (u == 0 -> never)
+        default_month = np.floor(np.log(rng.random(rates.shape)) / np.log1p(-rates))
+
+    paid = book["cell_month"] < default_month[:, book["cell_loan"]]
+    collected = np.cumsum(paid * book["cell_amount"], axis=1)
+    ends = book["month_bounds"][1:]
+    at_month_end = np.where(ends > 0, collected[:, np.maximum(ends - 1, 0)], 0.0)
+    monthly = np.diff(at_month_end, axis=1, prepend=0.0)
+    defaults = (default_month <= book["last_month"]).sum(axis=1)
+    return monthly, defaults
+
+_worker_book = None
+
+def _start_worker(parent_pid, book):
+    global _worker_book
+    procpool.detach_from_server(parent_pid)
+    _worker_book = book
+
+def chunk_plan(book, scenarios, seed):
+    '''[(seed sequence, scenarios)]: fixed by the book and seed alone, not by the worker count'''
+    per_chunk = max(1, CHUNK_CELLS // max(len(book["cell_amount"]), 1))
+    sizes = [min(per_chunk, scenarios - start) for start in range(0, scenarios, per_chunk)]
+    return list(zip(np.random.SeedSequence(seed).spawn(len(sizes)), sizes))
+
+def run_scenarios(book, scenarios, seed=42, workers=1):
+    '''(collections: scenarios x months, defaults: scenarios), chunks spread over a process pool'''
+    plan = chunk_plan(book, scenarios, seed)
+    workers = min(workers, len(plan))
+    if workers <= 1:
+        results = [simulate_chunk(seed_sequence, size, book) for seed_sequence, size in plan]
+    else:
+        # fork: workers inherit the book instead of unpickling a copy each
+        with ProcessPoolExecutor(max_workers=workers, mp_context=procpool.fork_context(),
+                                 initializer=_start_worker, initargs=(os.getpid(), book)) as pool:
+            results = list(pool.map(simulate_chunk, *zip(*plan)))
+    months = len(book["month_bounds"]) - 1
+    collections = np.concatenate([r[0] for r in results]) if results else np.zeros((0, months))
+    defaults = np.concatenate([r[1] for r in results]) if results else np.zeros(0)
+    return collections, defaults
+
+# --- SUMMARY ---
+def spread(values, percentiles, axis=None):
+    '''{"mean": .., "p5": .., ...} of values, rounded to centavos'''
+    summary = {"mean": np.mean(values, axis=axis)}
+    for p, value in zip(percentiles, np.percentile(values, percentiles, axis=axis)):
+        summary[f"p{p:g}"] = value
+    return {key: np.round(value, 2).tolist() for key, value in summary.items()}
+
+def simulate(book, scenarios=1000, seed=42, workers=1, percentiles=DEFAULT_PERCENTILES):
+    '''Percentile cash-flow curves of the book over scenarios'''
+    started = time.perf_counter()
+    collections, defaults = run_scenarios(book, scenarios, seed, workers)
+    months = len(book["month_bounds"]) - 1
+    first_month = np.datetime64(book["as_of"], "M")
+    scheduled = np.bincount(book["cell_month"], weights=book["cell_amount"], minlength=months)
+    total_scheduled = float(scheduled.sum())
+
+    monthly = spread(collections, percentiles, axis=0)
+    cumulative = spread(np.cumsum(collections, axis=1), percentiles, axis=0)
+    curve = [
+        {
+            "month": str(first_month + m),
+            "scheduled": round(float(scheduled[m]), 2),
+            **{key: values[m] for key, values in monthly.items()},
+            "cumulative": {key: values[m] for key, values in cumulative.items()},
+        }
+        for m in range(months)
+    ]
+    collected = collections.sum(axis=1)
+    return {
+        "as_of": book["as_of"].isoformat(),
+        "scenarios": scenarios,
+        "seed": seed,
+        "percentiles": list(percentiles),
+        "book": {
+            "loans": len(book["loan_ids"]),
+            "installments": book["installments"],
+            "balance": round(float(book["balance"].sum()), 2),
+            "scheduled": round(total_scheduled, 2),
+        },
+        "assumptions": {
+            "default_rate_bands": [{"min_credit_score": s, "monthly_rate": r} for s, r in DEFAULT_RATE_BANDS],
+            "delinquency_multipliers": DELINQUENCY_MULTIPLIERS,
+            "systemic_correlation": SYSTEMIC_CORRELATION,
+            "recovery_rate": 0.0,
+        },
+        "months": curve,
+        "totals": {
+            "collected": spread(collected, percentiles),
+            "loss": spread(total_scheduled - collected, percentiles),
+            "defaults": spread(defaults, percentiles),
+        },
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+class SimulationCache:
+    # Loading a large book takes seconds and a simulation longer, so both are kept
+    # until the next payment or release (aging.loan_details_version moves) or a new day
+    def __init__(self, workers=1, max_results=16):
+        self.workers = workers
+        self.max_results = max_results
+        self._key = None
+        self._book = None
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def get(self, conn, as_of, scenarios, seed, percentiles):
+        '''Returns (result, cached)'''
+        # One simulation at a time: each one already uses every worker
+        with self._lock:
+            with conn.connect() as connection:
+                key = (aging.loan_details_version(connection), as_of)
+                if self._key != key:
+                    self._book = load_book(connection, as_of)
+                    self._key = key
+                    self._results = {}
+            params = (scenarios, seed, tuple(percentiles))
+            cached = params in self._results
+            if not cached:
+                if len(self._results) >= self.max_results:
+                    self._results.pop(next(iter(self._results)))
+                self._results[params] = simulate(self._book, scenarios, seed, self.workers, percentiles)
+            return self._results[params], cached
+
+def cache_from_env():
+    return SimulationCache(workers=int(os.getenv("CASHFLOW_SIM_WORKERS", os.cpu_count() or 1)))
+
+if __name__ == "__main__":
+    import database
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes (default: one per core)")
+    parser.add_argument("--percentiles", default=",".join(map(str, DEFAULT_PERCENTILES)))
+    parser.add_argument("--as-of", type=date.fromisoformat, default=date.today(), help="YYYY-MM-DD (default today)")
+    parser.add_argument("--db", default=None, help="database file (default: DATABASE_PATH / database.db)")
+    parser.add_argument("--json", action="store_true", help="print the full result as JSON")
+    args = parser.parse_args()
+
+    engine = database.create_db_engine(args.db)
+    started = time.perf_counter()
+    with engine.connect() as connection:
+        book = load_book(connection, args.as_of)
+    loaded = time.perf_counter() - started
+    result = simulate(book, args.scenarios, args.seed, args.workers, [float(p) for p in args.percentiles.split(",")])
+    if args.json:
+        print(json.dumps(result, indent=2))
+        sys.exit(0)
+
+    keys = [f"p{float(p):g}" for p in args.percentiles.split(",")]
+    info = result["book"]
+    print(f"--- {info['loans']:,} loans, {info['installments']:,} open installments, balance {info['balance']:,.2f} "
+          f"(loaded in {loaded:.1f}s) ---")
+    print(f"--- {args.scenarios:,} scenarios on {args.workers} worker(s) in {result['seconds']:.1f}s ---\n")
+    print(f"{'month':<9}{'scheduled':>18}{'mean':>18}" + "".join(f"{k:>18}" for k in keys))
+    for row in result["months"]:
+        print(f"{row['month']:<9}{row['scheduled']:>18,.2f}{row['mean']:>18,.2f}" + "".join(f"{row[k]:>18,.2f}" for k in keys))
+    print()
+    for name, values in result["totals"].items():
+        print(f"{name:<9}{'':>18}{values['mean']:>18,.2f}" + "".join(f"{values[k]:>18,.2f}" for k in keys))
@@ -0,0 +1,133 @@
+import os
+from sqlalchemy import create_engine, event
+
+# One place to build the SQLite engine. Runtime settings come from a named profile
+# (DB_PROFILE) and are applied to every new DBAPI connection through a connect hook.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.getenv("DATABASE_PATH", os.path.join(BASE_DIR, 'database.db'))
+
+PROFILES = {
+    # Local work: WAL so the dev server and scripts do not lock each other out
+    "development": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout_ms": 5000,
+        "cache_size_kib": 16384,
+        "mmap_size": 0,
+        "pool_size": 5,
+        "max_overflow": 10,
+        "pool_timeout": 30,
+    },
+    # Served traffic: WAL + NORMAL is durable across app crashes (an OS crash can only lose
+    # the last commits, never corrupt), a larger page cache and memory-mapped reads
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout_ms": 10000,
+        "cache_size_kib": 65536,
+        "mmap_size": 268435456,
+        "pool_size": 10,
+        "max_overflow": 20,
+        "pool_timeout": 30,
+    },
+    # One-off loaders (synthetic data, backfills): durability traded for speed
+    "bulk": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "busy_timeout_ms": 30000,
+        "cache_size_kib": 262144,
+        "mmap_size": 1073741824,
+        "pool_size": 2,
+        "max_overflow": 0,
+        "pool_timeout": 30,
+    },
+    # SQLite defaults, as the app ran before profiles existed (for benchmarks)
+    "legacy": {
+        "journal_mode": None,
+        "synchronous": None,
+        "busy_timeout_ms": None,
+        "cache_size_kib": None,
+        "mmap_size": None,
+        "pool_size": 5,
+        "max_overflow": 10,
+        "pool_timeout": 30,
+    },
+}
+
+def default_profile():
+    if os.getenv("DB_PROFILE"):
+        return os.getenv("DB_PROFILE")
+    return "production" if os.getenv("FLASK_ENV") == "production" else "development"
+
+def apply_pragmas(dbapi_connection, settings):
+    cursor = dbapi_connection.cursor()
+    try:
+        # busy_timeout first so the journal_mode switch itself waits instead of failing
+        if settings["busy_timeout_ms"] is not None:
+            cursor.execute(f"PRAGMA busy_timeout = {int(settings['busy_timeout_ms'])}")
+        if settings["journal_mode"]:
+            cursor.execute(f"PRAGMA journal_mode = {settings['journal_mode']}")
+        if settings["synchronous"]:
+            cursor.execute(f"PRAGMA synchronous = {settings['synchronous']}")
+        if settings["cache_size_kib"] is not None:
+            # Negative cache_size is in KiB rather than pages
+            cursor.execute(f"PRAGMA cache_size = -{int(settings['cache_size_kib'])}")
+        if settings["mmap_size"] is not None:
+            cursor.execute(f"PRAGMA mmap_size = {int(settings['mmap_size'])}")
+        cursor.execute("PRAGMA temp_store = MEMORY")
+    finally:
+        cursor.close()
+
+def profile_settings(profile=None, echo=None):
+    '''(settings, echo) for a profile name, defaulting both from the environment'''
+    profile = profile or default_profile()
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE '{profile}'. Expected one of: {', '.join(PROFILES)}")
+    if echo is None:
+        echo = os.getenv("DB_ECHO", "").lower() in ("1", "true", "yes")
+    return PROFILES[profile], echo
+
+def create_db_engine(db_path=None, profile=None, echo=None):
+    '''Builds the app's SQLite engine from a named profile (see PROFILES)'''
+    settings, echo = profile_settings(profile, echo)
+
+    engine = create_engine(
+        f"sqlite:///{db_path or DB_PATH}",
+        echo=echo,
+        pool_size=settings["pool_size"],
+        max_overflow=settings["max_overflow"],
+        pool_timeout=settings["pool_timeout"],
+        pool_pre_ping=False,
+        connect_args={"check_same_thread": False},
+    )
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection, settings)
+
+    return engine
+
+def create_async_db_engine(db_path=None, profile=None, echo=None):
+    '''
+    The same database and profile on an aiosqlite engine, for the async app (async_app.py).
+    Each pooled connection runs its queries on its own thread, off the event loop.
+    '''
+    # Only the async serving mode needs aiosqlite
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    settings, echo = profile_settings(profile, echo)
+
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{db_path or DB_PATH}",
+        echo=echo,
+        pool_size=settings["pool_size"],
+        max_overflow=settings["max_overflow"],
+        pool_timeout=settings["pool_timeout"],
+        pool_pre_ping=False,
+    )
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection, settings)
+
+    return engine
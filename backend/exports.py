@@ -0,0 +1,103 @@
+import csv
+import io
+import json
+from datetime import timedelta
+from sqlalchemy import text
+
+# Full-table extracts for reporting, streamed as CSV or NDJSON.
+# Rows come off the cursor CHUNK_SIZE at a time and each chunk is encoded and
+# yielded before the next fetch, so memory stays flat whatever the row count.
+# The connection (and its read snapshot) is held until the last chunk is sent
+# or the client disconnects.
+
+CHUNK_SIZE = 1000
+
+# Each query takes optional :from / :to bounds (ISO strings, NULL = unbounded)
+# on its date column and walks the primary key, so no sort is needed.
+EXPORT_LOANS_SQL = """
+    SELECT
+        l.loan_id, l.applicant_id,
+        a.first_name || ' ' || a.last_name AS applicant_name,
+        l.status, l.loan_purpose, l.principal, l.total_loan, l.payment_amount,
+        l.payment_time_period, l.payment_schedule, l.disbursement_method,
+        l.application_date, l.payment_start_date,
+        ld.balance, ld.due_amount, ld.next_due, ld.payments_remaining,
+        l.remarks
+    FROM loans l
+    LEFT JOIN applicants a ON a.applicant_id = l.applicant_id
+    LEFT JOIN loan_details ld ON ld.loan_id = l.loan_id AND ld.is_current = 1
+    WHERE (:from IS NULL OR l.application_date >= :from)
+      AND (:to IS NULL OR l.application_date < :to)
+    ORDER BY l.loan_id
+"""
+
+EXPORT_PAYMENTS_SQL = """
+    SELECT payment_id, loan_id, amount_paid, transaction_date, remarks, processed_by
+    FROM payments
+    WHERE (:from IS NULL OR transaction_date >= :from)
+      AND (:to IS NULL OR transaction_date < :to)
+    ORDER BY payment_id
+"""
+
+EXPORT_AUDIT_LOGS_SQL = """
+    SELECT log_id, timestamp, username, action, target_id, details, ip_address
+    FROM audit_logs
+    WHERE (:from IS NULL OR timestamp >= :from)
+      AND (:to IS NULL OR timestamp < :to)
+    ORDER BY log_id
+"""
+
+# dataset -> (query, roles allowed to export it)
+EXPORTS = {
+    "loans": (EXPORT_LOANS_SQL, ["manager"]),
+    "payments": (EXPORT_PAYMENTS_SQL, ["manager"]),
+    "audit-logs": (EXPORT_AUDIT_LOGS_SQL, ["admin"]),
+}
+
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+def date_bounds(start, end):
+    '''Inclusive date range -> {"from", "to"} bind values; "to" is the day after end'''
+    return {
+        "from": start.isoformat() if start else None,
+        "to": (end + timedelta(days=1)).isoformat() if end else None,
+    }
+
+def stream_rows(conn, sql, params, chunk_size=CHUNK_SIZE):
+    '''Yields (columns, rows) chunks from one query without materializing the result'''
+    with conn.connect() as connection:
+        # Server-side cursor where the dialect has one; pysqlite's cursor already steps lazily
+        result = connection.execution_options(stream_results=True).execute(text(sql), params)
+        columns = list(result.keys())
+        empty = True
+        for rows in result.partitions(chunk_size):
+            empty = False
+            yield columns, rows
+        if empty:
+            # Still one (header-only) chunk, so an empty CSV has its columns
+            yield columns, []
+
+def encode_csv(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for i, (columns, rows) in enumerate(chunks):
+        if i == 0:
+            writer.writerow(columns)
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+def encode_ndjson(chunks):
+    for columns, rows in chunks:
+        yield "".join(json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in rows)
+
+ENCODERS = {"csv": encode_csv, "ndjson": encode_ndjson}
+
+def export(conn, dataset, fmt, start=None, end=None, chunk_size=CHUNK_SIZE):
+    '''Generator of encoded text chunks for one dataset/format'''
+    sql, _ = EXPORTS[dataset]
+    return ENCODERS[fmt](stream_rows(conn, sql, date_bounds(start, end), chunk_size))
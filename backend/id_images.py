@@ -0,0 +1,126 @@
+import base64
+import binascii
+import hashlib
+import os
+import re
+import sys
+import tempfile
+from sqlalchemy import text
+
+# Applicant ID images live outside the applicants row, as content-addressed files.
+# The row only keeps the SHA-256 and mime type, so joins against applicants stay small.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ID_IMAGE_DIR = os.getenv("ID_IMAGE_DIR", os.path.join(BASE_DIR, "id_images"))
+
+DATA_URL_PATTERN = re.compile(r"^data:(?P<mime>[\w.+-]+/[\w.+-]+)?(;[\w=-]+)*;base64,", re.IGNORECASE)
+DEFAULT_MIME = "application/octet-stream"
+
+# --- HELPERS ---
+
+def decode_data_url(data_url):
+    """Splits a 'data:<mime>;base64,...' string into (bytes, mime_type)"""
+    if not data_url:
+        return None, None
+
+    mime_type = DEFAULT_MIME
+    payload = data_url
+    match = DATA_URL_PATTERN.match(data_url)
+    if match:
+        mime_type = match.group("mime") or DEFAULT_MIME
+        payload = data_url[match.end():]
+
+    try:
+        return base64.b64decode(payload, validate=False), mime_type
+    except (binascii.Error, ValueError):
+        raise ValueError("ID image is not valid base64 data.")
+
+def image_path(image_hash):
+    """Fans files out over 256 subdirectories: <dir>/ab/abcdef..."""
+    if not re.fullmatch(r"[0-9a-f]{64}", image_hash or ""):
+        raise ValueError("Invalid image hash")
+    return os.path.join(ID_IMAGE_DIR, image_hash[:2], image_hash)
+
+def image_exists(image_hash):
+    return os.path.exists(image_path(image_hash))
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+def store_image(data):
+    """Writes the bytes once per distinct content and returns the SHA-256 hex digest"""
+    image_hash = content_hash(data)
+    path = image_path(image_hash)
+    if os.path.exists(path):
+        return image_hash
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write to a temp file first so a reader never sees a half-written image
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return image_hash
+
+def store_data_url(data_url):
+    """Stores an uploaded data URL. Returns (hash, mime_type), or (None, None) when empty."""
+    data, mime_type = decode_data_url(data_url)
+    if not data:
+        return None, None
+    return store_image(data), mime_type
+
+def remove_image(image_hash):
+    """Deletes a stored file, e.g. one written for a row that was never committed"""
+    try:
+        os.remove(image_path(image_hash))
+    except FileNotFoundError:
+        pass
+
+# --- BACKFILL ---
+
+def backfill_legacy_images(conn, batch_size=100):
+    '''Moves base64 images still stored in applicants.id_image_data out to the file store'''
+    moved = 0
+    with conn.connect() as connection:
+        last_id = 0
+        while True:
+            rows = connection.execute(
+                text("""
+                    SELECT applicant_id, id_image_data FROM applicants
+                    WHERE applicant_id > :last AND id_image_hash IS NULL
+                      AND id_image_data IS NOT NULL AND id_image_data != ''
+                    ORDER BY applicant_id LIMIT :n
+                """), {"last": last_id, "n": batch_size}
+            ).mappings().fetchall()
+            if not rows:
+                break
+
+            for row in rows:
+                last_id = row["applicant_id"]
+                try:
+                    image_hash, mime_type = store_data_url(row["id_image_data"])
+                except ValueError as e:
+                    # Leave the inline copy in place so nothing is lost
+                    print(f"Skipping applicant {row['applicant_id']}: {e}")
+                    continue
+
+                connection.execute(
+                    text("UPDATE applicants SET id_image_hash = :h, id_image_mime = :m, id_image_data = NULL WHERE applicant_id = :aid"),
+                    {"h": image_hash, "m": mime_type, "aid": row["applicant_id"]}
+                )
+                moved += 1
+            connection.commit()
+    return moved
+
+if __name__ == "__main__":
+    import migrate
+    import database
+    db_path = sys.argv[1] if len(sys.argv) > 1 else database.DB_PATH
+    engine = database.create_db_engine(db_path)
+    migrate.apply_migrations(engine)
+    count = backfill_legacy_images(engine)
+    print(f"--- Moved {count} ID image(s) to {ID_IMAGE_DIR} ---")
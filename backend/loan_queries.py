@@ -0,0 +1,252 @@
+from sqlalchemy import text
+import portfolio_stats
+
+# Read queries behind the loan, payment and dashboard routes.
+# Each takes an open connection and returns plain dicts/lists, so the Flask views
+# call them directly and the async app (async_app.py) runs the very same functions
+# on its aiosqlite engine through AsyncConnection.run_sync: same SQL, same JSON.
+# List functions take the page size and fetch one look-ahead row for
+# paginated_response; limit=None returns everything.
+
+# Review queue order: Pending first, then For Release, then Rejected
+APPLICATION_RANK_SQL = """
+    CASE
+        WHEN status = 'Pending' THEN 1
+        WHEN status = 'For Release' THEN 2
+        ELSE 3
+    END
+"""
+
+def page_params(after, limit):
+    return {"after": after, "limit": (limit + 1) if limit is not None else -1}
+
+def list_applications(connection, after=None, limit=None):
+    rows = connection.execute(text(f'''
+        SELECT
+            l.loan_id AS loan_id,
+            first_name || ' ' || last_name AS applicant_name,
+            application_date AS start_date,
+            payment_time_period AS duration,
+            principal AS amount,
+            status,
+            l.remarks, -- ADDED: Reason for rejection
+            email,
+            application_date AS date_applied,
+            COALESCE(due_amount, 0) AS due_amount,
+            l.applicant_id as applicant_id,
+            a.credit_score,
+            a.monthly_income,
+            a.employment_status,
+            l.loan_purpose,
+            l.payment_schedule,
+            l.disbursement_method,
+            l.disbursement_account_number,
+            a.gender,
+            a.civil_status,
+            a.id_type,
+            a.phone_num,
+            a.address
+        FROM loans l
+        LEFT JOIN applicants a ON l.applicant_id = a.applicant_id
+        LEFT JOIN loan_details ld ON ld.loan_id = l.loan_id AND is_current = 1
+        WHERE status IN ('Pending', 'Rejected', 'For Release')
+          -- Cursor: continue after the (rank, loan_id) position of the given loan
+          AND (:after IS NULL OR ({APPLICATION_RANK_SQL}, -l.loan_id) > (
+              SELECT {APPLICATION_RANK_SQL}, -loan_id FROM loans WHERE loan_id = :after
+          ))
+        ORDER BY {APPLICATION_RANK_SQL}, l.loan_id DESC
+        LIMIT :limit;
+        '''), page_params(after, limit)).mappings().fetchall()
+    return [dict(row) for row in rows]
+
+def list_loans(connection, after=None, limit=None):
+    rows = connection.execute(text('''
+        SELECT
+            l.loan_id AS loan_id,
+            a.first_name || ' ' || a.last_name AS applicant_name,
+            l.application_date AS start_date,
+            l.payment_time_period AS duration,
+            l.total_loan AS amount,
+            l.status,
+            a.email,
+            l.application_date AS date_applied,
+            l.applicant_id AS applicant_id,
+
+            -- Active Loan Specifics
+            COALESCE(MAX(ld.due_amount), 0) AS due_amount,
+            MAX(ld.balance) as balance,
+            MAX(ld.next_due) as next_due,
+
+            -- NEW FIELDS (KYC & Financials)
+            a.credit_score,
+            a.monthly_income,
+            a.employment_status,
+            l.loan_purpose,
+            l.payment_schedule,
+            l.disbursement_method,
+            l.disbursement_account_number,
+            a.gender,
+            a.civil_status,
+            a.id_type,
+            a.phone_num,
+            a.address
+
+        FROM loans l
+        LEFT JOIN applicants a ON l.applicant_id = a.applicant_id
+        LEFT JOIN loan_details ld ON ld.loan_id = l.loan_id AND ld.is_current = 1
+        WHERE l.status IN ('Approved', 'Settled')
+          AND (:after IS NULL OR l.loan_id > :after)
+        GROUP BY l.loan_id
+        ORDER BY l.loan_id
+        LIMIT :limit;
+        '''), page_params(after, limit)).mappings().fetchall()
+    return [dict(row) for row in rows]
+
+def loan_version(connection, loan_id):
+    '''Validators for conditional GETs (see migration 0010), from primary-key lookups only; or None'''
+    row = connection.execute(text("""
+        SELECT l.loan_id, l.version, l.updated_at, a.first_name || ' ' || a.last_name AS applicant_name
+        FROM loans l
+        LEFT JOIN applicants a ON l.applicant_id = a.applicant_id
+        WHERE l.loan_id = :loan_id
+    """), {"loan_id": loan_id}).mappings().fetchone()
+    return dict(row) if row else None
+
+def get_loan(connection, loan_id):
+    '''Loan detail with the applicant profile, or None'''
+    loan = connection.execute(text('''
+        SELECT
+            l.loan_id AS loan_id,
+            -- Changed CONCAT to || for SQLite compatibility (if using SQLite)
+            first_name || ' ' || last_name AS applicant_name,
+            a.applicant_id,
+            a.phone_num AS phone_number,
+            a.employment_status,
+            a.credit_score,
+            a.date_of_birth,
+            a.civil_status,
+            a.address,
+            a.id_type,
+
+            a.gender,
+            a.monthly_income,
+            -- The image itself is served by /api/applicants/<id>/id-image
+            (a.id_image_hash IS NOT NULL OR a.id_image_data IS NOT NULL) AS has_id_image,
+
+            l.loan_purpose,
+            l.disbursement_method,
+            l.disbursement_account_number,
+            l.application_date AS start_date,
+            l.payment_time_period AS duration,
+            l.total_loan AS amount,
+            l.principal AS principal,
+            l.payment_schedule AS payment_schedule,
+            l.status,
+
+            ld.next_due,
+            a.email,
+            l.application_date AS date_applied,
+            COALESCE(due_amount, 0) as due_amount,
+            lp.interest_rate
+        FROM loans l
+        LEFT JOIN applicants a ON l.applicant_id = a.applicant_id
+        -- Fixed Join: loan_details links to loan_id, not applicant_id
+        LEFT JOIN loan_details ld ON ld.loan_id = l.loan_id AND is_current = 1
+        LEFT JOIN loan_plans lp ON l.loan_plan_lvl = lp.plan_level
+        WHERE l.loan_id = :loan_id;
+        '''), {"loan_id": loan_id}).mappings().fetchone()
+    if not loan:
+        return None
+
+    loan = dict(loan)
+    has_id_image = loan.pop("has_id_image")
+    loan["id_image_url"] = f"/api/applicants/{loan['applicant_id']}/id-image" if has_id_image else None
+    return loan
+
+def applicant_name(connection, loan_id):
+    applicant = connection.execute(
+        text("SELECT first_name, last_name FROM applicants a JOIN loans l ON a.applicant_id = l.applicant_id WHERE l.loan_id = :id"),
+        {"id": loan_id}
+    ).fetchone()
+    return f"{applicant[0]} {applicant[1]}" if applicant else "Unknown Applicant"
+
+def loan_payments(connection, loan_id):
+    '''{"payments": [...newest first], "total_paid": n}'''
+    result = connection.execute(text("""
+        SELECT payment_id, amount_paid, remarks, transaction_date
+        FROM payments WHERE loan_id = :loan_id ORDER BY transaction_date DESC
+    """), {"loan_id": loan_id}).mappings().fetchall()
+
+    total_result = connection.execute(text("""
+        SELECT SUM(amount_paid) AS total_paid FROM payments WHERE loan_id = :loan_id
+    """), {"loan_id": loan_id}).scalar()
+
+    return {
+        "payments": [dict(row) for row in result],
+        "total_paid": total_result or 0
+    }
+
+def loan_schedule(connection, loan_id):
+    rows = connection.execute(text("""
+        SELECT installment_no, due_date, amount_due, amount_paid, status, paid_at
+        FROM loan_schedules WHERE loan_id = :loan_id ORDER BY installment_no
+    """), {"loan_id": loan_id}).mappings().fetchall()
+    return [dict(row) for row in rows]
+
+def collection_forecast(connection, start, end):
+    '''Open installment amounts per due date between start and end (dates, inclusive)'''
+    rows = connection.execute(text("""
+        SELECT due_date,
+               COUNT(*) AS installments,
+               ROUND(SUM(amount_due - amount_paid), 2) AS amount_open
+        FROM loan_schedules
+        WHERE due_date BETWEEN :start AND :end AND status != 'Paid'
+        GROUP BY due_date
+        ORDER BY due_date
+    """), {"start": start.isoformat(), "end": end.isoformat()}).mappings().fetchall()
+
+    days = [dict(row) for row in rows]
+    return {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "total_open": round(sum(d["amount_open"] for d in days), 2),
+        "days": days
+    }
+
+def dashboard(connection):
+    '''Dashboard payload from the incrementally maintained counters in portfolio_stats'''
+    stats = portfolio_stats.read_dashboard_stats(connection, days=30)
+
+    def buckets(metric):
+        return sorted((bucket, int(value)) for (m, bucket), value in stats.items() if m == metric and value)
+
+    # 1. Basic Counts
+    status_counts = dict(buckets("status"))
+
+    # 2. Financials
+    total_disbursed = round(stats.get(("total_disbursed", ""), 0), 2)
+    total_payments = round(stats.get(("total_payments", ""), 0), 2)
+    total_receivable = round(stats.get(("total_receivable", ""), 0), 2)
+
+    # Projected Revenue (Interest Income)
+    net_revenue = round(total_receivable - total_disbursed, 2)
+
+    # 3. Analytics: Daily Trend (first 30 days on record, oldest first)
+    daily_applicant_data = [{"date": day, "applicant_count": count} for day, count in buckets("daily_applications")]
+
+    # 4. Analytics: Loan Purpose / Gender Distribution
+    loan_purpose_data = [{"name": name or "Unspecified", "value": count} for name, count in buckets("purpose")]
+    demographic_data = [{"name": name or "Unspecified", "value": count} for name, count in buckets("gender")]
+
+    return {
+        "approved_loans": status_counts.get("Approved", 0),
+        "pending_loans": status_counts.get("Pending", 0),
+        "settled_loans": status_counts.get("Settled", 0),
+        "rejected_loans": status_counts.get("Rejected", 0),
+        "total_disbursed": total_disbursed,
+        "total_payments": total_payments,
+        "net_revenue": net_revenue,
+        "daily_applicant_data": daily_applicant_data,
+        "loan_purpose_data": loan_purpose_data,
+        "demographic_data": demographic_data
+    }
@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+from collections import deque
+
+# Failed-login tracking in memory, so a burst of bad passwords never writes to SQLite.
+# Failures are counted per username and per client IP over a sliding window:
+#   - max_failures for one username -> that account is locked for lockout_seconds.
+#     Only this crossing is persisted (users.lockout_until), so other workers and
+#     restarts honour it; the attempts before it cost no writes at all.
+#   - ip_max_failures from one address (any usernames, known or not) -> further
+#     logins from it are refused until its oldest failure leaves the window.
+# Known lockouts are kept here too, so a locked account is refused before any
+# query. Counts are per process: with N workers an account can see up to
+# N * max_failures bad passwords in one window before every worker refuses it.
+
+class LoginThrottle:
+    def __init__(self, max_failures=5, window=900, lockout_seconds=60, ip_max_failures=30, max_keys=100000):
+        self.max_failures = max_failures
+        self.window = window
+        self.lockout_seconds = lockout_seconds
+        self.ip_max_failures = ip_max_failures
+        self.max_keys = max_keys
+        self._failures = {}   # ("user" | "ip", key) -> deque of monotonic failure times
+        self._lockouts = {}   # username -> (monotonic deadline, lockout_until as stored)
+        self._lock = threading.Lock()
+
+    def _recent(self, key, now):
+        '''Failure times for key still inside the window (expired ones dropped)'''
+        failures = self._failures.get(key)
+        if failures is None:
+            return None
+        while failures and failures[0] <= now - self.window:
+            failures.popleft()
+        if not failures:
+            del self._failures[key]
+            return None
+        return failures
+
+    def _add(self, key, now):
+        failures = self._recent(key, now)
+        if failures is None:
+            if len(self._failures) >= self.max_keys:
+                self._prune(now)
+            failures = self._failures[key] = deque()
+        failures.append(now)
+        return len(failures)
+
+    def _prune(self, now):
+        # Stale keys first; if a flood of distinct names still fills the table, drop the oldest half
+        for key in [k for k, v in self._failures.items() if v[-1] <= now - self.window]:
+            del self._failures[key]
+        if len(self._failures) >= self.max_keys:
+            for key in list(self._failures)[:len(self._failures) // 2]:
+                del self._failures[key]
+
+    def locked_until(self, username):
+        '''The stored lockout_until of a lockout still in force, else None'''
+        with self._lock:
+            entry = self._lockouts.get(username)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                # Expired: the account starts again with a clean slate
+                del self._lockouts[username]
+                self._failures.pop(("user", username), None)
+                return None
+            return entry[1]
+
+    def lock(self, username, lockout_until, seconds):
+        '''Remember a lockout (ours or one read from the database) for `seconds`'''
+        with self._lock:
+            self._lockouts[username] = (time.monotonic() + seconds, lockout_until)
+            self._failures.pop(("user", username), None)
+
+    def ip_retry_after(self, ip):
+        '''Seconds until `ip` may try again; 0 when it is under the limit'''
+        now = time.monotonic()
+        with self._lock:
+            failures = self._recent(("ip", ip), now)
+            if failures is None or len(failures) < self.ip_max_failures:
+                return 0
+            # Sliding window: one more attempt is allowed once enough old failures expire
+            return max(1, int(failures[-self.ip_max_failures] + self.window - now) + 1)
+
+    def record_failure(self, username, ip):
+        '''
+        Counts a failed login. username is None for unknown accounts (only the IP counts).
+        Returns the username's failures in the window; at max_failures the caller locks it.
+        '''
+        now = time.monotonic()
+        with self._lock:
+            self._add(("ip", ip), now)
+            return self._add(("user", username), now) if username is not None else 0
+
+    def reset(self, username):
+        '''Successful login or admin unlock/reset'''
+        with self._lock:
+            self._failures.pop(("user", username), None)
+            self._lockouts.pop(username, None)
+
+def throttle_from_env():
+    return LoginThrottle(
+        max_failures=int(os.getenv("LOGIN_MAX_FAILURES", "5")),
+        window=float(os.getenv("LOGIN_FAILURE_WINDOW", "900")),
+        lockout_seconds=float(os.getenv("LOGIN_LOCKOUT_SECONDS", "60")),
+        ip_max_failures=int(os.getenv("LOGIN_IP_MAX_FAILURES", "30")),
+    )
@@ -0,0 +1,232 @@
+import re
+import threading
+import time
+from flask import request
+from sqlalchemy import event
+
+# Request and query metrics in Prometheus text format.
+#   per route      -> request count by status, latency histogram,
+#                     statements and DB time per request (histograms)
+#   per statement  -> executions and total time, grouped by normalized SQL
+#   N+1 suspects   -> a statement run N_PLUS_ONE_THRESHOLD+ times within one request
+# Statements are timed from the dialect's do_execute hooks rather than the
+# connection's before/after_cursor_execute events: connection events send every
+# execute through SQLAlchemy's slower dispatch path (~70us per request here),
+# while the dialect hooks cost one function call per statement. SQL
+# normalization is cached per distinct statement string.
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+_COMMENTS = re.compile(r"--[^\n]*")
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_sql(statement):
+    '''Collapses literals, IN lists, comments and whitespace so one query shape is one series'''
+    sql = _COMMENTS.sub(" ", statement)
+    sql = _LITERALS.sub("?", sql)
+    sql = _PLACEHOLDER_LISTS.sub("(?...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+class Metrics:
+    def __init__(self, n_plus_one_threshold=5, max_statements=500):
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.max_statements = max_statements
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._normalized = {}
+        self.requests = {}
+        self.latency = {}
+        self.statements_per_request = {}
+        self.db_time_per_request = {}
+        self.statements = {}
+        self.n_plus_one = {}
+
+    # --- WIRING ---
+
+    def init_app(self, app, engine):
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        event.listen(engine, "do_execute", self._do_execute)
+        event.listen(engine, "do_execute_no_params", self._do_execute_no_params)
+        event.listen(engine, "do_executemany", self._do_executemany)
+
+    def _before_request(self):
+        # [start, statements, db seconds, {normalized sql: executions}]
+        self._local.current = [time.perf_counter(), 0, 0.0, {}]
+
+    def _after_request(self, response):
+        current = getattr(self._local, "current", None)
+        if current is None:
+            return response
+        self._local.current = None
+
+        elapsed = time.perf_counter() - current[0]
+        # The URL rule, not the path, so /api/loans/<id> is one series
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        key = (request.method, route)
+        suspects = [sql for sql, n in current[3].items() if n >= self.n_plus_one_threshold]
+
+        with self._lock:
+            status_key = (request.method, route, str(response.status_code))
+            self.requests[status_key] = self.requests.get(status_key, 0) + 1
+            self._histogram(self.latency, key, LATENCY_BUCKETS).observe(elapsed)
+            self._histogram(self.statements_per_request, key, COUNT_BUCKETS).observe(current[1])
+            self._histogram(self.db_time_per_request, key, LATENCY_BUCKETS).observe(current[2])
+            for sql in suspects:
+                suspect_key = (route, sql)
+                if suspect_key not in self.n_plus_one:
+                    print(f"N+1 SUSPECT {request.method} {route}: {current[3][sql]}x {sql[:160]}")
+                self.n_plus_one[suspect_key] = self.n_plus_one.get(suspect_key, 0) + 1
+        return response
+
+    def _teardown_request(self, error=None):
+        self._local.current = None
+
+    # Each hook runs the statement itself and returns True so the dialect skips its own call
+    def _do_execute(self, cursor, statement, parameters, context):
+        start = time.perf_counter()
+        try:
+            cursor.execute(statement, parameters)
+        finally:
+            self._record(statement, time.perf_counter() - start)
+        return True
+
+    def _do_execute_no_params(self, cursor, statement, context):
+        start = time.perf_counter()
+        try:
+            cursor.execute(statement)
+        finally:
+            self._record(statement, time.perf_counter() - start)
+        return True
+
+    def _do_executemany(self, cursor, statement, parameters, context):
+        start = time.perf_counter()
+        try:
+            cursor.executemany(statement, parameters)
+        finally:
+            self._record(statement, time.perf_counter() - start)
+        return True
+
+    def _record(self, statement, elapsed):
+        sql = self._normalized.get(statement)
+        if sql is None:
+            sql = normalize_sql(statement)
+            if len(self._normalized) < 10 * self.max_statements:
+                self._normalized[statement] = sql
+
+        with self._lock:
+            stats = self.statements.get(sql)
+            if stats is None:
+                if len(self.statements) >= self.max_statements:
+                    sql = "other"
+                stats = self.statements.setdefault(sql, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] = max(stats[2], elapsed)
+
+        # Background threads (audit writer, outbox) have no request to charge
+        current = getattr(self._local, "current", None)
+        if current is not None:
+            current[1] += 1
+            current[2] += elapsed
+            current[3][sql] = current[3].get(sql, 0) + 1
+
+    @staticmethod
+    def _histogram(series, key, buckets):
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram(buckets)
+        return histogram
+
+    # --- EXPOSITION ---
+
+    def render(self):
+        '''Prometheus text exposition format (version 0.0.4)'''
+        lines = []
+        with self._lock:
+            lines += [
+                "# HELP microbank_uptime_seconds Seconds since the metrics were reset.",
+                "# TYPE microbank_uptime_seconds gauge",
+                f"microbank_uptime_seconds {time.time() - self.started_at:.3f}",
+                "# HELP microbank_http_requests_total Requests by route and status code.",
+                "# TYPE microbank_http_requests_total counter",
+            ]
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(f"microbank_http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+
+            self._render_histograms(lines, "microbank_http_request_duration_seconds",
+                                    "Request latency by route.", self.latency)
+            self._render_histograms(lines, "microbank_db_statements_per_request",
+                                    "SQL statements executed per request, by route.", self.statements_per_request)
+            self._render_histograms(lines, "microbank_db_time_per_request_seconds",
+                                    "Time spent in SQL per request, by route.", self.db_time_per_request)
+
+            lines += [
+                "# HELP microbank_db_statement_executions_total Executions per normalized statement.",
+                "# TYPE microbank_db_statement_executions_total counter",
+            ]
+            for sql, (count, _, _) in sorted(self.statements.items()):
+                lines.append(f"microbank_db_statement_executions_total{_labels(statement=sql)} {count}")
+            lines += [
+                "# HELP microbank_db_statement_seconds_total Time spent per normalized statement.",
+                "# TYPE microbank_db_statement_seconds_total counter",
+            ]
+            for sql, (_, total, _) in sorted(self.statements.items()):
+                lines.append(f"microbank_db_statement_seconds_total{_labels(statement=sql)} {total:.6f}")
+            lines += [
+                "# HELP microbank_db_statement_max_seconds Slowest single execution per normalized statement.",
+                "# TYPE microbank_db_statement_max_seconds gauge",
+            ]
+            for sql, (_, _, slowest) in sorted(self.statements.items()):
+                lines.append(f"microbank_db_statement_max_seconds{_labels(statement=sql)} {slowest:.6f}")
+
+            lines += [
+                "# HELP microbank_db_n_plus_one_total Requests that ran one statement at least the N+1 threshold times.",
+                "# TYPE microbank_db_n_plus_one_total counter",
+            ]
+            for (route, sql), count in sorted(self.n_plus_one.items()):
+                lines.append(f"microbank_db_n_plus_one_total{_labels(route=route, statement=sql)} {count}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_histograms(lines, name, help_text, series):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for (method, route), h in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(h.buckets, h.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(method=method, route=route, le=_number(bound))} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(method=method, route=route, le='+Inf')} {h.count}")
+            lines.append(f"{name}_sum{_labels(method=method, route=route)} {h.sum:.6f}")
+            lines.append(f"{name}_count{_labels(method=method, route=route)} {h.count}")
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(**labels):
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
@@ -1,5 +1,12 @@
+import operator
 import random
-from datetime import datetime, timedelta, date
+import re
+import time
+import numpy as np
+import id_images
+import notifications
+import portfolio_stats
+from datetime import datetime, timedelta
 from sqlalchemy import text
 
 # Loan Configuration
@@ -9,6 +16,13 @@ SCHEDS = {
     "Monthly": 1
 }
 
+# Days between installments
+INTERVAL_DAYS = {
+    "Weekly": 7,
+    "Bi-Weekly": 15,
+    "Monthly": 30
+}
+
 # --- HELPERS ---
 
 def generate_random_score():
@@ -36,10 +50,157 @@ def compute_payment_amount(principal, payment_time_period, interest, payment_sch
     total_payments = payment_time_period * SCHEDS.get(payment_schedule, 1)
     return round(total_loan / total_payments, 2)
 
+# --- BATCH OFFER ENGINE ---
+# Array versions of the helpers above for repricing and what-if runs.
+# Same tier rules, and rounding matches Python's round() to the cent.
+
+def round_cents(values):
+    """Vectorized round(x, 2) that agrees with Python's correctly-rounded round()"""
+    values = np.asarray(values, dtype=float)
+    scaled = values * 100
+    rounded = np.rint(scaled) / 100
+    # x * 100 can land on (or next to) .5 when the true binary value is not a tie;
+    # settle those few with the scalar round() instead of guessing.
+    near_tie = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6
+    if near_tie.any():
+        rounded[near_tie] = [round(float(v), 2) for v in values[near_tie]]
+    return rounded
+
+def get_interest_rates(amounts, credit_scores):
+    amounts = np.asarray(amounts, dtype=float)
+    credit_scores = np.asarray(credit_scores, dtype=float)
+
+    base_rate = np.select(
+        [amounts >= 40001, amounts >= 30001, amounts >= 20001, amounts >= 10001],
+        [18, 15, 12, 8],
+        default=5
+    )
+    base_rate = base_rate + np.select([credit_scores >= 740, credit_scores < 600], [-2, 5], default=0)
+    return np.maximum(3, base_rate)
+
+def get_schedule_multipliers(payment_schedules):
+    payment_schedules = np.asarray(payment_schedules, dtype=object)
+    multipliers = np.ones(payment_schedules.shape, dtype=np.int64)
+    for schedule, multiplier in SCHEDS.items():
+        multipliers[payment_schedules == schedule] = multiplier
+    return multipliers
+
+def calculate_offers(principals, credit_scores, repayment_periods, payment_schedules):
+    """Batch equivalent of Applicant.calculate_offer(). Takes equal-length arrays, returns a dict of arrays."""
+    principals = np.asarray(principals, dtype=float)
+    credit_scores = np.asarray(credit_scores, dtype=float)
+    repayment_periods = np.asarray(repayment_periods, dtype=np.int64)
+    payment_schedules = np.asarray(payment_schedules, dtype=object)
+
+    if not (principals.shape == credit_scores.shape == repayment_periods.shape == payment_schedules.shape):
+        raise ValueError("All offer inputs must have the same length.")
+
+    interest_rates = get_interest_rates(principals, credit_scores)
+    total_loans = round_cents(principals * (1 + (interest_rates / 100)))
+
+    payment_counts = repayment_periods * get_schedule_multipliers(payment_schedules)
+    has_payments = payment_counts > 0
+    payment_amounts = total_loans.copy()
+    payment_amounts[has_payments] = round_cents(total_loans[has_payments] / payment_counts[has_payments])
+
+    return {
+        "credit_score": credit_scores,
+        "interest_rate": interest_rates,
+        "principal": principals,
+        "total_repayment": total_loans,
+        "payment_amount": payment_amounts,
+        "payment_count": payment_counts,
+        "schedule": payment_schedules
+    }
+
+# --- ELIGIBILITY RULES ---
+# Checked in order; the first rule that rejects an applicant decides, and its reason is
+# returned. reject_if is "<metric> <op> <number>" or "<metric> <op> <number> * <metric>"
+# over ELIGIBILITY_METRICS (monthly_burden is the installment times SCHEDS, i.e. per month).
+# The table is compiled once at import: Applicant.assess_eligibility() and the batch
+# assess_eligibilities() run the same compiled tests, on scalars or on arrays.
+ELIGIBILITY_RULES = [
+    {"rule": "min_credit_score", "reject_if": "credit_score < 500",
+     "reason": "Credit Score below 500 threshold"},
+    {"rule": "max_income_burden", "reject_if": "monthly_burden > 0.6 * monthly_income",
+     "reason": "Monthly repayment exceeds 60% of income"},
+]
+
+ELIGIBILITY_METRICS = ("credit_score", "monthly_income", "monthly_burden")
+
+RULE_OPERATORS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge, "==": operator.eq, "!=": operator.ne}
+RULE_PATTERN = re.compile(r"^\s*(\w+)\s*(<=|>=|==|!=|<|>)\s*(-?\d+(?:\.\d+)?)\s*(?:\*\s*(\w+))?\s*$")
+
+def make_rule_test(metric, op, limit, scale):
+    if scale is None:
+        return lambda metrics: op(metrics[metric], limit)
+    return lambda metrics: op(metrics[metric], limit * metrics[scale])
+
+def compile_rules(rules):
+    """Parses a rule table into (rule, reason, rejects) tuples; rejects(metrics) is True where the rule rejects"""
+    compiled = []
+    for rule in rules:
+        match = RULE_PATTERN.match(rule["reject_if"])
+        if not match:
+            raise ValueError(f"Rule {rule['rule']}: cannot parse '{rule['reject_if']}'")
+        metric, op, limit, scale = match.groups()
+        for name in (metric, scale):
+            if name is not None and name not in ELIGIBILITY_METRICS:
+                raise ValueError(f"Rule {rule['rule']}: unknown metric '{name}'")
+        compiled.append((rule["rule"], rule["reason"], make_rule_test(metric, RULE_OPERATORS[op], float(limit), scale)))
+    return compiled
+
+COMPILED_ELIGIBILITY_RULES = compile_rules(ELIGIBILITY_RULES)
+
+def first_failed_rule(metrics, rules=COMPILED_ELIGIBILITY_RULES):
+    """(rule, reason) of the first rule rejecting one applicant's metrics, or None"""
+    for name, reason, rejects in rules:
+        if rejects(metrics):
+            return name, reason
+    return None
+
+def assess_eligibilities(credit_scores, monthly_incomes, principals, repayment_periods, payment_schedules,
+                         rules=COMPILED_ELIGIBILITY_RULES):
+    """
+    Batch equivalent of Applicant.assess_eligibility(). Takes equal-length arrays, returns the
+    calculate_offers() columns plus status, rule and reason (rule/reason None when approved).
+    """
+    offers = calculate_offers(principals, credit_scores, repayment_periods, payment_schedules)
+    monthly_incomes = np.asarray(monthly_incomes, dtype=float)
+    if monthly_incomes.shape != offers["principal"].shape:
+        raise ValueError("All eligibility inputs must have the same length.")
+
+    metrics = {
+        "credit_score": offers["credit_score"],
+        "monthly_income": monthly_incomes,
+        "monthly_burden": offers["payment_amount"] * get_schedule_multipliers(offers["schedule"]),
+    }
+
+    # Index of the deciding rule per applicant, -1 while none has rejected it
+    deciding = np.full(monthly_incomes.shape, -1)
+    for index, (_, _, rejects) in enumerate(rules):
+        deciding[(deciding < 0) & rejects(metrics)] = index
+
+    names = np.array([name for name, _, _ in rules] + [None], dtype=object)
+    reasons = np.array([reason for _, reason, _ in rules] + [None], dtype=object)
+    return {
+        **offers,
+        "status": np.where(deciding >= 0, "Rejected", "Approved").astype(object),
+        "rule": names[deciding],
+        "reason": reasons[deciding],
+    }
+
 # --- LOAN OPERATIONS ---
 
+def bump_loan_version(connection, loan_id):
+    '''Moves the loan's ETag/Last-Modified; call in the transaction that changes the loan or its payments'''
+    connection.execute(
+        text("UPDATE loans SET version = version + 1, updated_at = :now WHERE loan_id = :lid"),
+        {"lid": loan_id, "now": time.time()}
+    )
+
 def release_loan(conn, applicant):
-    '''Sets the loan release date and initial loan deadline'''
+    '''Sets the loan release date and initial loan deadline; returns the applicant's name for the audit'''
     try:
         loan_release_date_obj = datetime.strptime(applicant["release_date"], "%Y-%m-%d")
         loan_release_date_str = loan_release_date_obj.strftime("%Y-%m-%d")
@@ -55,8 +216,11 @@ def release_loan(conn, applicant):
                     l.principal, 
                     l.total_loan, 
                     l.payment_time_period, 
-                    l.payment_schedule
+                    l.payment_schedule,
+                    l.status,
+                    a.first_name || ' ' || a.last_name AS applicant_name
                 FROM loans l
+                LEFT JOIN applicants a ON a.applicant_id = l.applicant_id
                 WHERE l.loan_id = :loan_id
                 """
             ), {
@@ -67,16 +231,9 @@ def release_loan(conn, applicant):
         if not applicant_info:
             raise ValueError(f"Loan ID {applicant.get('loan_id')} not found.")
 
-        sched_multiplier = SCHEDS.get(applicant_info['payment_schedule'], 1)
-        total_payments = int(applicant_info['payment_time_period']) * sched_multiplier
-        
-        schedule = applicant_info['payment_schedule']
-        days_offset = 30 
-        if schedule == "Bi-Weekly": days_offset = 15
-        elif schedule == "Weekly": days_offset = 7
-            
-        next_due_date_obj = loan_release_date_obj + timedelta(days=days_offset)
-        next_due_date_str = next_due_date_obj.strftime("%Y-%m-%d")
+        total_payments = int(applicant_info['payment_time_period']) * SCHEDS.get(applicant_info['payment_schedule'], 1)
+        total_loan_amount = round(float(applicant_info['total_loan']), 2)
+        schedule = build_schedule(total_loan_amount, total_payments, loan_release_date_obj, applicant_info['payment_schedule'])
 
         connection.execute(
             text("UPDATE loans SET status = 'Approved', payment_start_date = :date WHERE loan_id = :loan_id"), {
@@ -84,9 +241,16 @@ def release_loan(conn, applicant):
                 "loan_id": applicant["loan_id"]
             }
         )
+        bump_loan_version(connection, applicant["loan_id"])
 
-        total_loan_amount = round(float(applicant_info['total_loan']), 2)
-        installment_amount = round(total_loan_amount / total_payments, 2)
+        connection.execute(
+            text(
+                """
+                INSERT INTO loan_schedules (loan_id, installment_no, due_date, amount_due)
+                VALUES (:loan_id, :installment_no, :due_date, :amount_due)
+                """
+            ), [{"loan_id": applicant_info['loan_id'], **row} for row in schedule]
+        )
 
         connection.execute(
             text(
@@ -97,23 +261,44 @@ def release_loan(conn, applicant):
                 """
             ), {
                 "loan_id": applicant_info['loan_id'],
-                "due_amount": installment_amount,
-                "next_due": next_due_date_str,
+                "due_amount": schedule[0]["amount_due"],
+                "next_due": schedule[0]["due_date"],
                 "balance": total_loan_amount,
-                "payments_remaining": int(total_payments)
+                "payments_remaining": len(schedule)
             }
         )
+        portfolio_stats.record_status_change(
+            connection, applicant_info['status'], 'Approved',
+            applicant_info['principal'], applicant_info['total_loan']
+        )
+        notifications.enqueue_loan_notice(
+            connection, applicant_info['loan_id'], "loan_released",
+            due_amount=schedule[0]["amount_due"], next_due=schedule[0]["due_date"]
+        )
         connection.commit()
-
-def parse_db_date(date_val):
-    if date_val is None: return None
-    if isinstance(date_val, (datetime, date)): return date_val
-    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
-        try: return datetime.strptime(str(date_val), fmt)
-        except ValueError: continue
-    return None
-
-def update_balance(conn, data):
+    return applicant_info['applicant_name']
+
+def build_schedule(total_loan, total_payments, release_date, payment_schedule):
+    """
+    Installment rows (installment_no, due_date, amount_due) for a released loan.
+    The last installment absorbs the rounding remainder so the rows sum to total_loan.
+    """
+    total_payments = max(1, int(total_payments))
+    installment = round(total_loan / total_payments, 2)
+    interval_days = INTERVAL_DAYS.get(payment_schedule, 30)
+
+    schedule = []
+    for number in range(1, total_payments + 1):
+        amount_due = installment if number < total_payments else round(total_loan - installment * (total_payments - 1), 2)
+        schedule.append({
+            "installment_no": number,
+            "due_date": (release_date + timedelta(days=interval_days * number)).strftime("%Y-%m-%d"),
+            "amount_due": amount_due
+        })
+    return schedule
+
+def parse_payment(data):
+    """Validates a payment request. Returns (loan_id, amount) or raises ValueError."""
     loan_id = data.get("loan_id")
     try:
         payment_amount = round(float(data.get("amount", 0)), 2)
@@ -122,102 +307,176 @@ def update_balance(conn, data):
 
     if not loan_id or payment_amount <= 0:
         raise ValueError("Invalid Loan ID or Payment Amount")
+    return loan_id, payment_amount
+
+def apply_payment(connection, loan_id, payment_amount, processed_by=None):
+    """
+    Posts one payment on an open connection; the caller owns the transaction.
+    Every rejection (ValueError) is raised before the first write.
+    """
+    loan_info = connection.execute(
+        text("SELECT status FROM loans WHERE loan_id = :lid"),
+        {"lid": loan_id}
+    ).mappings().fetchone()
+
+    if not loan_info: raise ValueError(f"Loan {loan_id} not found")
+
+    current_detail = connection.execute(
+        text("SELECT * FROM loan_details WHERE loan_id = :lid AND is_current = 1"),
+        {"lid": loan_id}
+    ).mappings().fetchone()
+
+    if not current_detail: raise ValueError("No active loan details found")
+
+    current_balance = round(float(current_detail['balance'] or 0), 2)
+
+    # STRICT MODE: Prevent overpayment beyond the exact cent
+    if payment_amount > current_balance:
+        raise ValueError(f"Overpayment rejected. Max payment: {current_balance:,.2f}")
+
+    installments = connection.execute(
+        text("""
+            SELECT schedule_id, installment_no, due_date, amount_due, amount_paid
+            FROM loan_schedules WHERE loan_id = :lid AND status != 'Paid'
+            ORDER BY installment_no
+        """),
+        {"lid": loan_id}
+    ).mappings().fetchall()
+
+    if not installments: raise ValueError("No open installments found")
+
+    now = datetime.now()
+    new_balance = round(current_balance - payment_amount, 2)
+    settled = new_balance == 0.00
+
+    # Apply the payment to the oldest open installments first
+    remaining = payment_amount
+    updates = []
+    open_after = []
+    for inst in installments:
+        amount_due = round(float(inst['amount_due']), 2)
+        amount_paid = round(float(inst['amount_paid'] or 0), 2)
+        applied = min(round(amount_due - amount_paid, 2), remaining)
+        if settled:
+            # Absorb any cent drift between the balance and the schedule
+            applied = round(amount_due - amount_paid, 2)
+
+        if applied > 0:
+            remaining = round(remaining - applied, 2)
+            amount_paid = round(amount_paid + applied, 2)
+            is_paid = amount_paid >= amount_due
+            updates.append({
+                "sid": inst['schedule_id'],
+                "paid": amount_paid,
+                "status": "Paid" if is_paid else "Partial",
+                "at": now if is_paid else None
+            })
+        if amount_paid < amount_due:
+            open_after.append((inst, round(amount_due - amount_paid, 2)))
+
+    if updates:
+        connection.execute(
+            text("UPDATE loan_schedules SET amount_paid = :paid, status = :status, paid_at = :at WHERE schedule_id = :sid"),
+            updates
+        )
 
-    with conn.connect() as connection:
-        trans = connection.begin() 
-        try:
-            loan_info = connection.execute(
-                text("SELECT payment_amount, payment_schedule FROM loans WHERE loan_id = :lid"),
-                {"lid": loan_id}
-            ).mappings().fetchone()
-
-            if not loan_info: raise Exception(f"Loan {loan_id} not found")
-
-            current_detail = connection.execute(
-                text("SELECT * FROM loan_details WHERE loan_id = :lid AND is_current = 1"),
-                {"lid": loan_id}
-            ).mappings().fetchone()
-
-            if not current_detail: raise Exception("No active loan details found")
-
-            current_balance = round(float(current_detail['balance'] or 0), 2)
-            
-            # STRICT MODE: Prevent overpayment beyond the exact cent
-            if payment_amount > current_balance:
-                raise ValueError(f"Overpayment rejected. Max payment: {current_balance:,.2f}")
-
-            # Deactivate current record
-            connection.execute(
-                text("UPDATE loan_details SET is_current = 0 WHERE loan_detail_id = :did"),
-                {"did": current_detail['loan_detail_id']}
-            )
-
-            current_due = round(float(current_detail['due_amount'] or 0), 2)
-            instances = int(current_detail['payments_remaining'] or 0)
-            due_date = parse_db_date(current_detail['next_due'])
-            
-            scheduled_amount = round(float(loan_info['payment_amount'] or 0), 2)
-            payment_schedule = loan_info['payment_schedule']
-            interval_map = {"Weekly": 7, "Bi-Weekly": 15, "Monthly": 30}
-            interval_days = interval_map.get(payment_schedule, 30)
-
-            # Calculate New Balance
-            new_balance = round(current_balance - payment_amount, 2)
-            new_due = round(current_due - payment_amount, 2)
+    # Deactivate current record
+    connection.execute(
+        text("UPDATE loan_details SET is_current = 0 WHERE loan_detail_id = :did"),
+        {"did": current_detail['loan_detail_id']}
+    )
+
+    if settled:
+        new_due, due_date, instances, remarks = 0.00, None, 0, "Settled"
+        connection.execute(text("UPDATE loans SET status = 'Settled' WHERE loan_id = :lid"), {"lid": loan_id})
+        portfolio_stats.record_status_change(connection, loan_info['status'], 'Settled')
+    else:
+        next_inst, new_due = open_after[0]
+        due_date = next_inst['due_date']
+        instances = len(open_after)
+        if next_inst['schedule_id'] == installments[0]['schedule_id']:
             remarks = "Partial Payment"
+        elif instances == 1:
+            remarks = "Final Payment Scheduled"
+        else:
+            remarks = "On-Time Payment"
+
+    connection.execute(
+        text("""
+            INSERT INTO loan_details 
+            (loan_id, balance, due_amount, next_due, payments_remaining, is_current)
+            VALUES (:lid, :bal, :due, :nd, :rem, 1)
+        """), { 
+            "lid": loan_id, 
+            "bal": new_balance, 
+            "due": new_due, 
+            "nd": due_date, 
+            "rem": instances 
+        }
+    )
+
+    connection.execute(
+        text("INSERT INTO payments (loan_id, amount_paid, transaction_date, remarks, processed_by) VALUES (:lid, :amt, :date, :rem, :by)"),
+        { "lid": loan_id, "amt": payment_amount, "date": datetime.now(), "rem": remarks, "by": processed_by }
+    )
+    portfolio_stats.record_payment(connection, payment_amount)
+    bump_loan_version(connection, loan_id)
+
+    return {"loan_id": loan_id, "amount": payment_amount, "balance": new_balance, "remarks": remarks}
 
-            # Check for Full Settlement
-            if new_balance == 0.00:
-                new_due = 0.00
-                instances = 0
-                remarks = "Settled"
-                due_date = None
-                connection.execute(text("UPDATE loans SET status = 'Settled' WHERE loan_id = :lid"), {"lid": loan_id})
-            
-            else:
-                # LOAN CONTINUES
-                if new_due <= 0.00:
-                    instances = max(0, instances - 1)
-                    if due_date: 
-                        due_date += timedelta(days=interval_days)
-                    
-                    # --- STRICT ADJUSTMENT LOGIC ---
-                    # If this is the LAST payment instance, force the due amount 
-                    # to cover the ENTIRE remaining balance.
-                    if instances == 1:
-                        new_due = new_balance 
-                        remarks = "Final Payment Scheduled"
-                    else:
-                        # Otherwise, use standard schedule, but capped at balance
-                        new_due = min(new_balance, scheduled_amount)
-                        remarks = "On-Time Payment"
-                    
-                    new_due = round(new_due, 2)
-
-            connection.execute(
-                text("""
-                    INSERT INTO loan_details 
-                    (loan_id, balance, due_amount, next_due, payments_remaining, is_current)
-                    VALUES (:lid, :bal, :due, :nd, :rem, 1)
-                """), { 
-                    "lid": loan_id, 
-                    "bal": new_balance, 
-                    "due": new_due, 
-                    "nd": due_date, 
-                    "rem": instances 
-                }
-            )
-
-            connection.execute(
-                text("INSERT INTO payments (loan_id, amount_paid, transaction_date, remarks) VALUES (:lid, :amt, :date, :rem)"),
-                { "lid": loan_id, "amt": payment_amount, "date": datetime.now(), "rem": remarks }
-            )
+def update_balance(conn, data, processed_by=None):
+    loan_id, payment_amount = parse_payment(data)
 
+    with conn.connect() as connection:
+        trans = connection.begin() 
+        try:
+            result = apply_payment(connection, loan_id, payment_amount, processed_by)
             trans.commit()
+            return result
         except Exception as e:
             trans.rollback()
             raise e
 
+def post_payments(conn, rows, processed_by=None, group_size=500):
+    """
+    Posts a remittance batch with the same rules as update_balance.
+    Rows are applied in transactions of up to group_size; a rejected row (bad input,
+    unknown loan, overpayment) is reported and skipped without affecting the others.
+    Returns one result dict per input row, in order.
+    """
+    results = []
+    for start in range(0, len(rows), group_size):
+        group = rows[start:start + group_size]
+        try:
+            results.extend(_post_payment_group(conn, group, processed_by))
+        except Exception as e:
+            # Unexpected DB failure: the group rolled back, so retry row by row to isolate it
+            print(f"Bulk payment group failed ({e}); retrying rows individually")
+            for row in group:
+                try:
+                    results.extend(_post_payment_group(conn, [row], processed_by))
+                except Exception as row_error:
+                    results.append({"row": row.get("row"), "loan_id": row.get("loan_id"), "status": "error", "message": str(row_error)})
+    return results
+
+def _post_payment_group(conn, group, processed_by):
+    results = []
+    with conn.connect() as connection:
+        trans = connection.begin()
+        try:
+            for row in group:
+                try:
+                    loan_id, payment_amount = parse_payment(row)
+                    posted = apply_payment(connection, loan_id, payment_amount, processed_by)
+                    results.append({"row": row.get("row"), "status": "posted", **posted})
+                except ValueError as e:
+                    results.append({"row": row.get("row"), "loan_id": row.get("loan_id"), "amount": row.get("amount"), "status": "rejected", "message": str(e)})
+            trans.commit()
+        except Exception:
+            trans.rollback()
+            raise
+    return results
+
 # ... (Applicant Class remains the same)
 
 class Applicant:
@@ -279,18 +538,26 @@ class Applicant:
         }
 
     def assess_eligibility(self):
-        if self.credit_score < 500:
-            return {"status": "Rejected", "reason": "Credit Score below 500 threshold"}
+        """Runs ELIGIBILITY_RULES; a rejection names the deciding rule and its reason"""
         offer = self.calculate_offer()
-        monthly_burden = offer['payment_amount']
-        if self.payment_schedule == 'Weekly': monthly_burden *= 4
-        elif self.payment_schedule == 'Bi-Weekly': monthly_burden *= 2
-        if monthly_burden > (self.monthly_revenue * 0.6):
-             return {"status": "Rejected", "reason": "Monthly repayment exceeds 60% of income"}
+        failed = first_failed_rule({
+            "credit_score": self.credit_score,
+            "monthly_income": self.monthly_revenue,
+            "monthly_burden": offer['payment_amount'] * SCHEDS.get(self.payment_schedule, 1),
+        })
+        if failed:
+            rule, reason = failed
+            return {"status": "Rejected", "rule": rule, "reason": reason}
         return {"status": "Approved", "offer": offer}
 
     def load_to_db(self, conn):
         offer = self.calculate_offer()
+        # Image bytes go to the file store; the row only references them by hash.
+        # Decoded (and rejected) up front, written just before the commit.
+        id_image, id_image_mime = id_images.decode_data_url(self.id_image_data)
+        id_image_hash = id_images.content_hash(id_image) if id_image else None
+        # Content-addressed: the same image may already be on file for another applicant
+        new_image_file = bool(id_image_hash) and not id_images.image_exists(id_image_hash)
         try:
             with conn.connect() as connection:
                 query_app = text("""
@@ -298,11 +565,11 @@ class Applicant:
                         first_name, last_name, middle_name, 
                         date_of_birth, gender, civil_status,
                         email, phone_num, address,
-                        id_type, id_image_data, 
+                        id_type, id_image_hash, id_image_mime, 
                         employment_status, monthly_income, credit_score
                     ) VALUES (
                         :fn, :ln, :mn, :dob, :gen, :civ,
-                        :em, :ph, :addr, :idt, :idimg, 
+                        :em, :ph, :addr, :idt, :idhash, :idmime, 
                         :emp, :inc, :cs
                     )
                 """)
@@ -310,7 +577,7 @@ class Applicant:
                     "fn": self.first_name, "ln": self.last_name, "mn": self.middle_name,
                     "dob": self.date_of_birth, "gen": self.gender, "civ": self.civil_status,
                     "em": self.email, "ph": self.phone_num, "addr": self.address,
-                    "idt": self.id_type, "idimg": self.id_image_data,
+                    "idt": self.id_type, "idhash": id_image_hash, "idmime": id_image_mime,
                     "emp": self.employment_status, "inc": self.monthly_revenue, "cs": self.credit_score
                 })
                 applicant_id = result.lastrowid
@@ -327,23 +594,31 @@ class Applicant:
                         principal, total_loan, payment_amount, 
                         loan_purpose, disbursement_method, disbursement_account_number,
                         application_date, payment_start_date, 
-                        payment_time_period, payment_schedule, status
+                        payment_time_period, payment_schedule, status, updated_at
                     ) VALUES (
                         :aid, :lvl, :princ, :tot, :pay_amt, 
                         :purp, :d_meth, :d_acc,
                         :app_date, :start_date, 
-                        :dur, :sched, :stat
+                        :dur, :sched, :stat, :updated_at
                     )
                 """)
-                connection.execute(query_loan, {
+                loan_result = connection.execute(query_loan, {
                     "aid": applicant_id, "lvl": plan_lvl, 
                     "princ": offer['principal'], "tot": offer['total_repayment'], "pay_amt": offer['payment_amount'],
                     "purp": self.loan_purpose, "d_meth": self.disbursement_method, "d_acc": self.account_number,
                     "app_date": self.application_date, "start_date": None,
-                    "dur": self.repayment_period, "sched": self.payment_schedule, "stat": "Pending"
+                    "dur": self.repayment_period, "sched": self.payment_schedule, "stat": "Pending",
+                    "updated_at": time.time()
                 })
+                portfolio_stats.record_application(connection, self.loan_purpose, self.gender, self.application_date)
+                notifications.enqueue_loan_notice(connection, loan_result.lastrowid, "application_received")
+                if id_image:
+                    id_images.store_image(id_image)
                 connection.commit()
                 print("Application saved to DB successfully.")
         except Exception as e:
             print(f"Error saving to DB: {e}")
+            # No committed row references a file this call created
+            if new_image_file:
+                id_images.remove_image(id_image_hash)
             raise e
\ No newline at end of file
@@ -0,0 +1,212 @@
+import ast
+import importlib.util
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime
+
+# Versioned schema migrations.
+# Files in migrations/ are named NNNN_description.sql or NNNN_description.py (with upgrade(connection)).
+# Each one runs in its own transaction and is recorded in schema_migrations.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MIGRATIONS_DIR = os.path.join(BASE_DIR, "migrations")
+MIGRATION_FILE_PATTERN = re.compile(r"^(\d{4})_(\w+)\.(sql|py)$")
+
+# --- HELPERS ---
+
+def discover_migrations():
+    migrations = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = MIGRATION_FILE_PATTERN.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), filename))
+    return migrations
+
+def split_statements(script):
+    """Splits a SQL script into complete statements (trigger bodies stay intact)"""
+    statements, buffer = [], ""
+    for line in script.splitlines(keepends=True):
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            if buffer.strip():
+                statements.append(buffer.strip())
+            buffer = ""
+    if buffer.strip() and not all(l.strip().startswith("--") or not l.strip() for l in buffer.splitlines()):
+        raise ValueError("Migration ends with an incomplete statement")
+    return statements
+
+def run_migration(db, filename):
+    path = os.path.join(MIGRATIONS_DIR, filename)
+    if filename.endswith(".sql"):
+        with open(path, encoding="utf-8") as f:
+            for statement in split_statements(f.read()):
+                db.execute(statement)
+    else:
+        spec = importlib.util.spec_from_file_location(f"migration_{filename[:-3]}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        module.upgrade(db)
+
+# --- RUNNER ---
+
+def apply_migrations(conn, verbose=True):
+    '''Applies every pending migration in order. Returns the filenames that were applied.'''
+    applied_now = []
+    raw = conn.raw_connection()
+    try:
+        db = raw.driver_connection
+        previous_isolation = db.isolation_level
+        # Manage BEGIN/COMMIT ourselves so DDL is part of the migration's transaction
+        db.isolation_level = None
+        try:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    name VARCHAR(255) NOT NULL,
+                    applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            applied = {row[0] for row in db.execute("SELECT version FROM schema_migrations")}
+
+            for version, filename in discover_migrations():
+                if version in applied:
+                    continue
+                db.execute("BEGIN IMMEDIATE")
+                try:
+                    run_migration(db, filename)
+                    db.execute(
+                        "INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)",
+                        (version, filename, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+                    )
+                    db.execute("COMMIT")
+                except Exception:
+                    db.execute("ROLLBACK")
+                    raise
+                applied_now.append(filename)
+                if verbose:
+                    print(f"Applied migration {filename}")
+        finally:
+            db.isolation_level = previous_isolation
+    finally:
+        raw.close()
+    return applied_now
+
+def migration_status(conn):
+    raw = conn.raw_connection()
+    try:
+        db = raw.driver_connection
+        tables = {row[0] for row in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        applied = set()
+        if "schema_migrations" in tables:
+            applied = {row[0] for row in db.execute("SELECT version FROM schema_migrations")}
+    finally:
+        raw.close()
+    return [(filename, version in applied) for version, filename in discover_migrations()]
+
+# --- QUERY PLAN CHECK ---
+# Every literal text("...") query in these modules is run through EXPLAIN QUERY PLAN
+# against a freshly migrated database; a SCAN without an index fails the check.
+PLAN_CHECKED_MODULES = ["app.py", "async_app.py", "loan_queries.py", "microbank.py", "portfolio_stats.py", "notifications.py", "aging.py", "cashflow.py"]
+
+# Full scans that are expected, keyed by the function the query lives in
+ALLOWED_FULL_SCANS = {
+    "get_users": "users is a small staff table",
+    "read_stats": "verify compares every counter row; the dashboard uses read_dashboard_stats",
+    "compute_stats": "rebuild recounts the whole portfolio by design",
+}
+
+def extract_queries(path):
+    '''Yields (function_name, lineno, sql) for each text() call with a resolvable string'''
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    # Module-level string constants, so text(BOOK_LOANS_SQL) and f"...{APPLICATION_RANK_SQL}..." can be resolved
+    constants = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    constants[target.id] = node.value.value
+
+    def resolve(node):
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            return node.value
+        if isinstance(node, ast.Name):
+            return constants.get(node.id)
+        if isinstance(node, ast.JoinedStr):
+            parts = []
+            for value in node.values:
+                if isinstance(value, ast.FormattedValue):
+                    if not (isinstance(value.value, ast.Name) and value.value.id in constants):
+                        return None
+                    parts.append(constants[value.value.id])
+                else:
+                    parts.append(value.value)
+            return "".join(parts)
+        return None
+
+    def visit(node, function_name):
+        for child in ast.iter_child_nodes(node):
+            name = child.name if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)) else function_name
+            if isinstance(child, ast.Call) and isinstance(child.func, ast.Name) and child.func.id == "text" and child.args:
+                sql = resolve(child.args[0])
+                if sql is not None:
+                    yield name, child.lineno, sql
+            yield from visit(child, name)
+
+    yield from visit(tree, "<module>")
+
+def full_scans(db, sql):
+    '''Returns the plan lines that scan a table without an index'''
+    # Bind every named parameter to NULL; the plan does not depend on the values
+    params = {name: None for name in re.findall(r"(?<!:):(\w+)", sql)}
+    plan = db.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    return [
+        row[3] for row in plan
+        if row[3].startswith("SCAN ") and "USING" not in row[3] and "CONSTANT ROW" not in row[3]
+    ]
+
+def check_query_plans(modules=None):
+    '''Returns a list of (module, function, lineno, plan_line) for unexpected full scans'''
+    import database
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = database.create_db_engine(os.path.join(tmp, "plan_check.db"))
+        apply_migrations(engine, verbose=False)
+        engine.dispose()
+
+        failures = []
+        db = sqlite3.connect(os.path.join(tmp, "plan_check.db"))
+        try:
+            for module in modules or PLAN_CHECKED_MODULES:
+                for function_name, lineno, sql in extract_queries(os.path.join(BASE_DIR, module)):
+                    if function_name in ALLOWED_FULL_SCANS:
+                        continue
+                    for line in full_scans(db, sql):
+                        failures.append((module, function_name, lineno, line))
+        finally:
+            db.close()
+    return failures
+
+if __name__ == "__main__":
+    import database
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    db_path = args[0] if args else database.DB_PATH
+
+    if "--check-plans" in sys.argv:
+        failures = check_query_plans()
+        for module, function_name, lineno, line in failures:
+            print(f"FULL SCAN {module}:{lineno} in {function_name}(): {line}")
+        print("--- Query plans OK ---" if not failures else f"--- {len(failures)} full table scan(s) ---")
+        sys.exit(1 if failures else 0)
+
+    engine = database.create_db_engine(db_path)
+    if "--status" in sys.argv:
+        for filename, is_applied in migration_status(engine):
+            print(f"[{'x' if is_applied else ' '}] {filename}")
+        sys.exit(0)
+
+    applied = apply_migrations(engine)
+    print(f"--- {len(applied)} migration(s) applied to {db_path} ---")
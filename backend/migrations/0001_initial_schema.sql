@@ -1,19 +1,9 @@
 -- ==========================================
--- 1. DROP OLD TABLES
+-- 0001: Initial schema (as shipped in schema.sql)
+-- IF NOT EXISTS so databases created from the old script are adopted as-is.
 -- ==========================================
-DROP TABLE IF EXISTS payments;
-DROP TABLE IF EXISTS loan_details;
-DROP TABLE IF EXISTS loans;
-DROP TABLE IF EXISTS loan_plans;
-DROP TABLE IF EXISTS applicants;
-DROP TABLE IF EXISTS audit_logs; 
-DROP TABLE IF EXISTS users;
 
--- ==========================================
--- 2. CREATE NEW TABLES
--- ==========================================
-
-CREATE TABLE users (
+CREATE TABLE IF NOT EXISTS users (
     user_id INTEGER PRIMARY KEY AUTOINCREMENT,
     username VARCHAR(50) UNIQUE NOT NULL,
     password VARCHAR(255) NOT NULL,
@@ -22,12 +12,12 @@ CREATE TABLE users (
     status VARCHAR(20) DEFAULT 'active',
     is_first_login BOOLEAN DEFAULT 1, 
     failed_login_attempts INTEGER DEFAULT 0,
-    lockout_until DATETIME, -- ✅ Added for Rate Limiting
+    lockout_until DATETIME,
     last_login DATETIME,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE TABLE audit_logs (
+CREATE TABLE IF NOT EXISTS audit_logs (
     log_id INTEGER PRIMARY KEY AUTOINCREMENT,
     username VARCHAR(50),
     action VARCHAR(50),
@@ -37,7 +27,7 @@ CREATE TABLE audit_logs (
     timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE TABLE applicants (
+CREATE TABLE IF NOT EXISTS applicants (
     applicant_id INTEGER PRIMARY KEY AUTOINCREMENT,
     first_name VARCHAR(50) NOT NULL,
     middle_name VARCHAR(50),   
@@ -48,25 +38,22 @@ CREATE TABLE applicants (
     email VARCHAR(100),
     phone_num VARCHAR(20),
     address TEXT,
-    
-    -- UPDATED: Stores the actual Base64 Image String
     id_type VARCHAR(50),
     id_image_data TEXT, 
-    
     employment_status VARCHAR(50),
     monthly_income REAL,
     credit_score REAL,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE TABLE loan_plans (
+CREATE TABLE IF NOT EXISTS loan_plans (
     plan_level INTEGER PRIMARY KEY AUTOINCREMENT,
     min_amount REAL,
     max_amount REAL,
     interest_rate REAL
 );
 
-CREATE TABLE loans (
+CREATE TABLE IF NOT EXISTS loans (
     loan_id INTEGER PRIMARY KEY AUTOINCREMENT,
     applicant_id INTEGER NOT NULL,
     loan_plan_lvl INTEGER,
@@ -86,7 +73,7 @@ CREATE TABLE loans (
     FOREIGN KEY (loan_plan_lvl) REFERENCES loan_plans(plan_level)
 );
 
-CREATE TABLE loan_details (
+CREATE TABLE IF NOT EXISTS loan_details (
     loan_detail_id INTEGER PRIMARY KEY AUTOINCREMENT,
     loan_id INTEGER NOT NULL,
     balance REAL,              
@@ -98,7 +85,7 @@ CREATE TABLE loan_details (
     FOREIGN KEY (loan_id) REFERENCES loans(loan_id)
 );
 
-CREATE TABLE payments (
+CREATE TABLE IF NOT EXISTS payments (
     payment_id INTEGER PRIMARY KEY AUTOINCREMENT,
     loan_id INTEGER NOT NULL,
     amount_paid REAL NOT NULL,
@@ -108,12 +95,9 @@ CREATE TABLE payments (
     FOREIGN KEY (loan_id) REFERENCES loans(loan_id)
 );
 
--- ==========================================
--- 3. SEED INITIAL DATA
--- ==========================================
-INSERT INTO loan_plans (plan_level, min_amount, max_amount, interest_rate) VALUES
+INSERT OR IGNORE INTO loan_plans (plan_level, min_amount, max_amount, interest_rate) VALUES
 (1, 5000, 10000, 5),
 (2, 10001, 20000, 8),
 (3, 20001, 30000, 12),
 (4, 30001, 40000, 15),
-(5, 40001, 50000, 18);
\ No newline at end of file
+(5, 40001, 50000, 18);
@@ -0,0 +1,9 @@
+'''0002: References into the ID image file store (see id_images.py)'''
+
+def upgrade(connection):
+    # Databases built from schema.sql after the file store landed already have these
+    columns = {row[1] for row in connection.execute("PRAGMA table_info(applicants)")}
+    if "id_image_hash" not in columns:
+        connection.execute("ALTER TABLE applicants ADD COLUMN id_image_hash VARCHAR(64)")
+    if "id_image_mime" not in columns:
+        connection.execute("ALTER TABLE applicants ADD COLUMN id_image_mime VARCHAR(50)")
@@ -0,0 +1,33 @@
+-- ==========================================
+-- 0003: Dashboard counters (see portfolio_stats.py), filled from the base tables
+-- ==========================================
+
+CREATE TABLE IF NOT EXISTS portfolio_stats (
+    metric VARCHAR(50) NOT NULL,
+    bucket VARCHAR(100) NOT NULL DEFAULT '',
+    value REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (metric, bucket)
+);
+
+DELETE FROM portfolio_stats;
+
+INSERT INTO portfolio_stats (metric, bucket, value)
+SELECT 'status', COALESCE(status, ''), COUNT(*) FROM loans GROUP BY status;
+
+INSERT INTO portfolio_stats (metric, bucket, value)
+SELECT 'purpose', COALESCE(loan_purpose, ''), COUNT(*) FROM loans GROUP BY loan_purpose;
+
+INSERT INTO portfolio_stats (metric, bucket, value)
+SELECT 'gender', COALESCE(gender, ''), COUNT(*) FROM applicants GROUP BY gender;
+
+INSERT INTO portfolio_stats (metric, bucket, value)
+SELECT 'daily_applications', COALESCE(DATE(application_date), ''), COUNT(*) FROM loans GROUP BY DATE(application_date);
+
+INSERT INTO portfolio_stats (metric, bucket, value)
+SELECT 'total_disbursed', '', SUM(principal) FROM loans WHERE status IN ('Approved', 'Settled') HAVING SUM(principal) IS NOT NULL;
+
+INSERT INTO portfolio_stats (metric, bucket, value)
+SELECT 'total_receivable', '', SUM(total_loan) FROM loans WHERE status IN ('Approved', 'Settled') HAVING SUM(total_loan) IS NOT NULL;
+
+INSERT INTO portfolio_stats (metric, bucket, value)
+SELECT 'total_payments', '', SUM(amount_paid) FROM payments HAVING SUM(amount_paid) IS NOT NULL;
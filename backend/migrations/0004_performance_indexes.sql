@@ -0,0 +1,18 @@
+-- ==========================================
+-- 0004: Indexes for the hot filters in app.py / microbank.py
+-- ==========================================
+
+-- Status lists (/api/loans, /api/applications) and date-ordered views
+CREATE INDEX IF NOT EXISTS idx_loans_status_application_date ON loans (status, application_date);
+
+-- "Current row" lookups: every loan join uses loan_id AND is_current = 1
+CREATE INDEX IF NOT EXISTS idx_loan_details_loan_current ON loan_details (loan_id, is_current);
+
+-- Payment history per loan, newest first
+CREATE INDEX IF NOT EXISTS idx_payments_loan_date ON payments (loan_id, transaction_date);
+
+-- Audit log viewer orders by timestamp
+CREATE INDEX IF NOT EXISTS idx_audit_logs_timestamp ON audit_logs (timestamp);
+
+-- Loans by applicant (name lookups joining applicants to loans)
+CREATE INDEX IF NOT EXISTS idx_loans_applicant ON loans (applicant_id);
@@ -0,0 +1,12 @@
+-- ==========================================
+-- 0005: Server-side sessions (see session_store.py)
+-- ==========================================
+
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id VARCHAR(64) PRIMARY KEY,
+    data TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+
+-- Batched cleanup deletes by expiry
+CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions (expires_at);
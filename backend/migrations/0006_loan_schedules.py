@@ -0,0 +1,60 @@
+'''0006: Installment schedule per released loan (see microbank.build_schedule)'''
+from datetime import datetime, timedelta
+
+# Frozen copies of the loan rules at the time of this migration
+SCHEDS = {"Weekly": 4, "Bi-Weekly": 2, "Monthly": 1}
+INTERVAL_DAYS = {"Weekly": 7, "Bi-Weekly": 15, "Monthly": 30}
+
+def upgrade(connection):
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS loan_schedules (
+            schedule_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            loan_id INTEGER NOT NULL,
+            installment_no INTEGER NOT NULL,
+            due_date DATE NOT NULL,
+            amount_due REAL NOT NULL,
+            amount_paid REAL NOT NULL DEFAULT 0,
+            status VARCHAR(20) NOT NULL DEFAULT 'Pending', -- 'Pending', 'Partial', 'Paid'
+            paid_at DATETIME,
+            UNIQUE (loan_id, installment_no),
+            FOREIGN KEY (loan_id) REFERENCES loans(loan_id)
+        )
+    """)
+    # Due-date range scans: collection forecasts, "what is due on X"
+    connection.execute("CREATE INDEX IF NOT EXISTS idx_loan_schedules_due ON loan_schedules(due_date, status)")
+
+    # Loans released before this table existed: rebuild their schedule and
+    # apply the payments already collected, oldest installment first
+    loans = connection.execute("""
+        SELECT l.loan_id, l.status, l.total_loan, l.payment_time_period, l.payment_schedule, l.payment_start_date,
+               COALESCE((SELECT SUM(p.amount_paid) FROM payments p WHERE p.loan_id = l.loan_id), 0)
+        FROM loans l
+        WHERE l.status IN ('Approved', 'Settled') AND l.payment_start_date IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM loan_schedules s WHERE s.loan_id = l.loan_id)
+    """).fetchall()
+
+    rows = []
+    for loan_id, loan_status, total_loan, period, schedule, start_date, total_paid in loans:
+        total_loan = round(float(total_loan or 0), 2)
+        count = max(1, int(period or 1) * SCHEDS.get(schedule, 1))
+        installment = round(total_loan / count, 2)
+        interval = INTERVAL_DAYS.get(schedule, 30)
+        released = datetime.strptime(str(start_date)[:10], "%Y-%m-%d")
+        remaining = round(float(total_paid), 2)
+
+        for number in range(1, count + 1):
+            amount_due = installment if number < count else round(total_loan - installment * (count - 1), 2)
+            amount_paid = min(amount_due, remaining)
+            remaining = round(remaining - amount_paid, 2)
+            status = "Paid" if amount_paid >= amount_due else ("Partial" if amount_paid > 0 else "Pending")
+            if loan_status == "Settled":
+                amount_paid, status = amount_due, "Paid"
+            rows.append((
+                loan_id, number, (released + timedelta(days=interval * number)).strftime("%Y-%m-%d"),
+                amount_due, round(amount_paid, 2), status
+            ))
+
+    connection.executemany(
+        "INSERT INTO loan_schedules (loan_id, installment_no, due_date, amount_due, amount_paid, status) VALUES (?, ?, ?, ?, ?, ?)",
+        rows
+    )
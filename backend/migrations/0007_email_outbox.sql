@@ -0,0 +1,25 @@
+-- ==========================================
+-- 0007: Email outbox (see notifications.py)
+-- ==========================================
+-- Rows are written in the same transaction as the loan change they announce
+-- and sent later by the dispatcher workers.
+
+CREATE TABLE IF NOT EXISTS email_outbox (
+    outbox_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    loan_id INTEGER,
+    event VARCHAR(50) NOT NULL,
+    recipient VARCHAR(255) NOT NULL,
+    subject VARCHAR(255) NOT NULL,
+    html TEXT NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending', -- 'pending', 'sending', 'sent', 'failed'
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,                 -- unix time; also the lease end while 'sending'
+    last_error TEXT,
+    provider_message_id VARCHAR(100),
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    sent_at DATETIME,
+    FOREIGN KEY (loan_id) REFERENCES loans(loan_id)
+);
+
+-- Workers claim due rows by (status, next_attempt_at)
+CREATE INDEX IF NOT EXISTS idx_email_outbox_due ON email_outbox (status, next_attempt_at);
@@ -0,0 +1,10 @@
+-- ==========================================
+-- 0008: Delinquency aging (see aging.py)
+-- ==========================================
+-- Only the current row of each loan, holding every column the aging pass reads
+-- (is_current included, so the index covers the query), in next_due order so
+-- the per-date totals stream out without a sort.
+
+CREATE INDEX IF NOT EXISTS idx_loan_details_current_due
+    ON loan_details (next_due, balance, due_amount, is_current)
+    WHERE is_current = 1;
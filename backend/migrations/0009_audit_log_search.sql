@@ -0,0 +1,34 @@
+-- ==========================================
+-- 0009: Audit log search (see audit_log.search_logs)
+-- ==========================================
+-- Results are ordered newest first by (timestamp, log_id). Every filter column
+-- leads an index that continues with timestamp (and the implicit rowid), so a
+-- filtered page is one index seek plus LIMIT rows, with no sort.
+
+CREATE INDEX IF NOT EXISTS idx_audit_logs_username_time ON audit_logs (username, timestamp);
+CREATE INDEX IF NOT EXISTS idx_audit_logs_action_time ON audit_logs (action, timestamp);
+CREATE INDEX IF NOT EXISTS idx_audit_logs_target_time ON audit_logs (target_id, timestamp);
+
+-- Free text over details. External content: the text lives only in audit_logs,
+-- the triggers keep the index in step with it.
+CREATE VIRTUAL TABLE IF NOT EXISTS audit_logs_fts USING fts5(
+    details,
+    content='audit_logs',
+    content_rowid='log_id'
+);
+
+CREATE TRIGGER IF NOT EXISTS audit_logs_fts_insert AFTER INSERT ON audit_logs BEGIN
+    INSERT INTO audit_logs_fts (rowid, details) VALUES (new.log_id, new.details);
+END;
+
+CREATE TRIGGER IF NOT EXISTS audit_logs_fts_delete AFTER DELETE ON audit_logs BEGIN
+    INSERT INTO audit_logs_fts (audit_logs_fts, rowid, details) VALUES ('delete', old.log_id, old.details);
+END;
+
+CREATE TRIGGER IF NOT EXISTS audit_logs_fts_update AFTER UPDATE OF details ON audit_logs BEGIN
+    INSERT INTO audit_logs_fts (audit_logs_fts, rowid, details) VALUES ('delete', old.log_id, old.details);
+    INSERT INTO audit_logs_fts (rowid, details) VALUES (new.log_id, new.details);
+END;
+
+-- Index the rows that are already there
+INSERT INTO audit_logs_fts (audit_logs_fts) VALUES ('rebuild');
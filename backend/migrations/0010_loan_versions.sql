@@ -0,0 +1,11 @@
+-- ==========================================
+-- 0010: Per-loan version for conditional GETs
+-- ==========================================
+-- Every change to a loan or its payments bumps version (microbank.bump_loan_version),
+-- so /api/loans/<id> and /api/payments/<loan_id> send it as the ETag and answer
+-- If-None-Match with a 304 from a primary-key lookup instead of re-running the join.
+-- updated_at (epoch seconds) is the Last-Modified; NULL on loans not touched since
+-- this migration, which get an ETag only.
+
+ALTER TABLE loans ADD COLUMN version INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE loans ADD COLUMN updated_at REAL;
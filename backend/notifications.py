@@ -0,0 +1,356 @@
+import atexit
+import html
+import os
+import random
+import sys
+import threading
+import time
+import resend
+from datetime import datetime
+from sqlalchemy import text
+
+# Applicant emails go through an outbox table:
+#   enqueue_loan_notice() renders the message and inserts it with the caller's connection,
+#   so it commits (or rolls back) together with the loan change it announces;
+#   OutboxDispatcher workers claim due rows in batches, send them through a provider under
+#   a shared per-second rate limit, and retry failures with exponential backoff.
+# Delivery is at-least-once: a worker that dies between sending and marking a batch
+# re-sends it after the claim lease runs out.
+
+NOTIFICATIONS_ENABLED = os.getenv("EMAIL_NOTIFICATIONS", "1").lower() not in ("0", "false", "no")
+DEFAULT_SENDER = "Microbank <onboarding@resend.dev>"
+
+# event -> (subject, html body); values are HTML-escaped before formatting
+TEMPLATES = {
+    "application_received": (
+        "We received your loan application",
+        "<p>Hi {first_name},</p>"
+        "<p>We received your application for a loan of PHP {principal:,.2f}. "
+        "We will email you again once it has been reviewed.</p>"
+    ),
+    "application_approved": (
+        "Your loan application was approved",
+        "<p>Hi {first_name},</p>"
+        "<p>Your loan application for PHP {principal:,.2f} was approved and is now waiting for release. "
+        "We will contact you to schedule the release of funds.</p>"
+    ),
+    "application_rejected": (
+        "Update on your loan application",
+        "<p>Hi {first_name},</p>"
+        "<p>We are unable to approve your loan application for PHP {principal:,.2f} at this time.</p>"
+        "<p>Reason: {remarks}</p>"
+    ),
+    "loan_released": (
+        "Your loan has been released",
+        "<p>Hi {first_name},</p>"
+        "<p>Your loan of PHP {principal:,.2f} has been released. Total repayment is PHP {total_loan:,.2f}.</p>"
+        "<p>Your first payment of PHP {due_amount:,.2f} is due on {next_due}.</p>"
+    ),
+}
+
+# --- ENQUEUE ---
+
+def enqueue_loan_notice(connection, loan_id, event, **context):
+    '''Queues the event's email to the loan's applicant. Returns the outbox id, or None if skipped.'''
+    if not NOTIFICATIONS_ENABLED:
+        return None
+
+    applicant = connection.execute(
+        text("""
+            SELECT a.email, a.first_name, a.last_name, l.principal, l.total_loan
+            FROM loans l
+            JOIN applicants a ON a.applicant_id = l.applicant_id
+            WHERE l.loan_id = :lid
+        """),
+        {"lid": loan_id}
+    ).mappings().fetchone()
+
+    if not applicant or not applicant["email"]:
+        return None
+
+    subject, body = TEMPLATES[event]
+    values = {k: html.escape(v) if isinstance(v, str) else v for k, v in {**applicant, **context}.items()}
+    result = connection.execute(
+        text("""
+            INSERT INTO email_outbox (loan_id, event, recipient, subject, html, next_attempt_at)
+            VALUES (:lid, :event, :to, :subject, :html, :now)
+        """),
+        {
+            "lid": loan_id, "event": event, "to": applicant["email"],
+            "subject": subject, "html": body.format(**values), "now": time.time()
+        }
+    )
+    return result.lastrowid
+
+def outbox_stats(conn):
+    with conn.connect() as connection:
+        rows = connection.execute(
+            text("SELECT status, COUNT(*) AS total FROM email_outbox GROUP BY status")
+        ).fetchall()
+    return {status: total for status, total in rows}
+
+# --- PROVIDERS ---
+# A provider has max_batch and send_batch(messages) -> provider ids (one per message, in order).
+# send_batch raises if the batch was not accepted; the whole batch is then retried.
+
+class ResendProvider:
+    name = "resend"
+    max_batch = 100  # Resend's batch endpoint limit
+
+    def __init__(self, api_key, sender=DEFAULT_SENDER):
+        self.api_key = api_key
+        self.sender = sender
+
+    def send_batch(self, messages):
+        resend.api_key = self.api_key
+        params = [
+            {"from": self.sender, "to": [m["recipient"]], "subject": m["subject"], "html": m["html"]}
+            for m in messages
+        ]
+        if len(params) == 1:
+            return [resend.Emails.send(params[0])["id"]]
+        return [item["id"] for item in resend.Batch.send(params)["data"]]
+
+class StubProvider:
+    '''Local stand-in for Resend (development, tests, benchmarks): keeps messages in memory'''
+    name = "stub"
+    max_batch = 100
+
+    def __init__(self, latency=0.0, failure_rate=0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.sent = []
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def send_batch(self, messages):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+            if self.failure_rate and random.random() < self.failure_rate:
+                raise RuntimeError("stub provider: simulated failure")
+            first = len(self.sent)
+            self.sent.extend(messages)
+        return [f"stub-{first + i}" for i in range(len(messages))]
+
+def build_provider(name=None):
+    name = name or os.getenv("EMAIL_PROVIDER") or ("resend" if os.getenv("RESEND_API_KEY") else "stub")
+    if name == "resend":
+        return ResendProvider(os.getenv("RESEND_API_KEY"), os.getenv("EMAIL_FROM", DEFAULT_SENDER))
+    if name == "stub":
+        return StubProvider(latency=float(os.getenv("EMAIL_STUB_LATENCY", "0")))
+    raise ValueError(f"Unknown EMAIL_PROVIDER '{name}'. Expected resend or stub.")
+
+# --- DISPATCHER ---
+
+class RateLimiter:
+    '''Token bucket shared by all workers: at most `rate` provider calls per second (0 = unlimited)'''
+    def __init__(self, rate):
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, stop_event):
+        if self.rate <= 0:
+            return True
+        while not stop_event.is_set():
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            stop_event.wait(wait)
+        return False
+
+DUE_SQL = text(
+    "SELECT 1 FROM email_outbox WHERE status IN ('pending', 'sending') AND next_attempt_at <= :now LIMIT 1"
+)
+
+# Claiming bumps next_attempt_at to the lease end, so a concurrent claim (another
+# thread or process) skips these rows and a crashed worker's rows come back later.
+CLAIM_SQL = text("""
+    UPDATE email_outbox
+    SET status = 'sending', attempts = attempts + 1, next_attempt_at = :lease
+    WHERE outbox_id IN (
+        SELECT outbox_id FROM email_outbox
+        WHERE status IN ('pending', 'sending') AND next_attempt_at <= :now
+        ORDER BY next_attempt_at
+        LIMIT :n
+    )
+    RETURNING outbox_id, recipient, subject, html, attempts
+""")
+
+class OutboxDispatcher:
+    def __init__(self, conn, provider, workers=2, batch_size=50, rate_per_second=2.0, poll_interval=1.0,
+                 max_attempts=6, backoff_base=30.0, backoff_max=3600.0, lease_seconds=120.0):
+        self.conn = conn
+        self.provider = provider
+        self.workers = workers
+        self.batch_size = min(batch_size, provider.max_batch)
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease_seconds = lease_seconds
+        self.limiter = RateLimiter(rate_per_second)
+        self._lock = threading.Lock()
+        self._reset()
+        atexit.register(self.stop)
+
+    def _reset(self):
+        # Also called after a fork: the parent's threads do not carry over
+        self._pid = os.getpid()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._threads = []
+
+    def start(self):
+        '''Starts the worker threads (again, in a forked child)'''
+        if self._pid != os.getpid():
+            self._reset()
+        with self._lock:
+            self._stop.clear()
+            self._threads = [t for t in self._threads if t.is_alive()]
+            for i in range(len(self._threads), self.workers):
+                thread = threading.Thread(target=self._run, name=f"email-outbox-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def wake(self):
+        '''Skips the rest of the idle wait; the routes call it once a commit has queued mail'''
+        self._wake.set()
+
+    def stop(self, timeout=5.0):
+        if self._pid != os.getpid():
+            return
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                claimed = self.dispatch_once()
+            except Exception as e:
+                print(f"EMAIL OUTBOX ERROR: {e}")
+                claimed = 0
+            if not claimed:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def dispatch_once(self):
+        '''Claims one batch of due messages and sends it. Returns how many were claimed.'''
+        # Read-only check first so an idle outbox never takes the write lock
+        with self.conn.connect() as connection:
+            if not connection.execute(DUE_SQL, {"now": time.time()}).fetchone():
+                return 0
+
+        if not self.limiter.acquire(self._stop):
+            return 0
+
+        now = time.time()
+        with self.conn.connect() as connection:
+            batch = connection.execute(
+                CLAIM_SQL, {"now": now, "lease": now + self.lease_seconds, "n": self.batch_size}
+            ).mappings().fetchall()
+            connection.commit()
+
+        if not batch:
+            return 0
+        try:
+            provider_ids = self.provider.send_batch([dict(m) for m in batch])
+        except Exception as e:
+            self._record_failure(batch, e)
+        else:
+            self._record_sent(batch, provider_ids)
+        return len(batch)
+
+    def drain(self):
+        '''Sends everything that is due now, in the calling thread. Returns the number claimed.'''
+        total = 0
+        while True:
+            claimed = self.dispatch_once()
+            if not claimed:
+                return total
+            total += claimed
+
+    def _record_sent(self, batch, provider_ids):
+        with self.conn.connect() as connection:
+            connection.execute(
+                text("""
+                    UPDATE email_outbox
+                    SET status = 'sent', sent_at = :at, provider_message_id = :pid, last_error = NULL
+                    WHERE outbox_id = :id
+                """),
+                [
+                    {"id": m["outbox_id"], "pid": pid, "at": datetime.now()}
+                    for m, pid in zip(batch, provider_ids)
+                ]
+            )
+            connection.commit()
+
+    def _record_failure(self, batch, error):
+        now = time.time()
+        updates = []
+        for m in batch:
+            if m["attempts"] >= self.max_attempts:
+                updates.append({"id": m["outbox_id"], "status": "failed", "next": now, "err": str(error)})
+            else:
+                delay = min(self.backoff_max, self.backoff_base * 2 ** (m["attempts"] - 1))
+                # Jitter so a provider outage does not end in one synchronized retry burst
+                delay *= random.uniform(0.8, 1.2)
+                updates.append({"id": m["outbox_id"], "status": "pending", "next": now + delay, "err": str(error)})
+
+        print(f"EMAIL SEND FAILED ({len(batch)} messages): {error}")
+        with self.conn.connect() as connection:
+            connection.execute(
+                text("UPDATE email_outbox SET status = :status, next_attempt_at = :next, last_error = :err WHERE outbox_id = :id"),
+                updates
+            )
+            connection.commit()
+
+def dispatcher_from_env(conn, provider=None):
+    return OutboxDispatcher(
+        conn,
+        provider or build_provider(),
+        workers=int(os.getenv("EMAIL_WORKERS", "2")),
+        batch_size=int(os.getenv("EMAIL_BATCH_SIZE", "50")),
+        rate_per_second=float(os.getenv("EMAIL_RATE_PER_SECOND", "2")),
+        max_attempts=int(os.getenv("EMAIL_MAX_ATTEMPTS", "6")),
+    )
+
+if __name__ == "__main__":
+    # Standalone sender, for running with EMAIL_WORKERS=0 in the web processes
+    import database
+    import migrate
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    engine = database.create_db_engine()
+    migrate.apply_migrations(engine)
+
+    if "--status" in sys.argv:
+        for status, total in sorted(outbox_stats(engine).items()):
+            print(f"{status:<10}{total:>8}")
+        sys.exit(0)
+
+    dispatcher = dispatcher_from_env(engine)
+    if "--once" in sys.argv:
+        print(f"--- {dispatcher.drain()} message(s) processed ---")
+        sys.exit(0)
+
+    dispatcher.workers = max(1, dispatcher.workers)
+    dispatcher.start()
+    print(f"Sending via {dispatcher.provider.name} with {dispatcher.workers} worker(s). Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        dispatcher.stop()
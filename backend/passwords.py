@@ -0,0 +1,90 @@
+import atexit
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+import procpool
+
+# Password hashing and verification off the request thread.
+# PBKDF2 is slow on purpose (~0.4 s at werkzeug's 1M iterations), so it runs on a
+# small process pool. At most max_pending hashes may be running or queued per
+# process; past that the caller gets HasherBusy ("try again") instead of joining
+# an ever-growing backlog at shift start.
+# PASSWORD_HASH_METHOD is what new hashes use. A successful login against a hash
+# made with other parameters re-hashes the password in the same pool job.
+
+PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", f"pbkdf2:sha256:{DEFAULT_PBKDF2_ITERATIONS}")
+
+class HasherBusy(Exception):
+    pass
+
+def needs_rehash(stored_hash, method=PASSWORD_HASH_METHOD):
+    '''True when stored_hash was made with a different method/iteration count'''
+    return stored_hash.split("$", 1)[0] != method
+
+def check_and_upgrade(stored_hash, password, method=PASSWORD_HASH_METHOD):
+    '''Runs in a pool worker. Returns (matches, new hash or None)'''
+    if not check_password_hash(stored_hash, password):
+        return False, None
+    return True, generate_password_hash(password, method=method) if needs_rehash(stored_hash, method) else None
+
+class PasswordHasher:
+    def __init__(self, workers=2, max_pending=8, timeout=30.0, method=PASSWORD_HASH_METHOD):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.method = method
+        self._lock = threading.Lock()
+        self._reset()
+        atexit.register(self.close)
+
+    def _reset(self):
+        # Also called after a fork: the parent's pool processes are not ours to use
+        self._pid = os.getpid()
+        self._pool = None
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+
+    def _get_pool(self):
+        if self._pid != os.getpid():
+            self._reset()
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=procpool.fork_context(),
+                        initializer=procpool.detach_from_server, initargs=(os.getpid(),)
+                    )
+        return self._pool
+
+    def _run(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+        pool = self._get_pool()
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            return pool.submit(fn, *args).result(timeout=self.timeout)
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def check(self, stored_hash, password):
+        return self._run(check_password_hash, stored_hash, password)
+
+    def check_and_upgrade(self, stored_hash, password):
+        '''Returns (matches, new hash or None); the new hash is set when the stored one is outdated'''
+        return self._run(check_and_upgrade, stored_hash, password, self.method)
+
+    def close(self):
+        if self._pool is not None and self._pid == os.getpid():
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+def hasher_from_env():
+    return PasswordHasher(
+        workers=int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1)))),
+        max_pending=int(os.getenv("PASSWORD_HASH_MAX_PENDING", "16")),
+        timeout=float(os.getenv("PASSWORD_HASH_TIMEOUT", "30")),
+    )
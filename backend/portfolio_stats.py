@@ -0,0 +1,127 @@
+import sys
+from sqlalchemy import text
+
+# Dashboard counters, maintained incrementally by every write that moves them.
+# Each row is (metric, bucket, value); scalar metrics use bucket ''.
+#   status            -> loan count per status
+#   purpose / gender  -> distributions for the dashboard charts
+#   daily_applications-> applications per DATE(application_date)
+#   total_disbursed / total_receivable / total_payments -> money sums
+FUNDED_STATUSES = ("Approved", "Settled")
+
+# --- INCREMENTAL UPDATES ---
+# Call these with the same connection (and transaction) as the write they describe.
+
+def bump(connection, metric, bucket="", delta=1):
+    if not delta:
+        return
+    connection.execute(
+        text("""
+            INSERT INTO portfolio_stats (metric, bucket, value) VALUES (:m, :b, :d)
+            ON CONFLICT(metric, bucket) DO UPDATE SET value = value + excluded.value
+        """),
+        {"m": metric, "b": bucket or "", "d": delta}
+    )
+
+def record_application(connection, loan_purpose, gender, application_date):
+    bump(connection, "status", "Pending")
+    bump(connection, "purpose", loan_purpose)
+    bump(connection, "gender", gender)
+    bump(connection, "daily_applications", application_date.strftime("%Y-%m-%d"))
+
+def record_status_change(connection, old_status, new_status, principal=0, total_loan=0):
+    if old_status == new_status:
+        return
+    bump(connection, "status", old_status, -1)
+    bump(connection, "status", new_status, 1)
+
+    # Money moves in or out of the funded totals only when crossing that boundary
+    was_funded = old_status in FUNDED_STATUSES
+    is_funded = new_status in FUNDED_STATUSES
+    if was_funded != is_funded:
+        sign = 1 if is_funded else -1
+        bump(connection, "total_disbursed", "", sign * float(principal or 0))
+        bump(connection, "total_receivable", "", sign * float(total_loan or 0))
+
+def record_payment(connection, amount):
+    bump(connection, "total_payments", "", float(amount))
+
+# --- READ / REBUILD ---
+
+def compute_stats(connection):
+    '''Recomputes every counter from the base tables. Returns {(metric, bucket): value}'''
+    queries = [
+        "SELECT 'status', status, COUNT(*) FROM loans GROUP BY status",
+        "SELECT 'purpose', loan_purpose, COUNT(*) FROM loans GROUP BY loan_purpose",
+        "SELECT 'gender', gender, COUNT(*) FROM applicants GROUP BY gender",
+        "SELECT 'daily_applications', DATE(application_date), COUNT(*) FROM loans GROUP BY DATE(application_date)",
+        "SELECT 'total_disbursed', '', SUM(principal) FROM loans WHERE status IN ('Approved', 'Settled')",
+        "SELECT 'total_receivable', '', SUM(total_loan) FROM loans WHERE status IN ('Approved', 'Settled')",
+        "SELECT 'total_payments', '', SUM(amount_paid) FROM payments",
+    ]
+    stats = {}
+    for query in queries:
+        for metric, bucket, value in connection.execute(text(query)).fetchall():
+            if value:
+                stats[(metric, bucket or "")] = value
+    return stats
+
+def read_stats(connection):
+    '''Every counter row (verify); the dashboard reads through read_dashboard_stats'''
+    rows = connection.execute(text("SELECT metric, bucket, value FROM portfolio_stats")).fetchall()
+    return {(metric, bucket): value for metric, bucket, value in rows}
+
+def read_dashboard_stats(connection, days=30):
+    '''
+    The dashboard's counters, by primary key: the bounded metrics (statuses, purposes,
+    genders, money sums) plus the first `days` daily_applications buckets. That metric
+    gains a row a day, so it is read as a LIMITed range, not in full.
+    '''
+    rows = connection.execute(text("""
+        SELECT metric, bucket, value FROM portfolio_stats
+        WHERE metric IN ('status', 'purpose', 'gender', 'total_disbursed', 'total_receivable', 'total_payments')
+    """)).fetchall()
+    rows += connection.execute(text("""
+        SELECT 'daily_applications', bucket, value FROM portfolio_stats
+        WHERE metric = 'daily_applications' AND value != 0
+        ORDER BY bucket LIMIT :days
+    """), {"days": days}).fetchall()
+    return {(metric, bucket): value for metric, bucket, value in rows}
+
+def rebuild(conn):
+    '''Throws the counters away and recomputes them in one transaction'''
+    with conn.connect() as connection:
+        with connection.begin():
+            connection.execute(text("DELETE FROM portfolio_stats"))
+            for (metric, bucket), value in compute_stats(connection).items():
+                bump(connection, metric, bucket, value)
+
+def verify(conn, tolerance=0.005):
+    '''Compares the maintained counters with a fresh recount. Returns a list of mismatches.'''
+    with conn.connect() as connection:
+        expected = compute_stats(connection)
+        actual = {key: value for key, value in read_stats(connection).items() if value}
+
+    mismatches = []
+    for key in sorted(set(expected) | set(actual)):
+        if abs((expected.get(key) or 0) - (actual.get(key) or 0)) > tolerance:
+            mismatches.append({"metric": key[0], "bucket": key[1], "expected": expected.get(key, 0), "actual": actual.get(key, 0)})
+    return mismatches
+
+if __name__ == "__main__":
+    import migrate
+    import database
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    db_path = args[0] if args else database.DB_PATH
+    engine = database.create_db_engine(db_path)
+    migrate.apply_migrations(engine)
+
+    if "--verify" in sys.argv:
+        problems = verify(engine)
+        for p in problems:
+            print(f"MISMATCH {p['metric']}[{p['bucket']}]: expected {p['expected']}, stored {p['actual']}")
+        print("--- Portfolio stats OK ---" if not problems else f"--- {len(problems)} mismatch(es) ---")
+        sys.exit(1 if problems else 0)
+
+    rebuild(engine)
+    print("--- Portfolio stats rebuilt ---")
@@ -0,0 +1,34 @@
+import multiprocessing
+import os
+import stat
+import threading
+import time
+
+# Helpers for process pools forked from the web server: the password hashing pool
+# (passwords.py) and the cash-flow simulation pool (cashflow.py).
+
+def fork_context():
+    '''fork where available: a spawned child would re-import the app module that started it'''
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("fork" if "fork" in methods else None)
+
+def detach_from_server(parent_pid):
+    # Pool initializer. A forked worker starts with copies of every socket the server
+    # had open: the listening socket and the client connections of that moment. A
+    # connection the server closes stays open while a copy lives on, so the client's
+    # next keep-alive request hangs. The pool itself talks over pipes, not sockets.
+    fd_dir = "/proc/self/fd" if os.path.isdir("/proc/self/fd") else "/dev/fd"
+    for name in os.listdir(fd_dir):
+        fd = int(name)
+        try:
+            if stat.S_ISSOCK(os.fstat(fd).st_mode):
+                os.close(fd)
+        except OSError:
+            pass
+
+    # And do not outlive a server that was killed without running atexit (SIGTERM)
+    def watch():
+        while os.getppid() == parent_pid:
+            time.sleep(1)
+        os._exit(0)
+    threading.Thread(target=watch, daemon=True).start()
@@ -0,0 +1,354 @@
+"""
+Synthetic loan portfolio for local performance work.
+
+    python seed_portfolio.py --loans 100000 [--seed 42] [--days 730] [--db PATH] [--reset]
+
+Seeds the staff accounts (seed_user.py plus tellers/managers, password = username), then
+applicants and loans in every status. Released loans get their installment schedule,
+their loan_details history (one row per payment) and their payments, all consistent
+with what release_loan/apply_payment would have written. Offers use the same rules as
+Applicant.calculate_offer (via microbank.calculate_offers). The same --seed always
+builds the same portfolio.
+
+Rows are generated with NumPy in chunks and written with executemany on the "bulk"
+engine profile. Appending to an existing database continues after its highest ids.
+"""
+import argparse
+import sys
+import time
+from datetime import date, timedelta
+import numpy as np
+import database
+import microbank as mb
+import migrate
+import portfolio_stats
+import seed_user
+
+FIRST_NAMES = {
+    "Male": ["Jose", "Juan", "Mark", "John Paul", "Carlo", "Miguel", "Rafael", "Angelo", "Paolo", "Ramon",
+             "Christian", "Jerome", "Noel", "Francis", "Arnel", "Rodel", "Vincent", "Joshua", "Dennis", "Ryan"],
+    "Female": ["Maria", "Ana", "Kristine", "Jessa", "Angelica", "Camille", "Rowena", "Liza", "Grace", "Mylene",
+               "Joy", "Patricia", "Andrea", "Nicole", "Sheila", "Marites", "Cristina", "Jasmine", "Lovely", "Rhea"],
+}
+LAST_NAMES = ["Santos", "Reyes", "Cruz", "Bautista", "Ocampo", "Garcia", "Mendoza", "Torres", "Tomas", "Andrada",
+              "Castillo", "Flores", "Villanueva", "Ramos", "Castro", "Rivera", "Aquino", "Navarro", "Salazar", "Mercado",
+              "Dela Cruz", "Gonzales", "Lopez", "Fernandez", "Domingo", "Manalo", "Pascual", "Soriano", "Valdez", "Cosep"]
+CITIES = ["Cebu City", "Mandaue City", "Lapu-Lapu City", "Talisay City", "Davao City", "Quezon City",
+          "Manila", "Makati City", "Pasig City", "Iloilo City", "Bacolod City", "Cagayan de Oro"]
+
+CIVIL_STATUSES = (["Single", "Married", "Widowed", "Separated"], [0.45, 0.45, 0.05, 0.05])
+EMPLOYMENT = (["employed", "self-employed", "ofw", "retired"], [0.5, 0.3, 0.12, 0.08])
+ID_TYPES = (["PhilSys", "UMID", "Passport", "Driver License", "PRC"], [0.35, 0.2, 0.15, 0.25, 0.05])
+PURPOSES = (["Business Capital", "Education", "Medical", "Renovation", "Emergency", "Other"],
+            [0.35, 0.15, 0.12, 0.15, 0.15, 0.08])
+DISBURSEMENT = (["Cash Pickup", "GCash", "Maya", "Bank Transfer"], [0.35, 0.35, 0.1, 0.2])
+TERMS = ([3, 6, 12, 24], [0.3, 0.3, 0.3, 0.1])
+SCHEDULES = (["Monthly", "Bi-Weekly", "Weekly"], [0.6, 0.25, 0.15])
+REJECTION_REMARKS = ["Credit score too low", "Incomplete requirements", "Unable to verify income",
+                     "Existing unpaid obligations", "Applicant withdrew"]
+
+EPOCH = date(1970, 1, 1)
+
+def pick(rng, choices, size):
+    values, weights = choices
+    return np.asarray(values, dtype=object)[rng.choice(len(values), size, p=weights)]
+
+def day_strings(days):
+    '''Days since 1970-01-01 -> 'YYYY-MM-DD' '''
+    return np.datetime_as_string(np.asarray(days, dtype="datetime64[D]"), unit="D").astype(object)
+
+def timestamp_strings(seconds):
+    '''Seconds since 1970-01-01 -> 'YYYY-MM-DD HH:MM:SS' '''
+    text = np.datetime_as_string(np.asarray(seconds, dtype="datetime64[s]"), unit="s")
+    return np.char.replace(text, "T", " ").astype(object)
+
+def random_credit_scores(rng, size):
+    '''Same buckets and weights as microbank.generate_random_score'''
+    low = np.array([500, 580, 670, 740])
+    high = np.array([579, 669, 739, 850])
+    bucket = rng.choice(4, size, p=[0.1, 0.3, 0.4, 0.2])
+    return rng.integers(low[bucket], high[bucket] + 1)
+
+# --- STAFF ---
+
+def staff_accounts(tellers, managers):
+    accounts = [{"username": f"teller.{i}", "password": f"teller.{i}", "role": "teller", "full_name": f"Teller {i}"}
+                for i in range(1, tellers + 1)]
+    accounts += [{"username": f"manager.{i}", "password": f"manager.{i}", "role": "manager", "full_name": f"Manager {i}"}
+                 for i in range(1, managers + 1)]
+    return accounts
+
+# --- GENERATION ---
+
+def generate_chunk(rng, first_applicant_id, first_loan_id, size, today, days, processors):
+    '''Builds one chunk of rows per table as lists of tuples, ready for executemany'''
+    applicant_ids = np.arange(first_applicant_id, first_applicant_id + size)
+    loan_ids = np.arange(first_loan_id, first_loan_id + size)
+    today_day = (today - EPOCH).days
+
+    # --- Applicants ---
+    gender = np.where(rng.random(size) < 0.52, "Female", "Male").astype(object)
+    first_index = rng.integers(0, 20, size)
+    first_name = np.where(
+        gender == "Female",
+        np.asarray(FIRST_NAMES["Female"], dtype=object)[first_index],
+        np.asarray(FIRST_NAMES["Male"], dtype=object)[first_index],
+    )
+    last_name = np.asarray(LAST_NAMES, dtype=object)[rng.integers(0, len(LAST_NAMES), size)]
+    middle_name = np.asarray(LAST_NAMES, dtype=object)[rng.integers(0, len(LAST_NAMES), size)]
+    birth_day = today_day - rng.integers(21 * 365, 65 * 365, size)
+    credit_score = random_credit_scores(rng, size)
+
+    # --- Offers (the real pricing rules) ---
+    principal = rng.integers(10, 101, size) * 500
+    term = pick(rng, TERMS, size).astype(np.int64)
+    schedule = pick(rng, SCHEDULES, size)
+    offers = mb.calculate_offers(principal, credit_score, term, schedule)
+    payment_count = offers["payment_count"]
+    installment = offers["payment_amount"]
+    total_loan = offers["total_repayment"]
+    last_installment = mb.round_cents(total_loan - installment * (payment_count - 1))
+
+    # Income high enough to pass the 60% burden check in assess_eligibility
+    monthly_burden = installment * mb.get_schedule_multipliers(schedule)
+    monthly_income = np.ceil(monthly_burden / rng.uniform(0.15, 0.6, size) / 100) * 100
+
+    plan_level = np.select(
+        [principal >= 40001, principal >= 30001, principal >= 20001, principal >= 10001], [5, 4, 3, 2], default=1
+    )
+
+    # --- Lifecycle ---
+    application_day = today_day - rng.integers(0, days, size)
+    application_seconds = application_day * 86400 + rng.integers(8 * 3600, 18 * 3600, size)
+    age_days = today_day - application_day
+
+    status = np.full(size, "Approved", dtype=object)
+    recent = age_days < 14
+    roll = rng.random(size)
+    status[recent & (roll < 0.45)] = "Pending"
+    status[recent & (roll >= 0.45) & (roll < 0.7)] = "For Release"
+    status[rng.random(size) < 0.12] = "Rejected"
+
+    release_day = np.minimum(application_day + rng.integers(1, 15, size), today_day)
+    interval = np.select([schedule == "Weekly", schedule == "Bi-Weekly"], [7, 15], default=30)
+    released = status == "Approved"
+    installments_due = np.clip((today_day - release_day) // interval, 0, payment_count)
+
+    # Fully run schedules are mostly settled; the rest stay Approved and overdue
+    settled = released & (installments_due >= payment_count) & (rng.random(size) < 0.9)
+    status[settled] = "Settled"
+    missed = rng.choice(4, size, p=[0.8, 0.1, 0.06, 0.04])
+    paid_count = np.where(settled, payment_count, np.clip(installments_due - missed, 0, payment_count - 1))
+    paid_count[~(released | settled)] = 0
+
+    # Some open loans have a partial payment on their next installment
+    next_amount = np.where(paid_count + 1 == payment_count, last_installment, installment)
+    has_partial = (status == "Approved") & (rng.random(size) < 0.1)
+    partial_amount = np.where(has_partial, mb.round_cents(next_amount * rng.uniform(0.2, 0.8, size)), 0.0)
+
+    remarks = np.full(size, None, dtype=object)
+    rejected = status == "Rejected"
+    remarks[rejected] = np.asarray(REJECTION_REMARKS, dtype=object)[rng.integers(0, len(REJECTION_REMARKS), rejected.sum())]
+
+    applicant_rows = list(zip(
+        applicant_ids.tolist(), first_name.tolist(), middle_name.tolist(), last_name.tolist(),
+        day_strings(birth_day).tolist(), gender.tolist(), pick(rng, CIVIL_STATUSES, size).tolist(),
+        [f"{f.lower().replace(' ', '')}.{l.lower().replace(' ', '')}{i}@example.com"
+         for f, l, i in zip(first_name.tolist(), last_name.tolist(), applicant_ids.tolist())],
+        [f"09{n:09d}" for n in rng.integers(0, 10**9, size).tolist()],
+        [f"{n} Rizal St., {c}" for n, c in zip(rng.integers(1, 999, size).tolist(),
+                                                np.asarray(CITIES, dtype=object)[rng.integers(0, len(CITIES), size)].tolist())],
+        pick(rng, ID_TYPES, size).tolist(), pick(rng, EMPLOYMENT, size).tolist(),
+        monthly_income.tolist(), credit_score.tolist(), timestamp_strings(application_seconds).tolist(),
+    ))
+
+    disbursement = pick(rng, DISBURSEMENT, size)
+    account_number = np.where(
+        disbursement == "Cash Pickup", "", np.char.mod("%012d", rng.integers(0, 10**12, size)).astype(object)
+    )
+    funded = released | settled
+    start_date = np.where(funded, day_strings(release_day), None)
+    loan_rows = list(zip(
+        loan_ids.tolist(), applicant_ids.tolist(), plan_level.tolist(), principal.astype(float).tolist(),
+        total_loan.tolist(), installment.tolist(), pick(rng, PURPOSES, size).tolist(), disbursement.tolist(),
+        account_number.tolist(), timestamp_strings(application_seconds).tolist(), start_date.tolist(),
+        term.tolist(), schedule.tolist(), status.tolist(), remarks.tolist(),
+    ))
+
+    # --- Installment schedules (released loans only), one flat row per installment ---
+    f = np.flatnonzero(funded)
+    counts = payment_count[f]
+    owner = np.repeat(f, counts)
+    starts = np.cumsum(counts) - counts
+    number = np.arange(counts.sum()) - np.repeat(starts, counts) + 1
+    is_last = number == payment_count[owner]
+    amount_due = np.where(is_last, last_installment[owner], installment[owner])
+    due_day = release_day[owner] + interval[owner] * number
+
+    fully_paid = number <= paid_count[owner]
+    partly_paid = (number == paid_count[owner] + 1) & has_partial[owner]
+    amount_paid = np.where(fully_paid, amount_due, np.where(partly_paid, partial_amount[owner], 0.0))
+
+    # Paid a couple of days either side of the due date, never before release or after today
+    paid_day = np.clip(due_day + rng.integers(-2, 3, len(number)), release_day[owner], today_day)
+    paid_day = np.where(partly_paid, np.clip(due_day - interval[owner] // 2, release_day[owner], today_day), paid_day)
+    paid_seconds = paid_day * 86400 + rng.integers(8 * 3600, 18 * 3600, len(number))
+    paid_at = timestamp_strings(paid_seconds)
+
+    schedule_status = np.where(fully_paid, "Paid", np.where(partly_paid, "Partial", "Pending")).astype(object)
+    schedule_rows = list(zip(
+        loan_ids[owner].tolist(), number.tolist(), day_strings(due_day).tolist(), amount_due.tolist(),
+        amount_paid.tolist(), schedule_status.tolist(), np.where(fully_paid, paid_at, None).tolist(),
+    ))
+
+    # --- Payments, with the remarks apply_payment would have written ---
+    remaining_after = payment_count[owner] - number
+    payment_remarks = np.select(
+        [partly_paid, remaining_after == 0, remaining_after == 1],
+        ["Partial Payment", "Settled", "Final Payment Scheduled"],
+        default="On-Time Payment",
+    ).astype(object)
+    made = fully_paid | partly_paid
+    processed_by = np.asarray(processors, dtype=object)[rng.integers(0, len(processors), len(number))]
+    payment_rows = list(zip(
+        loan_ids[owner][made].tolist(), amount_paid[made].tolist(), payment_remarks[made].tolist(),
+        paid_at[made].tolist(), processed_by[made].tolist(),
+    ))
+
+    # --- loan_details history: the state at release, then the state after each payment ---
+    paid_before = np.cumsum(amount_paid) - np.repeat(np.cumsum(amount_paid)[starts] - amount_paid[starts], counts)
+    balance_after = mb.round_cents(total_loan[owner] - paid_before)
+    has_next = ~is_last
+    following = np.minimum(np.arange(len(number)) + 1, len(number) - 1)
+
+    # After a full payment the next installment is due; after a partial, the same one
+    next_due = np.where(partly_paid, day_strings(due_day), np.where(has_next, day_strings(due_day[following]), None))
+    next_amount_due = np.where(
+        partly_paid, mb.round_cents(amount_due - amount_paid), np.where(has_next, amount_due[following], 0.0)
+    )
+    left = np.where(partly_paid, remaining_after + 1, remaining_after)
+    settled_row = fully_paid & is_last
+    next_due = np.where(settled_row, None, next_due)
+
+    initial = np.flatnonzero(number == 1)
+    detail_loan = np.concatenate([owner[initial], owner[made]])
+    detail_order = np.concatenate([np.zeros(len(initial), dtype=np.int64), number[made]])
+    detail_columns = {
+        "balance": np.concatenate([total_loan[owner[initial]], balance_after[made]]),
+        "due": np.concatenate([amount_due[initial], next_amount_due[made]]),
+        "next_due": np.concatenate([day_strings(due_day[initial]), next_due[made]]),
+        "left": np.concatenate([payment_count[owner[initial]], left[made]]),
+        "at": np.concatenate([day_strings(release_day[owner[initial]]), paid_at[made]]),
+    }
+    order = np.lexsort((detail_order, detail_loan))
+    detail_loan = detail_loan[order]
+    is_current = np.append(detail_loan[1:] != detail_loan[:-1], True) if len(detail_loan) else detail_loan.astype(bool)
+    detail_rows = list(zip(
+        loan_ids[detail_loan].tolist(), detail_columns["balance"][order].tolist(), detail_columns["due"][order].tolist(),
+        detail_columns["next_due"][order].tolist(), detail_columns["left"][order].tolist(),
+        is_current.astype(int).tolist(), detail_columns["at"][order].tolist(),
+    ))
+
+    return {
+        "applicants": applicant_rows,
+        "loans": loan_rows,
+        "loan_schedules": schedule_rows,
+        "loan_details": detail_rows,
+        "payments": payment_rows,
+    }
+
+INSERT_SQL = {
+    "applicants": """
+        INSERT INTO applicants (applicant_id, first_name, middle_name, last_name, date_of_birth, gender, civil_status,
+                                email, phone_num, address, id_type, employment_status, monthly_income, credit_score, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """,
+    "loans": """
+        INSERT INTO loans (loan_id, applicant_id, loan_plan_lvl, principal, total_loan, payment_amount, loan_purpose,
+                           disbursement_method, disbursement_account_number, application_date, payment_start_date,
+                           payment_time_period, payment_schedule, status, remarks)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """,
+    "loan_schedules": """
+        INSERT INTO loan_schedules (loan_id, installment_no, due_date, amount_due, amount_paid, status, paid_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """,
+    "loan_details": """
+        INSERT INTO loan_details (loan_id, balance, due_amount, next_due, payments_remaining, is_current, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """,
+    "payments": """
+        INSERT INTO payments (loan_id, amount_paid, remarks, transaction_date, processed_by)
+        VALUES (?, ?, ?, ?, ?)
+    """,
+}
+
+PORTFOLIO_TABLES = ["email_outbox", "payments", "loan_details", "loan_schedules", "loans", "applicants"]
+
+# --- RUNNER ---
+
+def generate_portfolio(engine, loans, seed=42, days=730, chunk_size=50000, processors=("teller.1",), reset=False):
+    '''Writes `loans` synthetic loans. Returns the number of rows written per table.'''
+    rng = np.random.default_rng(seed)
+    today = date.today()
+    written = {table: 0 for table in INSERT_SQL}
+
+    raw = engine.raw_connection()
+    try:
+        db = raw.driver_connection
+        if reset:
+            for table in PORTFOLIO_TABLES:
+                db.execute(f"DELETE FROM {table}")
+            db.commit()
+
+        first_applicant = (db.execute("SELECT MAX(applicant_id) FROM applicants").fetchone()[0] or 0) + 1
+        first_loan = (db.execute("SELECT MAX(loan_id) FROM loans").fetchone()[0] or 0) + 1
+
+        started = time.perf_counter()
+        for offset in range(0, loans, chunk_size):
+            size = min(chunk_size, loans - offset)
+            rows = generate_chunk(rng, first_applicant + offset, first_loan + offset, size, today, days, list(processors))
+            for table, sql in INSERT_SQL.items():
+                db.executemany(sql, rows[table])
+                written[table] += len(rows[table])
+            db.commit()
+            done = offset + size
+            rate = done / (time.perf_counter() - started)
+            print(f"  {done:>10,} / {loans:,} loans  ({rate:,.0f} loans/s)")
+
+        db.execute("ANALYZE")
+        db.commit()
+    finally:
+        raw.close()
+
+    # Dashboard counters are derived data; recount once instead of per row
+    portfolio_stats.rebuild(engine)
+    return written
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--loans", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--days", type=int, default=730, help="spread application dates over this many past days")
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--tellers", type=int, default=5)
+    parser.add_argument("--managers", type=int, default=2)
+    parser.add_argument("--db", default=None, help="database file (default: DATABASE_PATH / database.db)")
+    parser.add_argument("--reset", action="store_true", help="delete existing applicants, loans and payments first")
+    args = parser.parse_args()
+
+    engine = database.create_db_engine(args.db, profile="bulk")
+    accounts = staff_accounts(args.tellers, args.managers)
+    seed_user.seed_users(engine, accounts)
+
+    print(f"--- Generating {args.loans:,} loans (seed {args.seed}) ---")
+    started = time.perf_counter()
+    written = generate_portfolio(
+        engine, args.loans, seed=args.seed, days=args.days, chunk_size=args.chunk_size,
+        processors=[a["username"] for a in accounts if a["role"] in ("teller", "manager")] or ["admin.jay"],
+        reset=args.reset,
+    )
+    for table, count in written.items():
+        print(f"  {table:<16}{count:>14,}")
+    print(f"--- Done in {time.perf_counter() - started:,.1f}s ---")
+    sys.exit(0)
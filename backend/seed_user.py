@@ -1,44 +1,34 @@
 from flask import Flask
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from werkzeug.security import generate_password_hash
-import os
+import database
+import migrate
+import passwords
 
 app = Flask(__name__)
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, 'database.db')
-conn = create_engine(f'sqlite:///{DB_PATH}', echo=True)
+DB_PATH = database.DB_PATH
+conn = database.create_db_engine()
 
-def seed_users():
-    staff_accounts = [
-        {
-            "username": "admin.jay", 
-            "password": "admin.jay", 
-            "role": "admin",
-            "full_name": "Cristian Jay Cosep"
-        }
-    ]
+STAFF_ACCOUNTS = [
+    {
+        "username": "admin.jay", 
+        "password": "admin.jay", 
+        "role": "admin",
+        "full_name": "Cristian Jay Cosep"
+    }
+]
 
-    print(f"--- Connecting to database at: {DB_PATH} ---")
+def seed_users(engine=None, extra_accounts=()):
+    engine = engine or conn
+    staff_accounts = STAFF_ACCOUNTS + list(extra_accounts)
 
-    with conn.connect() as connection:
-        # 1. Safety Check: Ensure table exists with NEW schema
-        # (Ideally schema.sql handles this, but this serves as a backup)
-        print("Ensuring 'users' table schema...")
-        connection.execute(text("""
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username VARCHAR(50) UNIQUE NOT NULL,
-                password VARCHAR(255) NOT NULL,
-                full_name VARCHAR(100) NOT NULL,
-                role VARCHAR(20) NOT NULL DEFAULT 'teller',
-                status VARCHAR(20) DEFAULT 'active',
-                failed_login_attempts INTEGER DEFAULT 0,
-                last_login DATETIME,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            );
-        """))
+    print(f"--- Connecting to database at: {engine.url.database} ---")
 
+    # 1. Make sure the schema is current (creates every table on a fresh database)
+    migrate.apply_migrations(engine)
+
+    with engine.connect() as connection:
         # 2. Clear old data
         print("Clearing old users...")
         connection.execute(text("DELETE FROM users"))
@@ -46,7 +36,7 @@ def seed_users():
         # 3. Insert the Admin
         for account in staff_accounts:
             # Hash the password
-            secure_hash = generate_password_hash(account["password"], method='pbkdf2:sha256')
+            secure_hash = generate_password_hash(account["password"], method=passwords.PASSWORD_HASH_METHOD)
             
             print(f"Creating user: {account['username']} | Role: {account['role']}")
             
@@ -66,7 +56,7 @@ def seed_users():
             
         connection.commit()
     
-    print("--- Success! Admin seeded. You can now log in. ---")
+    print(f"--- Success! {len(staff_accounts)} staff account(s) seeded. You can now log in. ---")
 
 if __name__ == "__main__":
     with app.app_context():
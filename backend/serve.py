@@ -0,0 +1,87 @@
+import os
+import threading
+import time
+from gunicorn.app.base import BaseApplication
+import app as microbank
+import database
+import migrate
+
+# Production entry point: a pre-forking gunicorn server on every core.
+#     python serve.py          (HOST, PORT, WEB_CONCURRENCY, WEB_THREADS; see .env_sample)
+# The master imports app.py once (routes and libraries only; nothing is opened at
+# import) and applies pending migrations once. Each forked worker then builds its own
+# app with create_app() before it accepts connections: its own engine and pool, session
+# store, audit writer, email outbox threads and hashing pool, so no connection, lock or
+# thread is shared across the fork.
+# Still per worker: login throttling counters, the role cache and /api/admin/metrics
+# (a scrape reports the worker that served it).
+
+class WorkerApp:
+    '''WSGI callable loaded in the master; builds the Flask app once per process, after the fork'''
+    def __init__(self, config=None):
+        self.config = config
+        self._app = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._app = microbank.create_app(self.config)
+                    self._pid = os.getpid()
+        return self._app
+
+    def __call__(self, environ, start_response):
+        return self.load()(environ, start_response)
+
+# Migrations already ran in the master (on_starting)
+application = WorkerApp({"RUN_MIGRATIONS": False})
+
+def on_starting(server):
+    engine = database.create_db_engine()
+    try:
+        migrate.apply_migrations(engine)
+    finally:
+        engine.dispose()
+
+def post_worker_init(worker):
+    started = time.perf_counter()
+    application.load()
+    worker.log.info(f"Worker {os.getpid()} ready: app built in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+class Server(BaseApplication):
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return application
+
+def server_options():
+    workers = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+    return {
+        "bind": f"{os.getenv('HOST', '127.0.0.1')}:{os.getenv('PORT', '5000')}",
+        "workers": workers,
+        "worker_class": "gthread",
+        "threads": int(os.getenv("WEB_THREADS", "4")),
+        "timeout": int(os.getenv("WEB_TIMEOUT", "60")),
+        "preload_app": True,
+        "on_starting": on_starting,
+        "post_worker_init": post_worker_init,
+    }
+
+if __name__ == "__main__":
+    options = server_options()
+    workers = options["workers"]
+
+    # Per-worker shares, read by create_app in each worker: the server as a whole keeps
+    # EMAIL_RATE_PER_SECOND towards the provider and one hashing process per worker
+    os.environ["EMAIL_RATE_PER_SECOND"] = str(float(os.getenv("EMAIL_RATE_PER_SECOND", "2")) / workers)
+    os.environ.setdefault("PASSWORD_HASH_WORKERS", "1")
+
+    Server(options).run()
@@ -0,0 +1,186 @@
+import secrets
+import threading
+import time
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from sqlalchemy import text
+from werkzeug.datastructures import CallbackDict
+
+# Server-side session backends selected by SESSION_BACKEND:
+#   "sqlite"     -> sessions table in the app database (default; shared by all workers)
+#   "memory"     -> per-process dict (single worker / development only)
+#   "filesystem" -> the previous Flask-Session file store
+# The cookie only carries a random session id. Rows expire after
+# PERMANENT_SESSION_LIFETIME of inactivity and are removed by a batched cleanup.
+
+SESSION_BACKENDS = ("sqlite", "memory", "filesystem")
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, new=False, expires_at=None):
+        def on_update(self):
+            self.modified = True
+        CallbackDict.__init__(self, initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.expires_at = expires_at
+        self.modified = False
+
+# --- STORES ---
+
+# Shared with the async app (async_app.py), which reads the same rows on its own engine
+SESSION_LOAD_SQL = "SELECT data, expires_at FROM sessions WHERE session_id = :sid AND expires_at > :now"
+SESSION_SAVE_SQL = """
+    INSERT INTO sessions (session_id, data, expires_at) VALUES (:sid, :data, :exp)
+    ON CONFLICT(session_id) DO UPDATE SET data = excluded.data, expires_at = excluded.expires_at
+"""
+SESSION_DELETE_SQL = "DELETE FROM sessions WHERE session_id = :sid"
+
+class SqliteSessionStore:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def load(self, sid, now):
+        with self.conn.connect() as connection:
+            row = connection.execute(text(SESSION_LOAD_SQL), {"sid": sid, "now": now}).fetchone()
+        return (row[0], row[1]) if row else (None, None)
+
+    def save(self, sid, data, expires_at):
+        with self.conn.connect() as connection:
+            connection.execute(text(SESSION_SAVE_SQL), {"sid": sid, "data": data, "exp": expires_at})
+            connection.commit()
+
+    def delete(self, sid):
+        with self.conn.connect() as connection:
+            connection.execute(text(SESSION_DELETE_SQL), {"sid": sid})
+            connection.commit()
+
+    def cleanup(self, now, batch_size):
+        '''Deletes expired rows in bounded batches so the write lock is held briefly'''
+        removed = 0
+        with self.conn.connect() as connection:
+            while True:
+                result = connection.execute(
+                    text("""
+                        DELETE FROM sessions WHERE session_id IN (
+                            SELECT session_id FROM sessions WHERE expires_at <= :now LIMIT :n
+                        )
+                    """),
+                    {"now": now, "n": batch_size}
+                )
+                connection.commit()
+                removed += result.rowcount
+                if result.rowcount < batch_size:
+                    return removed
+
+class MemorySessionStore:
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def load(self, sid, now):
+        with self._lock:
+            entry = self._sessions.get(sid)
+        if entry and entry[1] > now:
+            return entry
+        return None, None
+
+    def save(self, sid, data, expires_at):
+        with self._lock:
+            self._sessions[sid] = (data, expires_at)
+
+    def delete(self, sid):
+        with self._lock:
+            self._sessions.pop(sid, None)
+
+    def cleanup(self, now, batch_size):
+        with self._lock:
+            expired = [sid for sid, (_, expires_at) in self._sessions.items() if expires_at <= now]
+            for sid in expired:
+                del self._sessions[sid]
+        return len(expired)
+
+# --- SESSION INTERFACE ---
+
+class ServerSideSessionInterface(SessionInterface):
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, store, cleanup_interval=60.0, cleanup_batch_size=1000):
+        self.store = store
+        self.cleanup_interval = cleanup_interval
+        self.cleanup_batch_size = cleanup_batch_size
+        self._next_cleanup = time.time() + cleanup_interval
+        self._cleanup_lock = threading.Lock()
+
+    def open_session(self, app, request):
+        now = time.time()
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            data, expires_at = self.store.load(sid, now)
+            if data is not None:
+                try:
+                    return ServerSideSession(self.serializer.loads(data), sid=sid, expires_at=expires_at)
+                except ValueError:
+                    pass
+        return ServerSideSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+        response.vary.add("Cookie")
+
+        if not session:
+            # Emptied (logout / session.clear()): drop the row and the cookie
+            if session.modified and not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path, secure=secure, samesite=samesite, httponly=httponly)
+            return
+
+        now = time.time()
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        # Untouched sessions are only rewritten once half their idle window is used up,
+        # so most authenticated requests cost one indexed read and no write.
+        needs_refresh = session.expires_at is None or (session.expires_at - now) < lifetime / 2
+        if session.modified or session.new or needs_refresh:
+            self.store.save(session.sid, self.serializer.dumps(dict(session)), now + lifetime)
+
+        if session.modified or session.new or (session.permanent and app.config["SESSION_REFRESH_EACH_REQUEST"]):
+            response.set_cookie(
+                name, session.sid,
+                expires=self.get_expiration_time(app, session),
+                httponly=httponly, domain=domain, path=path, secure=secure, samesite=samesite
+            )
+
+        self._maybe_cleanup(now)
+
+    def _maybe_cleanup(self, now):
+        if now < self._next_cleanup or not self._cleanup_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_cleanup = now + self.cleanup_interval
+            self.store.cleanup(now, self.cleanup_batch_size)
+        except Exception as e:
+            print(f"SESSION CLEANUP FAILED: {e}")
+        finally:
+            self._cleanup_lock.release()
+
+def init_app(app, conn, backend="sqlite"):
+    '''Installs the configured session backend on the Flask app'''
+    if backend not in SESSION_BACKENDS:
+        raise ValueError(f"Unknown SESSION_BACKEND '{backend}'. Expected one of: {', '.join(SESSION_BACKENDS)}")
+
+    if backend == "filesystem":
+        from flask_session import Session
+        app.config["SESSION_TYPE"] = "filesystem"
+        Session(app)
+        return
+
+    store = SqliteSessionStore(conn) if backend == "sqlite" else MemorySessionStore()
+    app.session_interface = ServerSideSessionInterface(
+        store,
+        cleanup_interval=float(app.config.get("SESSION_CLEANUP_INTERVAL", 60)),
+        cleanup_batch_size=int(app.config.get("SESSION_CLEANUP_BATCH_SIZE", 1000))
+    )
@@ -0,0 +1,24 @@
+import os
+import sys
+import pytest
+
+# The backend is a flat set of modules: make them importable from any working directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import id_images
+import migrate
+
+@pytest.fixture
+def engine(tmp_path):
+    '''A freshly migrated database in a temporary directory'''
+    engine = database.create_db_engine(str(tmp_path / "test.db"))
+    migrate.apply_migrations(engine, verbose=False)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def image_dir(tmp_path, monkeypatch):
+    '''ID image store in a temporary directory'''
+    monkeypatch.setattr(id_images, "ID_IMAGE_DIR", str(tmp_path / "id_images"))
+    return tmp_path / "id_images"
@@ -0,0 +1,21 @@
+'''Client address for the login throttle and audit log: X-Forwarded-For only as deep as the trusted proxies'''
+from werkzeug.datastructures import Headers
+import app
+
+SPOOFED = Headers([("X-Forwarded-For", "198.51.100.9, 203.0.113.7")])  # client-sent entry, then what the proxy added
+
+def test_forwarded_for_is_ignored_without_trusted_proxies(monkeypatch):
+    monkeypatch.setattr(app, "TRUSTED_PROXIES", 0)
+    assert app.client_ip(SPOOFED, "10.0.0.1") == "10.0.0.1"
+
+def test_only_the_proxy_added_entry_is_used(monkeypatch):
+    monkeypatch.setattr(app, "TRUSTED_PROXIES", 1)
+    assert app.client_ip(SPOOFED, "10.0.0.1") == "203.0.113.7"
+    # Repeated headers count as one list, in order
+    split = Headers([("X-Forwarded-For", "198.51.100.9"), ("X-Forwarded-For", "203.0.113.7")])
+    assert app.client_ip(split, "10.0.0.1") == "203.0.113.7"
+
+def test_fewer_entries_than_proxies_falls_back_to_the_peer(monkeypatch):
+    monkeypatch.setattr(app, "TRUSTED_PROXIES", 2)
+    assert app.client_ip(Headers([("X-Forwarded-For", "203.0.113.7")]), "10.0.0.1") == "10.0.0.1"
+    assert app.client_ip(Headers(), "10.0.0.1") == "10.0.0.1"
@@ -0,0 +1,55 @@
+'''Batch eligibility (microbank.assess_eligibilities) against the scalar Applicant.assess_eligibility'''
+import itertools
+import numpy as np
+import microbank as mb
+
+# Both sides of the 500 score cutoff, each paired with incomes on both sides of the 60% burden cutoff
+CREDIT_SCORES = [300, 499, 500, 501, 740]
+PRINCIPALS = [1000, 10000.01, 25000, 50000]
+REPAYMENT_PERIODS = [1, 6, 12]
+PAYMENT_SCHEDULES = ["Weekly", "Bi-Weekly", "Monthly"]
+INCOME_OFFSETS = [-1, -0.01, 0, 0.01, 1]   # added to the income at which burden is exactly 60%
+
+def monthly_burden(principal, score, period, schedule):
+    offer = mb.Applicant({
+        "loan_amount": principal, "credit_score": score,
+        "repayment_period": period, "payment_schedule": schedule,
+    }).calculate_offer()
+    return offer["payment_amount"] * mb.SCHEDS.get(schedule, 1)
+
+def assert_same_decisions(credit_scores, monthly_incomes, principals, repayment_periods, payment_schedules):
+    batch = mb.assess_eligibilities(credit_scores, monthly_incomes, principals, repayment_periods, payment_schedules)
+    mismatches = []
+    for i, inputs in enumerate(zip(credit_scores, monthly_incomes, principals, repayment_periods, payment_schedules)):
+        score, income, principal, period, schedule = inputs
+        scalar = mb.Applicant({
+            "credit_score": score, "monthly_revenue": income, "loan_amount": principal,
+            "repayment_period": period, "payment_schedule": schedule,
+        }).assess_eligibility()
+        if (scalar["status"], scalar.get("rule")) != (batch["status"][i], batch["rule"][i]):
+            mismatches.append((inputs, scalar["status"], scalar.get("rule"), batch["status"][i], batch["rule"][i]))
+    assert not mismatches, f"{len(mismatches)} mismatches, first {mismatches[0]}"
+    return batch
+
+def test_batch_matches_scalar_on_both_cutoffs():
+    columns = [[], [], [], [], []]
+    for score, principal, period, schedule in itertools.product(CREDIT_SCORES, PRINCIPALS, REPAYMENT_PERIODS, PAYMENT_SCHEDULES):
+        at_cutoff = monthly_burden(principal, score, period, schedule) / 0.6
+        for offset in INCOME_OFFSETS:
+            for column, value in zip(columns, (score, at_cutoff + offset, principal, period, schedule)):
+                column.append(value)
+
+    batch = assert_same_decisions(*columns)
+    # The grid reaches every outcome: approved, and rejected by each rule
+    assert set(batch["rule"]) == {None, "min_credit_score", "max_income_burden"}
+
+def test_batch_matches_scalar_on_random_applicants():
+    rng = np.random.default_rng(7)
+    n = 5000
+    assert_same_decisions(
+        rng.integers(300, 851, n).tolist(),
+        np.round(rng.uniform(1000, 60000, n), 2).tolist(),
+        np.round(rng.uniform(500, 60000, n), 2).tolist(),
+        rng.choice(REPAYMENT_PERIODS, n).tolist(),
+        rng.choice(PAYMENT_SCHEDULES, n).tolist(),
+    )
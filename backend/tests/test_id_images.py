@@ -0,0 +1,41 @@
+'''ID image files written with an application (Applicant.load_to_db)'''
+import base64
+import pytest
+from sqlalchemy import text
+import id_images
+import microbank as mb
+import notifications
+
+def application(image_bytes):
+    return {
+        "first_name": "Ana", "last_name": "Cruz", "gender": "Female", "employment_status": "Employed",
+        "monthly_revenue": 50000, "credit_score": 700, "loan_amount": 15000,
+        "repayment_period": 3, "payment_schedule": "Monthly", "loan_purpose": "Business",
+        "id_image_data": "data:image/png;base64," + base64.b64encode(image_bytes).decode(),
+    }
+
+def stored_files(image_dir):
+    return sorted(p.name for p in image_dir.rglob("*") if p.is_file())
+
+def fail(*args, **kwargs):
+    raise RuntimeError("insert failed")
+
+def test_committed_application_keeps_its_image(engine, image_dir):
+    mb.Applicant(application(b"front of ID")).load_to_db(engine)
+    with engine.connect() as connection:
+        image_hash = connection.execute(text("SELECT id_image_hash FROM applicants")).scalar()
+    assert stored_files(image_dir) == [image_hash]
+
+def test_failed_application_leaves_no_file(engine, image_dir, monkeypatch):
+    monkeypatch.setattr(notifications, "enqueue_loan_notice", fail)
+    with pytest.raises(RuntimeError):
+        mb.Applicant(application(b"front of ID")).load_to_db(engine)
+    assert stored_files(image_dir) == []
+
+def test_failed_application_keeps_a_shared_image(engine, image_dir, monkeypatch):
+    # Same content as an earlier applicant's ID: that applicant still needs the file
+    mb.Applicant(application(b"front of ID")).load_to_db(engine)
+    monkeypatch.setattr(notifications, "enqueue_loan_notice", fail)
+    with pytest.raises(RuntimeError):
+        mb.Applicant(application(b"front of ID")).load_to_db(engine)
+    assert stored_files(image_dir) == [id_images.content_hash(b"front of ID")]
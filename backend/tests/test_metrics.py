@@ -0,0 +1,33 @@
+'''N+1 detector: a statement run N_PLUS_ONE_THRESHOLD+ times in one request is flagged for its route'''
+from flask import Flask, request
+from sqlalchemy import text
+import metrics
+
+NAME_LOOKUP = "SELECT first_name, last_name FROM applicants WHERE applicant_id = :id"
+
+def app_with_metrics(engine, threshold):
+    app = Flask(__name__)
+    recorder = metrics.Metrics(n_plus_one_threshold=threshold)
+    recorder.init_app(app, engine)
+
+    @app.route("/lookups")
+    def lookups():
+        with engine.connect() as connection:
+            for applicant_id in range(int(request.args["n"])):
+                connection.execute(text(NAME_LOOKUP), {"id": applicant_id}).fetchone()
+        return "ok"
+
+    return app, recorder
+
+def test_repeated_lookup_is_flagged(engine):
+    app, recorder = app_with_metrics(engine, threshold=5)
+    client = app.test_client()
+
+    client.get("/lookups?n=4")
+    assert recorder.n_plus_one == {}
+
+    client.get("/lookups?n=5")
+    client.get("/lookups?n=12")
+    suspect = ("/lookups", "SELECT first_name, last_name FROM applicants WHERE applicant_id = ?")
+    assert recorder.n_plus_one == {suspect: 2}
+    assert 'microbank_db_n_plus_one_total{route="/lookups"' in recorder.render()
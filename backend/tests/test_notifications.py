@@ -0,0 +1,30 @@
+'''Outbox dispatcher: mail queued by a commit goes out on wake(), not at the next poll'''
+import time
+import microbank as mb
+import notifications
+
+def wait_for(condition, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+def test_wake_sends_without_waiting_for_the_poll(engine):
+    provider = notifications.StubProvider()
+    dispatcher = notifications.OutboxDispatcher(engine, provider, workers=1, rate_per_second=100, poll_interval=30)
+    dispatcher.start()
+    try:
+        time.sleep(0.2)  # idle: the worker is now inside its 30 s wait
+        mb.Applicant({
+            "first_name": "Ana", "last_name": "Cruz", "email": "ana@example.com", "gender": "Female",
+            "employment_status": "Employed", "monthly_revenue": 50000, "credit_score": 700, "loan_amount": 15000,
+            "repayment_period": 3, "payment_schedule": "Monthly", "loan_purpose": "Business",
+        }).load_to_db(engine)
+
+        assert not wait_for(lambda: notifications.outbox_stats(engine).get("sent"), 0.5)
+        dispatcher.wake()
+        assert wait_for(lambda: notifications.outbox_stats(engine).get("sent") == 1, 5)
+    finally:
+        dispatcher.stop()
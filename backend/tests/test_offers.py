@@ -0,0 +1,47 @@
+'''Batch offer engine (microbank.calculate_offers) against the scalar Applicant.calculate_offer'''
+import itertools
+import numpy as np
+import microbank as mb
+
+# Both sides of every amount tier (10001 / 20001 / 30001 / 40001) and score adjustment (600 / 740)
+PRINCIPALS = [500, 1000, 9999.99, 10000, 10000.01, 10001, 12345.67, 20000, 20000.5, 20001,
+              29999.99, 30000, 30001, 33333.33, 40000, 40000.99, 40001, 49999.99, 50000]
+CREDIT_SCORES = [300, 599, 600, 601, 739, 740, 741, 850]
+REPAYMENT_PERIODS = [1, 3, 6, 12, 24]
+PAYMENT_SCHEDULES = ["Weekly", "Bi-Weekly", "Monthly"]
+
+FIELDS = ("interest_rate", "total_repayment", "payment_amount", "payment_count")
+
+def scalar_offers(principals, credit_scores, repayment_periods, payment_schedules):
+    return [
+        mb.Applicant({
+            "loan_amount": principal, "credit_score": score,
+            "repayment_period": period, "payment_schedule": schedule,
+        }).calculate_offer()
+        for principal, score, period, schedule in zip(principals, credit_scores, repayment_periods, payment_schedules)
+    ]
+
+def assert_same_offers(principals, credit_scores, repayment_periods, payment_schedules):
+    batch = mb.calculate_offers(principals, credit_scores, repayment_periods, payment_schedules)
+    scalar = scalar_offers(principals, credit_scores, repayment_periods, payment_schedules)
+    for field in FIELDS:
+        mismatches = [
+            (principals[i], credit_scores[i], repayment_periods[i], payment_schedules[i], offer[field], batch[field][i])
+            for i, offer in enumerate(scalar) if offer[field] != batch[field][i]
+        ]
+        # Both sides are rounded to the cent, so they must be equal, not merely close
+        assert not mismatches, f"{field}: {len(mismatches)} mismatches, first {mismatches[0]}"
+
+def test_batch_matches_scalar_on_tier_boundaries():
+    grid = list(itertools.product(PRINCIPALS, CREDIT_SCORES, REPAYMENT_PERIODS, PAYMENT_SCHEDULES))
+    assert_same_offers(*[list(column) for column in zip(*grid)])
+
+def test_batch_matches_scalar_on_random_offers():
+    rng = np.random.default_rng(42)
+    n = 20000
+    assert_same_offers(
+        np.round(rng.uniform(500, 60000, n), 2).tolist(),
+        rng.integers(300, 851, n).tolist(),
+        rng.choice(REPAYMENT_PERIODS, n).tolist(),
+        rng.choice(PAYMENT_SCHEDULES, n).tolist(),
+    )
@@ -0,0 +1,68 @@
+'''Payment posting against the installment schedule (microbank.apply_payment)'''
+import pytest
+from sqlalchemy import text
+import microbank as mb
+
+@pytest.fixture
+def loan_id(engine):
+    '''Released 15,000 loan at 8%: 3 monthly installments of 5,400 (total 16,200)'''
+    mb.Applicant({
+        "first_name": "Ana", "last_name": "Cruz", "gender": "Female", "employment_status": "Employed",
+        "monthly_revenue": 50000, "credit_score": 700, "loan_amount": 15000,
+        "repayment_period": 3, "payment_schedule": "Monthly", "loan_purpose": "Business",
+    }).load_to_db(engine)
+    with engine.connect() as connection:
+        loan_id = connection.execute(text("SELECT MAX(loan_id) FROM loans")).scalar()
+    mb.release_loan(engine, {"loan_id": loan_id, "release_date": "2026-01-01"})
+    return loan_id
+
+def pay(engine, loan_id, amount):
+    return mb.update_balance(engine, {"loan_id": loan_id, "amount": amount})
+
+def schedule(engine, loan_id):
+    with engine.connect() as connection:
+        return [tuple(row) for row in connection.execute(
+            text("SELECT amount_paid, status FROM loan_schedules WHERE loan_id = :lid ORDER BY installment_no"),
+            {"lid": loan_id}
+        )]
+
+def current_detail(engine, loan_id):
+    with engine.connect() as connection:
+        return dict(connection.execute(
+            text("SELECT balance, due_amount, next_due, payments_remaining FROM loan_details WHERE loan_id = :lid AND is_current = 1"),
+            {"lid": loan_id}
+        ).mappings().one())
+
+def test_partial_spill_and_exact_settle(engine, loan_id):
+    assert schedule(engine, loan_id) == [(0, "Pending"), (0, "Pending"), (0, "Pending")]
+
+    # Partial: the first installment stays open for the rest
+    assert pay(engine, loan_id, 3000)["remarks"] == "Partial Payment"
+    assert schedule(engine, loan_id) == [(3000, "Partial"), (0, "Pending"), (0, "Pending")]
+    assert current_detail(engine, loan_id) == {
+        "balance": 13200, "due_amount": 2400, "next_due": "2026-01-31", "payments_remaining": 3
+    }
+
+    # Closes the first installment and spills 1,600 into the second
+    assert pay(engine, loan_id, 4000)["remarks"] == "On-Time Payment"
+    assert schedule(engine, loan_id) == [(5400, "Paid"), (1600, "Partial"), (0, "Pending")]
+    assert current_detail(engine, loan_id) == {
+        "balance": 9200, "due_amount": 3800, "next_due": "2026-03-02", "payments_remaining": 2
+    }
+
+    # Exactly the balance settles every open installment and the loan
+    assert pay(engine, loan_id, 9200)["remarks"] == "Settled"
+    assert schedule(engine, loan_id) == [(5400, "Paid"), (5400, "Paid"), (5400, "Paid")]
+    assert current_detail(engine, loan_id) == {
+        "balance": 0, "due_amount": 0, "next_due": None, "payments_remaining": 0
+    }
+
+    with engine.connect() as connection:
+        remarks = connection.execute(
+            text("SELECT remarks FROM payments WHERE loan_id = :lid ORDER BY payment_id"), {"lid": loan_id}
+        ).scalars().all()
+        status = connection.execute(text("SELECT status FROM loans WHERE loan_id = :lid"), {"lid": loan_id}).scalar()
+        details = connection.execute(text("SELECT COUNT(*) FROM loan_details WHERE loan_id = :lid"), {"lid": loan_id}).scalar()
+    assert remarks == ["Partial Payment", "On-Time Payment", "Settled"]
+    assert status == "Settled"
+    assert details == 4  # the release row plus one per payment, only the last one current
@@ -0,0 +1,22 @@
+'''Dashboard read of the portfolio_stats counters'''
+from datetime import date, timedelta
+import portfolio_stats
+
+def test_dashboard_read_is_bounded(engine):
+    with engine.connect() as connection:
+        first = date(2025, 1, 1)
+        for n in range(100):
+            portfolio_stats.bump(connection, "daily_applications", (first + timedelta(days=n)).isoformat(), n + 1)
+        portfolio_stats.bump(connection, "status", "Pending", 3)
+        portfolio_stats.bump(connection, "total_payments", "", 1500.5)
+        connection.commit()
+
+        everything = portfolio_stats.read_stats(connection)
+        dashboard = portfolio_stats.read_dashboard_stats(connection, days=30)
+
+    daily = sorted(bucket for metric, bucket in dashboard if metric == "daily_applications")
+    assert daily == [(first + timedelta(days=n)).isoformat() for n in range(30)]
+    # Every other counter comes back exactly as the full read has it
+    assert {key: value for key, value in dashboard.items() if key[0] != "daily_applications"} == \
+           {key: value for key, value in everything.items() if key[0] != "daily_applications"}
+    assert dashboard[("total_payments", "")] == 1500.5
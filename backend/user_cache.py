@@ -0,0 +1,80 @@
+import threading
+import time
+
+# Short-lived cache of (role, status) per username for role_required.
+# Writes that change a user's role/status call invalidate() so a suspension
+# still takes effect on the very next request; the TTL only bounds staleness
+# from changes made outside this process.
+
+class UserRoleCache:
+    def __init__(self, ttl=5.0, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, username, loader):
+        '''Returns the cached {"role", "status"} for username, calling loader(username) on a miss'''
+        hit, value = self._lookup(username)
+        if hit:
+            return value
+        return self._store(username, loader(username), value)
+
+    async def get_async(self, username, loader):
+        '''get() for the async app: loader is a coroutine function'''
+        hit, value = self._lookup(username)
+        if hit:
+            return value
+        return self._store(username, await loader(username), value)
+
+    def _lookup(self, username):
+        '''(True, user) on a hit, else (False, the generation to store the loaded row under)'''
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry and entry[0] > now:
+                self.hits += 1
+                return True, entry[1]
+            self.misses += 1
+            return False, self._generation
+
+    def _store(self, username, user, generation):
+        now = time.monotonic()
+        # Unknown users are not cached; role_required clears their session anyway
+        if user is not None and self.ttl > 0:
+            with self._lock:
+                # An invalidate() while we were loading means the row may already be stale
+                if generation != self._generation:
+                    return user
+                if len(self._entries) >= self.max_entries:
+                    self._evict_expired(now)
+                if len(self._entries) < self.max_entries:
+                    self._entries[username] = (now + self.ttl, user)
+        return user
+
+    def invalidate(self, username=None):
+        '''Drops one user, or everything when username is None'''
+        with self._lock:
+            self._generation += 1
+            if username is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(username, None)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "entries": len(self._entries),
+                "ttl_seconds": self.ttl
+            }
+
+    def _evict_expired(self, now):
+        for username in [u for u, (expires, _) in self._entries.items() if expires <= now]:
+            del self._entries[username]
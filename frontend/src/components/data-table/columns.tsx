@@ -59,7 +59,6 @@ export type ActiveLoanData = {
   gender?: string;
   civil_status?: string;
   id_type?: string;
-  id_image_data?: string;
   address?: string;
   disbursement_method?: string;
   disbursement_account_number?: string;
@@ -198,7 +197,6 @@ export type ApplicationData = {
   phone_num: string;
   address: string;
   id_type: string;
-  id_image_data: string;
   disbursement_method: string;
   disbursement_account_number: string;
 };
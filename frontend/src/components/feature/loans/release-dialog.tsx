@@ -86,7 +86,7 @@ export function Release(props: ReleaseProps) {
   const [isNotified, setIsNotified] = useState(false);
 
   const displayData = { ...props, ...details };
-  const hasImage = displayData?.id_image_data && displayData.id_image_data.length > 50;
+  const hasImage = Boolean(displayData?.id_image_url);
 
   useEffect(() => {
     const currentStatus = details?.status || props.status;
@@ -420,7 +420,7 @@ export function Release(props: ReleaseProps) {
                   <div className="flex flex-col md:flex-row">
                     <div className="md:w-1/3 bg-zinc-100/50 p-4 border-b md:border-b-0 md:border-r flex flex-col items-center justify-center gap-2 cursor-zoom-in group transition-colors hover:bg-zinc-100" onClick={() => hasImage && setShowFullImage(true)}>
                       <div className="relative w-full aspect-[1.58/1] bg-white rounded border shadow-sm overflow-hidden flex items-center justify-center">
-                        {hasImage ? (<><img src={displayData.id_image_data} alt="ID" className="w-full h-full object-cover" /><div className="absolute inset-0 bg-black/0 group-hover:bg-black/20 flex items-center justify-center transition-all"><Maximize2 className="text-white opacity-0 group-hover:opacity-100 drop-shadow-md" size={24} /></div></>) : (<span className="text-xs text-zinc-400 flex flex-col items-center gap-1"><EyeOff size={20} /> No ID Uploaded</span>)}
+                        {hasImage ? (<><img src={displayData.id_image_url ?? undefined} alt="ID" className="w-full h-full object-cover" /><div className="absolute inset-0 bg-black/0 group-hover:bg-black/20 flex items-center justify-center transition-all"><Maximize2 className="text-white opacity-0 group-hover:opacity-100 drop-shadow-md" size={24} /></div></>) : (<span className="text-xs text-zinc-400 flex flex-col items-center gap-1"><EyeOff size={20} /> No ID Uploaded</span>)}
                       </div>
                       <span className="text-[10px] text-zinc-400 group-hover:text-zinc-600 transition-colors">Click to enlarge image</span>
                     </div>
@@ -535,7 +535,7 @@ export function Release(props: ReleaseProps) {
       </Dialog>
 
       <Dialog open={showFullImage} onOpenChange={setShowFullImage}>
-        <DialogContent className="max-w-[90vw] max-h-[90vh] p-0 bg-transparent border-none shadow-none [&>button]:text-white"><div className="w-full h-full flex items-center justify-center" onClick={() => setShowFullImage(false)}>{hasImage && <img src={displayData.id_image_data} alt="ID Full View" className="max-w-full max-h-[85vh] object-contain rounded-md shadow-2xl animate-in zoom-in-95 duration-200" />}</div></DialogContent>
+        <DialogContent className="max-w-[90vw] max-h-[90vh] p-0 bg-transparent border-none shadow-none [&>button]:text-white"><div className="w-full h-full flex items-center justify-center" onClick={() => setShowFullImage(false)}>{hasImage && <img src={displayData.id_image_url ?? undefined} alt="ID Full View" className="max-w-full max-h-[85vh] object-contain rounded-md shadow-2xl animate-in zoom-in-95 duration-200" />}</div></DialogContent>
       </Dialog>
     </>
   );
@@ -61,7 +61,6 @@ export default function Applications() {
       phone_num: app.phone_num || "N/A",
       address: app.address || "No address",
       id_type: app.id_type || "None",
-      id_image_data: app.id_image_data || "",
       disbursement_method: app.disbursement_method || "Cash Pickup",
       disbursement_account_number: app.disbursement_account_number || "N/A",
       remarks: app.remarks || ""
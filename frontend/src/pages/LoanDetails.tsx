@@ -56,7 +56,7 @@ export default function LoanDetails() {
     next_due, duration, status, date_applied, start_date, due_amount,
     applicant_id, loan_purpose, disbursement_method, 
     disbursement_account_number, gender, civil_status, monthly_income, 
-    address, id_type, id_image_data
+    address, id_type, id_image_url
   } = data;
 
   const displayPhone = phone_number || "N/A"; 
@@ -207,7 +207,7 @@ export default function LoanDetails() {
                 <span className="text-xs text-gray-500 mb-2 font-medium uppercase tracking-wide block">Identification Document</span>
                 <div className="flex items-center justify-between p-3 bg-gray-50 rounded-lg border border-gray-100">
                     <div className="flex items-center gap-2"><IconId className="text-gray-400" size={20} /><span className="text-sm font-semibold text-gray-700">{id_type || "ID"}</span></div>
-                    {id_image_data && (<Button variant="ghost" size="sm" className="h-8 text-blue-600 hover:text-blue-700 hover:bg-blue-50" onClick={() => setShowIdImage(true)}><IconEye size={16} className="mr-1" /> View</Button>)}
+                    {id_image_url && (<Button variant="ghost" size="sm" className="h-8 text-blue-600 hover:text-blue-700 hover:bg-blue-50" onClick={() => setShowIdImage(true)}><IconEye size={16} className="mr-1" /> View</Button>)}
                 </div>
             </div>
           </div>
@@ -228,7 +228,7 @@ export default function LoanDetails() {
       <Dialog open={showIdImage} onOpenChange={setShowIdImage}>
         <DialogContent className="max-w-[80vw] max-h-[80vh] p-0 bg-transparent border-none shadow-none [&>button]:text-white">
             <div className="w-full h-full flex items-center justify-center" onClick={() => setShowIdImage(false)}>
-                {id_image_data ? (<img src={id_image_data} alt="ID Proof" className="max-w-full max-h-[80vh] object-contain rounded-md shadow-2xl" />) : (<div className="bg-white p-4 rounded">No Image Available</div>)}
+                {id_image_url ? (<img src={id_image_url} alt="ID Proof" className="max-w-full max-h-[80vh] object-contain rounded-md shadow-2xl" />) : (<div className="bg-white p-4 rounded">No Image Available</div>)}
             </div>
         </DialogContent>
       </Dialog>
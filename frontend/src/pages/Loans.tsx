@@ -63,7 +63,6 @@ export default function Loans() {
       monthly_income: loan.monthly_income || 0,
       phone_num: loan.phone_number || loan.phone_num || "", // Handle alias
       loan_purpose: loan.loan_purpose || "General",
-      id_image_data: loan.id_image_data || "",
     }));
   }, [data]);
 
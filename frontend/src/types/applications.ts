@@ -27,7 +27,7 @@ export interface Application {
   gender: string;
   civil_status: string;
   id_type: string;
-  id_image_data: string;
+  id_image_url?: string | null; // Only on /api/loans/<id> (served by /api/applicants/<id>/id-image); list rows are slim
   phone_num: string;
   address: string;
   
@@ -25,7 +25,7 @@ export interface BaseLoanData {
   phone_num?: string;
   phone_number?: string;
   id_type: string;
-  id_image_data: string;
+  id_image_url?: string | null; // Served by /api/applicants/<id>/id-image
   loan_purpose: string;
   payment_schedule: string;
   disbursement_method: string;